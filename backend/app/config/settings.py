@@ -18,6 +18,7 @@ class Settings(BaseSettings):
     # 标准 OpenAI 配置（备选）
     openai_api_key: Optional[str] = None
     openai_model: str = "gpt-3.5-turbo"
+    openai_base_url: Optional[str] = None  # 自定义 OpenAI 兼容地址（代理或本地测试服务）
     
     # 应用配置
     environment: str = "development"
@@ -29,6 +30,40 @@ class Settings(BaseSettings):
     ai_temperature: float = 0.7
     ai_max_tokens: int = 1000
     ai_conversation_history_length: int = 10
+    ai_multi_provider: bool = False  # 同时配置 Azure 和 OpenAI 时启用对冲和自动切换
+    ai_hedge_quantile: float = 0.95  # 按首字延迟的该分位数决定何时发出对冲请求
+    ai_hedge_initial_delay_ms: int = 2000  # 延迟样本不足时的对冲等待时间
+    ai_failover_cooldown_seconds: int = 30  # 提供商出错后暂停作为首选的时间
+    ai_http_max_connections: int = 100
+    ai_analysis_max_streams: int = 16  # 同时生成的流式范围分析数，超过时只返回确定性指标
+    ai_stub_llm: bool = False  # 使用模拟 LLM（压测用，不访问网络）
+    ai_stub_first_token_ms: int = 300
+    ai_stub_token_ms: int = 20
+    ai_stub_tokens: int = 50
+    ws_initial_credit: int = 32  # WebSocket 每个对话初始可发送的内容帧数
+    ws_max_active_conversations: int = 16  # 单个 WebSocket 连接同时进行的对话数
+    ws_max_pending_chars: int = 4096  # 额度用完时每个对话最多缓冲的字符数，超过后暂停读取模型输出
+    
+    # 范围计算配置
+    compute_workers: int = 0  # 计算进程数，0 表示使用全部 CPU 核心
+    flop_report_cache_size: int = 64
+    equity_session_ttl_seconds: int = 900
+    cache_dir: str = ".cache"  # 预计算数据和持久化结果存储的保存目录
+    preflop_table_boards: int = 6000
+    job_max_running_per_user: int = 2  # 每个用户同时运行的作业数
+    job_max_queued_per_user: int = 8  # 每个用户排队等待的作业数
+    job_retention_seconds: int = 3600  # 作业结束后结果的保留时间
+    observed_ranges_file: str = ".cache/observed_ranges.json"  # 手牌历史导入工具生成的观察范围
+    result_store_max_mb: int = 512  # 持久化结果存储（cache_dir/results.db）的大小上限
+    result_store_warm_entries: int = 32  # 启动时从结果存储加载到内存的翻牌报告数
+    result_store_analysis_ttl_seconds: int = 86400  # AI 范围分析结果的保留时间
+    range_library_file: str = "data/range_library.db"  # 服务端范围库
+    
+    # 性能剖析配置
+    profiling_enabled: bool = False  # 允许 X-Profile 请求头和 /admin/profiling 接口
+    profiling_admin_token: str = ""  # /admin/profiling 接口需要的 X-Admin-Token，为空时接口一律拒绝
+    profiling_retention_seconds: int = 3600  # 请求剖析结果的保留时间
+    profiling_max_sample_seconds: int = 60  # 单次采样剖析的最长时间
     
     class Config:
         env_file = ".env"
@@ -4,9 +4,16 @@ FastAPI 主应用
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .config.settings import settings
-from .routes import chat, range
+from .routes import chat, chat_ws, range, jobs, library, profiling
 from .models.schemas import HealthResponse
 from .services.llm_service import llm_service
+from .services import compute_pool
+from .services.jobs import job_service
+from .services.preflop_equity import preflop_equity_table
+from .services.flop_texture import flop_texture_service
+from .services.result_store import result_store
+from .services.profiling import ProfilingMiddleware
+import asyncio
 import logging
 
 # 配置日志
@@ -35,11 +42,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id"],
 )
 
+# 按需请求剖析（PROFILING_ENABLED 开启且带 X-Profile 请求头时生效）
+app.add_middleware(ProfilingMiddleware)
+
 # 注册路由
 app.include_router(chat.router)
+app.include_router(chat_ws.router)
 app.include_router(range.router)
+app.include_router(jobs.router)
+app.include_router(library.router)
+app.include_router(profiling.router)
 
 
 @app.on_event("startup")
@@ -54,6 +69,30 @@ async def startup_event():
     else:
         logger.warning("⚠️  AI 服务未配置，请检查环境变量")
         logger.warning("💡 请参考 .env.example 配置 Azure OpenAI 或 OpenAI API")
+    
+    if settings.profiling_enabled and not settings.profiling_admin_token:
+        logger.warning("⚠️  已开启性能剖析但未设置 PROFILING_ADMIN_TOKEN，/admin/profiling 接口将拒绝所有请求")
+    
+    asyncio.create_task(warm_caches())
+
+
+async def warm_caches():
+    """从结果存储预热翻前胜率表和最近使用的翻牌报告（后台执行，不阻塞启动）"""
+    try:
+        await asyncio.to_thread(preflop_equity_table)
+        loaded = await flop_texture_service.warm(settings.result_store_warm_entries)
+        logger.info(f"🔥 结果存储预热完成: {loaded} 个翻牌报告")
+    except Exception as e:
+        logger.error(f"❌ 结果存储预热失败: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭事件"""
+    compute_pool.shutdown()
+    job_service.shutdown()
+    await llm_service.aclose()
+    result_store.close()
 
 
 @app.get("/", response_model=HealthResponse)
@@ -1,8 +1,8 @@
 """
 数据模型定义
 """
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime
 
 
@@ -34,12 +34,52 @@ class RangeAnalysisRequest(BaseModel):
     scenario: Optional[str] = Field(None, description="场景", example="open")
 
 
+class EquityDistributionStats(BaseModel):
+    """胜率分布的形状统计（按组合加权）"""
+    mean: float = Field(..., description="组合平均胜率")
+    std: float = Field(..., description="标准差")
+    p10: float = Field(..., description="10% 分位数")
+    p25: float = Field(..., description="25% 分位数")
+    median: float = Field(..., description="中位数")
+    p75: float = Field(..., description="75% 分位数")
+    p90: float = Field(..., description="90% 分位数")
+    strong_share: float = Field(..., description="胜率不低于 70% 的组合占比")
+    weak_share: float = Field(..., description="胜率低于 30% 的组合占比")
+    shape: str = Field(..., description="分布形状：极化、紧凑、线性")
+
+
+class RangeEquitySummary(BaseModel):
+    """范围的翻前胜率摘要（对抗随机手牌）"""
+    vs_random: float = Field(..., description="按组合加权的平均胜率")
+    strongest: str = Field(..., description="胜率最高的手牌")
+    strongest_equity: float = Field(..., description="最高胜率")
+    weakest: str = Field(..., description="胜率最低的手牌")
+    weakest_equity: float = Field(..., description="最低胜率")
+    below_half_share: float = Field(..., description="胜率低于 50% 的组合占比")
+
+
+class RangeMetrics(BaseModel):
+    """范围的确定性指标（不依赖 AI）"""
+    total_combinations: int = Field(..., description="总组合数")
+    tightness_percentile: float = Field(..., description="范围约为前百分之多少的起手牌")
+    tightness: str = Field(..., description="紧松程度：很紧、紧、中等、松")
+    pair_share: float = Field(..., description="对子组合占比")
+    suited_share: float = Field(..., description="同色组合占比")
+    offsuit_share: float = Field(..., description="不同色组合占比")
+    broadway_share: float = Field(..., description="两张都是 T 以上的组合占比")
+    blockers: Dict[str, float] = Field(..., description="含 A、K、Q、J、T 的组合占比")
+    top_range_overlap: Optional[float] = Field(None, description="与同样大小的最强范围的重合比例（胜率表未就绪时为空）")
+    equity: Optional[RangeEquitySummary] = Field(None, description="胜率摘要（胜率表未就绪时为空）")
+    distribution: Optional[EquityDistributionStats] = Field(None, description="对抗随机手牌的胜率分布形状（胜率表未就绪时为空）")
+
+
 class RangeAnalysisResponse(BaseModel):
     """范围分析响应"""
     analysis: str = Field(..., description="分析结果")
     suggestions: List[str] = Field(default_factory=list, description="建议")
     probability: float = Field(..., description="出现概率")
     total_combinations: int = Field(..., description="总组合数")
+    metrics: Optional[RangeMetrics] = Field(None, description="确定性指标")
 
 
 class RangeRecommendationRequest(BaseModel):
@@ -47,7 +87,9 @@ class RangeRecommendationRequest(BaseModel):
     position: str = Field(..., description="位置", example="BTN")
     scenario: str = Field(..., description="场景", example="open")
     opponent_style: Optional[str] = Field(None, description="对手风格", example="tight-aggressive")
+    opponent_name: Optional[str] = Field(None, description="对手玩家名（有手牌历史导入的观察范围时用作参考）")
     stack_depth: Optional[str] = Field(None, description="筹码深度", example="100bb")
+    table_size: Optional[int] = Field(None, ge=2, le=9, description="桌上人数（短码时用于求解全下范围，默认 6）")
 
 
 class RangeRecommendationResponse(BaseModel):
@@ -64,3 +106,329 @@ class HealthResponse(BaseModel):
     ai_provider: Optional[str] = Field(None, description="AI 提供商")
     version: str = Field(default="1.0.0", description="API 版本")
 
+
+
+class FlopReportRequest(BaseModel):
+    """翻牌面纹理报告请求"""
+    hands: List[str] = Field(..., description="英雄手牌列表", example=["AA", "KK", "AKs"])
+    villain_hands: Optional[List[str]] = Field(None, description="对手手牌列表（可选，提供时计算胜率）")
+    runouts: int = Field(24, ge=1, le=1081, description="每个翻牌采样的转牌+河牌数量")
+    include_flops: bool = Field(False, description="是否返回每个翻牌的明细")
+
+
+class FlopTextureBucket(BaseModel):
+    """纹理分组汇总"""
+    texture: str = Field(..., description="纹理分组: all, paired, monotone, two_tone, rainbow, connected, high_card, low_card")
+    flops: int = Field(..., description="分组内的翻牌类别数")
+    frequency: float = Field(..., description="分组在所有翻牌中出现的频率")
+    hit_rates: Dict[str, float] = Field(..., description="各击中分类的比例")
+    equity: Optional[float] = Field(None, description="对抗对手范围的平均胜率")
+
+
+class FlopReportEntry(BaseModel):
+    """单个翻牌的结果"""
+    board: str = Field(..., description="代表翻牌", example="AsKd7c")
+    textures: List[str] = Field(..., description="所属纹理分组")
+    weight: int = Field(..., description="该类别对应的原始翻牌数")
+    hit_rates: Dict[str, float] = Field(..., description="各击中分类的比例")
+    equity: Optional[float] = Field(None, description="对抗对手范围的胜率")
+
+
+class FlopReportResponse(BaseModel):
+    """翻牌面纹理报告响应"""
+    range_key: str = Field(..., description="范围的规范哈希")
+    buckets: List[FlopTextureBucket] = Field(..., description="按纹理分组的汇总")
+    flops: Optional[List[FlopReportEntry]] = Field(None, description="每个翻牌的明细")
+
+
+class EquitySessionCreateRequest(BaseModel):
+    """创建增量胜率会话请求"""
+    hands: List[str] = Field(default_factory=list, description="英雄初始手牌列表", example=["AA", "KK", "AKs"])
+    villain_hands: List[str] = Field(..., description="对手手牌列表", example=["QQ", "JJ", "AQs"])
+    board: Optional[str] = Field(None, description="公共牌（可选）", example="AhKd7c")
+    samples: int = Field(1500, ge=100, le=20000, description="补全公共牌的采样次数")
+
+
+class EquitySessionUpdateRequest(BaseModel):
+    """增量胜率更新请求"""
+    add: List[str] = Field(default_factory=list, description="新增的手牌", example=["AKs"])
+    remove: List[str] = Field(default_factory=list, description="移除的手牌", example=["T9o"])
+
+
+class EquitySessionResponse(BaseModel):
+    """增量胜率会话响应"""
+    session_id: str = Field(..., description="会话 ID")
+    equity: float = Field(..., description="英雄范围对抗对手范围的胜率")
+    total_combinations: int = Field(..., description="英雄范围的总组合数")
+    class_equities: Dict[str, Optional[float]] = Field(default_factory=dict, description="本次变化（加入或移出）的手牌类别各自的胜率")
+    expires_in: int = Field(..., description="会话剩余有效时间（秒）")
+
+
+class MultiwayEquityRequest(BaseModel):
+    """多人底池胜率请求"""
+    ranges: List[List[str]] = Field(..., min_length=2, max_length=6, description="每位玩家的手牌列表（2-6 人）", example=[["AA", "KK"], ["QQ", "AKs"], ["76s", "65s"]])
+    board: Optional[str] = Field(None, description="公共牌（可选）", example="Ah7d2c")
+    target_std_error: float = Field(0.005, gt=0, le=0.1, description="目标标准误差，所有玩家都达到后停止采样")
+    max_samples: int = Field(500000, ge=1000, le=5000000, description="最大有效样本数")
+
+
+class MultiwayPlayerEquity(BaseModel):
+    """单个玩家的多人胜率"""
+    hands: List[str] = Field(..., description="规范化后的手牌列表")
+    equity: float = Field(..., description="胜率（平局按人数平分）")
+    std_error: float = Field(..., description="胜率的标准误差")
+
+
+class MultiwayEquityResponse(BaseModel):
+    """多人底池胜率响应"""
+    players: List[MultiwayPlayerEquity] = Field(..., description="每位玩家的胜率")
+    samples: int = Field(..., description="实际使用的有效样本数")
+    std_error: float = Field(..., description="所有玩家中最大的标准误差")
+    converged: bool = Field(..., description="是否达到目标标准误差")
+    elapsed_ms: float = Field(..., description="计算耗时（毫秒）")
+
+
+class EquityHeatmapRequest(BaseModel):
+    """手牌矩阵胜率热力图请求"""
+    villain_hands: List[str] = Field(..., min_length=1, description="对手的手牌列表", example=["AA", "KK", "QQ", "AKs", "AKo"])
+    board: Optional[str] = Field(None, description="公共牌（可选，3-5 张）", example="Ah7d2c")
+    samples: int = Field(600, ge=64, le=5000, description="翻牌时采样的转牌+河牌数量（转牌、河牌精确计算）")
+
+
+class EquityHeatmapResponse(BaseModel):
+    """手牌矩阵胜率热力图响应"""
+    encoding: str = Field("float32-le-base64", description="equity 的编码：169 个小端 float32 的 base64")
+    equity: str = Field(..., description="按矩阵行优先顺序（与 HandMatrix 一致）的 169 个类别胜率，与公共牌冲突的类别为 NaN")
+    elapsed_ms: float = Field(..., description="计算耗时（毫秒）")
+
+
+class EquityDistributionRequest(BaseModel):
+    """胜率分布请求"""
+    hero_hands: List[str] = Field(..., min_length=1, description="英雄的手牌列表", example=["AA", "KK", "AKs", "76s", "A5s"])
+    villain_hands: List[str] = Field(..., min_length=1, description="对手的手牌列表", example=["QQ", "JJ", "AQs", "KQs"])
+    board: Optional[str] = Field(None, description="公共牌（可选，3-5 张）", example="Kh7d2c")
+    bins: int = Field(20, ge=5, le=100, description="直方图分箱数")
+    samples: int = Field(600, ge=64, le=5000, description="翻牌时采样的转牌+河牌数量（转牌、河牌精确计算）")
+
+
+class EquityDistributionResponse(BaseModel):
+    """胜率分布响应"""
+    equity: float = Field(..., description="英雄范围的整体胜率")
+    combos: List[str] = Field(..., description="英雄范围的组合（按胜率从高到低）")
+    equities: List[float] = Field(..., description="与 combos 对应的组合胜率")
+    histogram: List[float] = Field(..., description="每个分箱的组合占比")
+    bin_edges: List[float] = Field(..., description="分箱边界（bins + 1 个）")
+    stats: Optional[EquityDistributionStats] = Field(None, description="分布形状统计")
+    elapsed_ms: float = Field(..., description="计算耗时（毫秒）")
+
+
+class RiverSolveRequest(BaseModel):
+    """河牌子博弈求解请求"""
+    oop_hands: List[str] = Field(..., min_length=1, description="先行动玩家（OOP）的手牌列表", example=["AA", "KK", "AKs", "QJs"])
+    ip_hands: List[str] = Field(..., min_length=1, description="后行动玩家（IP）的手牌列表", example=["QQ", "JJ", "AQo", "KQs"])
+    board: str = Field(..., description="5 张公共牌", example="Ks7d4c2h3s")
+    pot: float = Field(..., gt=0, description="河牌开始时的底池", example=20)
+    effective_stack: float = Field(..., ge=0, description="河牌开始时的有效筹码", example=80)
+    oop_bet_sizes: List[float] = Field([0.33, 0.75], max_length=4, description="OOP 下注尺度（底池比例）")
+    ip_bet_sizes: List[float] = Field([0.33, 0.75], max_length=4, description="IP 下注尺度（底池比例）")
+    raise_sizes: List[float] = Field([1.0], max_length=3, description="加注尺度（跟注后底池的比例）")
+    max_raises: int = Field(1, ge=0, le=3, description="每条下注线上最多的加注次数")
+    allin: bool = Field(True, description="是否加入全下选项")
+    max_iterations: int = Field(1000, ge=1, le=5000, description="最大迭代次数")
+    target_exploitability: float = Field(0.5, gt=0, le=100, description="目标可利用度（占底池的百分比），达到后停止迭代")
+    include_combos: bool = Field(True, description="是否返回每个组合的策略")
+
+
+class RiverSolveNode(BaseModel):
+    """河牌博弈树的决策节点"""
+    path: str = Field(..., description="到达该节点的动作序列，根节点为 root")
+    player: str = Field(..., description="行动玩家: oop 或 ip")
+    pot: float = Field(..., description="当前底池（含河牌下注）")
+    to_call: float = Field(..., description="需要跟注的筹码")
+    actions: List[str] = Field(..., description="可选动作")
+    frequencies: List[float] = Field(..., description="整个范围的动作频率（按到达概率加权）")
+    strategy: Optional[Dict[str, List[float]]] = Field(None, description="组合 -> 每个动作的频率")
+
+
+class RiverSolveEV(BaseModel):
+    """玩家的期望收益（以河牌开始时的筹码计）"""
+    total: float = Field(..., description="整个范围的期望收益")
+    combos: Dict[str, float] = Field(..., description="组合 -> 期望收益")
+
+
+class RiverSolveResponse(BaseModel):
+    """河牌子博弈求解响应"""
+    nodes: List[RiverSolveNode] = Field(..., description="决策节点（深度优先顺序）")
+    ev: Dict[str, RiverSolveEV] = Field(..., description="oop / ip 的期望收益")
+    iterations: int = Field(..., description="迭代次数")
+    exploitability: float = Field(..., description="可利用度（占底池的百分比）")
+    decision_nodes: int = Field(..., description="决策节点数")
+    elapsed_ms: float = Field(..., description="求解耗时（毫秒）")
+
+
+class PushFoldRequest(BaseModel):
+    """全下/弃牌求解请求"""
+    stack_depth: float = Field(..., gt=0, le=100, description="有效筹码（bb，包含盲注）", example=10)
+    players: int = Field(2, ge=2, le=9, description="座位数")
+    ante: float = Field(0.0, ge=0, description="每人前注（bb）")
+    small_blind: float = Field(0.5, gt=0, description="小盲（bb）")
+    big_blind: float = Field(1.0, gt=0, description="大盲（bb）")
+
+
+class PushFoldChart(BaseModel):
+    """全下或跟注图表"""
+    hands: List[str] = Field(..., description="频率不低于 50% 的手牌")
+    percent: float = Field(..., description="范围占全部组合的百分比")
+    frequencies: Dict[str, float] = Field(..., description="每个手牌类别的频率（只包含非零项）")
+
+
+class PushFoldSeat(BaseModel):
+    """单个座位的全下图表和后面座位的跟注图表"""
+    position: str = Field(..., description="全下的位置")
+    push: PushFoldChart = Field(..., description="前面都弃牌时的全下范围")
+    calls: Dict[str, PushFoldChart] = Field(..., description="后面每个位置面对该全下的跟注范围")
+
+
+class PushFoldResponse(BaseModel):
+    """全下/弃牌求解响应"""
+    stack_depth: float = Field(..., description="有效筹码（bb）")
+    players: int = Field(..., description="座位数")
+    ante: float = Field(..., description="每人前注（bb）")
+    iterations: int = Field(..., description="迭代次数")
+    exploitability: float = Field(..., description="可被利用度（bb/手）")
+    converged: bool = Field(..., description="是否在迭代上限内收敛（可被利用度低于阈值）")
+    seats: List[PushFoldSeat] = Field(..., description="每个座位的图表")
+
+
+# 全下/弃牌扫描一次最多的筹码深度数
+MAX_SWEEP_STACKS = 100
+
+
+class PushFoldSweepRequest(BaseModel):
+    """全下/弃牌筹码深度扫描请求"""
+    players: int = Field(2, ge=2, le=9, description="座位数")
+    ante: float = Field(0.0, ge=0, description="每人前注（bb）")
+    min_stack: float = Field(1.0, ge=1, description="最小筹码深度（bb）")
+    max_stack: float = Field(25.0, le=100, description="最大筹码深度（bb）")
+    step: float = Field(1.0, ge=0.5, description="步长（bb）")
+
+    @model_validator(mode="after")
+    def check_stack_range(self) -> "PushFoldSweepRequest":
+        """同步接口和作业共用：筹码深度范围有效，且一次最多扫描约 100 个筹码深度"""
+        if self.max_stack < self.min_stack:
+            raise ValueError("最大筹码深度不能小于最小筹码深度")
+        if (self.max_stack - self.min_stack) / self.step > MAX_SWEEP_STACKS:
+            raise ValueError(f"一次最多扫描 {MAX_SWEEP_STACKS} 个筹码深度")
+        return self
+
+
+class PushFoldSweepResponse(BaseModel):
+    """全下/弃牌筹码深度扫描响应"""
+    results: List[PushFoldResponse] = Field(..., description="每个筹码深度的求解结果")
+
+
+class ObservedPositionRange(BaseModel):
+    """玩家在某个位置上根据手牌历史观察到的范围"""
+    hands: int = Field(..., description="该位置的手数")
+    vpip: float = Field(..., description="主动入池率（%）")
+    pfr: float = Field(..., description="翻前加注率（%）")
+    vpip_range: List[str] = Field(..., description="按 VPIP 比例取前 X% 的手牌")
+    pfr_range: List[str] = Field(..., description="按 PFR 比例取前 X% 的手牌")
+    showdown_hands: List[str] = Field(..., description="摊牌时出现过的手牌")
+    showdown_counts: Dict[str, int] = Field(..., description="每个摊牌手牌出现的次数")
+    observed_vpip_hands: List[str] = Field(..., description="已知底牌且主动入池的手牌")
+
+
+class ObservedRangesResponse(BaseModel):
+    """玩家观察范围响应"""
+    player: str = Field(..., description="玩家名")
+    positions: Dict[str, ObservedPositionRange] = Field(..., description="位置 -> 观察范围")
+
+
+class JobCreateRequest(BaseModel):
+    """异步作业提交请求"""
+    kind: Literal["flop_report", "push_fold_sweep", "multiway_equity"] = Field(..., description="作业类型")
+    params: Dict[str, Any] = Field(default_factory=dict, description="作业参数，与对应同步接口的请求体相同")
+
+
+class JobStatusResponse(BaseModel):
+    """异步作业状态"""
+    job_id: str = Field(..., description="作业 ID")
+    kind: str = Field(..., description="作业类型")
+    status: str = Field(..., description="状态: queued, running, completed, failed, cancelled")
+    progress: float = Field(..., description="进度（0-1）")
+    done: int = Field(..., description="已完成的步骤数")
+    total: int = Field(..., description="总步骤数（未知时为 0）")
+    error: Optional[str] = Field(None, description="失败原因")
+    created_at: datetime = Field(..., description="提交时间")
+    started_at: Optional[datetime] = Field(None, description="开始运行时间")
+    finished_at: Optional[datetime] = Field(None, description="结束时间")
+
+
+class JobResultResponse(BaseModel):
+    """异步作业结果"""
+    job_id: str = Field(..., description="作业 ID")
+    kind: str = Field(..., description="作业类型")
+    result: Dict[str, Any] = Field(..., description="结果，与对应同步接口的响应体相同")
+
+
+class LibraryRangeCreate(BaseModel):
+    """范围库中新增的范围（兼容前端导出的范围文件，多余字段会被忽略）"""
+    name: str = Field(..., min_length=1, max_length=200, description="范围名称")
+    hands: List[str] = Field(..., min_length=1, description="手牌列表", example=["AA", "KK", "AKs"])
+    position: Optional[str] = Field(None, description="位置", example="BTN")
+    scenario: Optional[str] = Field(None, description="场景", example="open")
+    tags: List[str] = Field(default_factory=list, description="标签")
+
+
+class LibraryImportRequest(BaseModel):
+    """范围库批量导入请求"""
+    ranges: List[LibraryRangeCreate] = Field(..., min_length=1, max_length=100000, description="要导入的范围")
+
+
+class LibraryImportResponse(BaseModel):
+    """范围库批量导入响应"""
+    imported: int = Field(..., description="导入的范围数")
+    ids: List[str] = Field(..., description="新范围的 ID（与请求顺序一致）")
+
+
+class LibraryRange(BaseModel):
+    """范围库中的范围"""
+    id: str = Field(..., description="范围 ID")
+    name: str = Field(..., description="范围名称")
+    hands: List[str] = Field(..., description="手牌列表（规范化）")
+    position: Optional[str] = Field(None, description="位置")
+    scenario: Optional[str] = Field(None, description="场景")
+    tags: List[str] = Field(default_factory=list, description="标签")
+    total_combinations: int = Field(..., description="总组合数")
+    created_at: datetime = Field(..., description="添加时间")
+
+
+class LibraryListResponse(BaseModel):
+    """范围库列表响应"""
+    total: int = Field(..., description="符合条件的范围总数")
+    ranges: List[LibraryRange] = Field(..., description="当前页的范围")
+
+
+class LibrarySearchRequest(BaseModel):
+    """相似范围检索请求（hands 和 range_id 二选一）"""
+    hands: Optional[List[str]] = Field(None, description="查询范围的手牌列表")
+    range_id: Optional[str] = Field(None, description="以范围库中的范围作为查询（结果不包含它自身）")
+    metric: Literal["jaccard", "equity"] = Field("jaccard", description="相似度: jaccard（按组合加权的重合度）或 equity（胜率画像）")
+    position: Optional[str] = Field(None, description="只检索该位置的范围")
+    scenario: Optional[str] = Field(None, description="只检索该场景的范围")
+    tags: List[str] = Field(default_factory=list, description="只检索包含全部这些标签的范围")
+    limit: int = Field(10, ge=1, le=100, description="返回数量")
+
+
+class LibrarySearchMatch(BaseModel):
+    """相似范围"""
+    range: LibraryRange = Field(..., description="范围")
+    similarity: float = Field(..., description="相似度（0-1）")
+
+
+class LibrarySearchResponse(BaseModel):
+    """相似范围检索响应"""
+    metric: str = Field(..., description="相似度")
+    matches: List[LibrarySearchMatch] = Field(..., description="按相似度从高到低排列")
+    elapsed_ms: float = Field(..., description="检索耗时（毫秒）")
@@ -20,6 +20,21 @@ router = APIRouter(prefix="/chat", tags=["chat"])
 conversations = {}
 
 
+def save_turn(conversation_id: str, history: list, message: str, reply: str):
+    """
+    保存一轮对话（只保留最近 20 条消息）
+    
+    Args:
+        conversation_id: 对话 ID
+        history: 本轮开始前的对话历史
+        message: 用户消息
+        reply: AI 回复
+    """
+    history.append({"role": "user", "content": message})
+    history.append({"role": "assistant", "content": reply})
+    conversations[conversation_id] = history[-20:]
+
+
 @router.post("/", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """
@@ -52,9 +67,7 @@ async def chat(request: ChatRequest):
         )
         
         # 更新对话历史
-        history.append({"role": "user", "content": request.message})
-        history.append({"role": "assistant", "content": reply})
-        conversations[conversation_id] = history[-20:]  # 保留最近20条
+        save_turn(conversation_id, history, request.message, reply)
         
         return ChatResponse(
             reply=reply,
@@ -108,9 +121,7 @@ async def chat_stream(request: ChatRequest):
                 await asyncio.sleep(0.01)  # 小延迟使流式效果更明显
             
             # 更新对话历史
-            history.append({"role": "user", "content": request.message})
-            history.append({"role": "assistant", "content": full_reply})
-            conversations[conversation_id] = history[-20:]
+            save_turn(conversation_id, history, request.message, full_reply)
             
             # 发送完成信号
             yield f"data: {json.dumps({'type': 'done', 'timestamp': datetime.now().isoformat()})}\n\n"
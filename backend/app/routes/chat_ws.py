@@ -0,0 +1,220 @@
+"""
+WebSocket 聊天路由
+一个连接上可以同时进行多个对话（按 conversation_id 区分），
+每个对话独立取消，并通过 credit 帧做流量控制
+
+客户端 -> 服务端（JSON 文本帧）:
+    {"type": "chat", "ref": "可选，客户端自定义", "conversation_id": "可选", "message": "...", "range_context": {...}}
+    {"type": "cancel", "conversation_id": "..."}
+    {"type": "credit", "conversation_id": "...", "chunks": 32}
+    {"type": "ping"}
+
+服务端 -> 客户端:
+    {"type": "conversation_id", "ref": "...", "conversation_id": "..."}
+    {"type": "content", "conversation_id": "...", "seq": 0, "content": "..."}
+    {"type": "done", "conversation_id": "...", "timestamp": "..."}
+    {"type": "cancelled", "conversation_id": "..."}
+    {"type": "error", "conversation_id": "...", "error": "..."}
+    {"type": "pong"}
+"""
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from ..models.schemas import ChatRequest
+from ..services.poker_agent import poker_agent
+from ..services.llm_service import llm_service
+from ..config.settings import settings
+from .chat import conversations, save_turn
+from datetime import datetime
+from typing import Dict, Optional
+import logging
+import uuid
+import json
+import asyncio
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/chat", tags=["chat"])
+
+
+class _Stream:
+    """单个对话的流式回复状态"""
+
+    def __init__(self, credit: int):
+        self.task: Optional[asyncio.Task] = None
+        self.credit = credit
+        self.credit_granted = asyncio.Event()
+
+    def grant(self, chunks: int):
+        """追加可发送的内容帧数"""
+        self.credit += chunks
+        self.credit_granted.set()
+
+    async def acquire(self):
+        """等待并消耗一个内容帧额度"""
+        while self.credit <= 0:
+            self.credit_granted.clear()
+            await self.credit_granted.wait()
+        self.credit -= 1
+
+
+class ChatConnection:
+    """一个 WebSocket 连接上的所有对话"""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.streams: Dict[str, _Stream] = {}
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, frame: dict):
+        """发送一帧（多个对话共用连接，需要串行写入）"""
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(frame, ensure_ascii=False))
+
+    async def error(self, error: str, conversation_id: Optional[str] = None):
+        await self.send({"type": "error", "conversation_id": conversation_id, "error": error})
+
+    async def handle(self, frame: dict):
+        """
+        处理客户端发来的一帧
+
+        Args:
+            frame: 解析后的 JSON 帧
+        """
+        frame_type = frame.get("type")
+        conversation_id = frame.get("conversation_id")
+
+        if frame_type == "chat":
+            await self.start_chat(frame)
+        elif frame_type == "cancel":
+            stream = self.streams.get(conversation_id)
+            if stream is None:
+                await self.error("对话没有正在进行的回复", conversation_id)
+            else:
+                stream.task.cancel()
+        elif frame_type == "credit":
+            stream = self.streams.get(conversation_id)
+            chunks = frame.get("chunks")
+            if stream is not None and isinstance(chunks, int) and chunks > 0:
+                stream.grant(chunks)
+        elif frame_type == "ping":
+            await self.send({"type": "pong"})
+        else:
+            await self.error(f"未知的帧类型: {frame_type}", conversation_id)
+
+    async def start_chat(self, frame: dict):
+        """开始一轮对话（在独立任务中流式回复）"""
+        try:
+            request = ChatRequest(**{k: v for k, v in frame.items() if k in ChatRequest.model_fields})
+        except ValidationError as e:
+            await self.error(f"请求格式错误: {e.errors()[0]['msg']}", frame.get("conversation_id"))
+            return
+
+        if not llm_service.is_available():
+            await self.error("AI 服务当前不可用，请检查配置", request.conversation_id)
+            return
+
+        conversation_id = request.conversation_id or str(uuid.uuid4())
+        if conversation_id in self.streams:
+            await self.error("该对话正在回复中，请等待完成或先取消", conversation_id)
+            return
+        if len(self.streams) >= settings.ws_max_active_conversations:
+            await self.error("同时进行的对话过多", conversation_id)
+            return
+
+        stream = _Stream(credit=settings.ws_initial_credit)
+        self.streams[conversation_id] = stream
+        await self.send({"type": "conversation_id", "ref": frame.get("ref"), "conversation_id": conversation_id})
+        stream.task = asyncio.create_task(self.run_chat(conversation_id, request, stream))
+
+    async def run_chat(self, conversation_id: str, request: ChatRequest, stream: _Stream):
+        """
+        流式生成回复
+
+        额度用完时继续读取模型输出并合并到待发送缓冲区，
+        收到新的 credit 后一次性发出，避免模型连接因客户端慢而超时；
+        缓冲区达到 ws_max_pending_chars 后暂停读取，慢客户端占用的内存不超过这个上限
+        """
+        history = conversations.get(conversation_id, [])
+        full_reply = ""
+        pending = ""
+        seq = 0
+
+        async def flush():
+            nonlocal pending, seq
+            await self.send({"type": "content", "conversation_id": conversation_id, "seq": seq, "content": pending})
+            pending = ""
+            seq += 1
+
+        try:
+            async for chunk in poker_agent.chat_stream(
+                message=request.message,
+                conversation_history=history,
+                range_context=request.range_context
+            ):
+                full_reply += chunk
+                pending += chunk
+                if stream.credit > 0:
+                    stream.credit -= 1
+                    await flush()
+                elif len(pending) >= settings.ws_max_pending_chars:
+                    # 缓冲区已满：不再读取模型输出，等客户端追加额度
+                    await stream.acquire()
+                    await flush()
+
+            if pending:
+                await stream.acquire()
+                await flush()
+
+            save_turn(conversation_id, history, request.message, full_reply)
+            await self.send({"type": "done", "conversation_id": conversation_id, "timestamp": datetime.now().isoformat()})
+
+        except asyncio.CancelledError:
+            # 客户端取消或连接断开：不保存这一轮对话
+            if self.streams.get(conversation_id) is stream:
+                try:
+                    await self.send({"type": "cancelled", "conversation_id": conversation_id})
+                except Exception:
+                    pass
+            raise
+        except Exception as e:
+            logger.error(f"❌ WebSocket 聊天失败: {e}")
+            await self.error(str(e), conversation_id)
+        finally:
+            if self.streams.get(conversation_id) is stream:
+                del self.streams[conversation_id]
+
+    async def close(self):
+        """连接断开时取消所有进行中的对话"""
+        streams = list(self.streams.values())
+        self.streams.clear()
+        for stream in streams:
+            stream.task.cancel()
+        await asyncio.gather(*[stream.task for stream in streams], return_exceptions=True)
+
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket):
+    """
+    多路复用的 WebSocket 聊天
+
+    Args:
+        websocket: WebSocket 连接
+    """
+    await websocket.accept()
+    connection = ChatConnection(websocket)
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                frame = json.loads(text)
+            except ValueError:
+                await connection.error("帧必须是 JSON")
+                continue
+            if not isinstance(frame, dict):
+                await connection.error("帧必须是 JSON 对象")
+                continue
+            await connection.handle(frame)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await connection.close()
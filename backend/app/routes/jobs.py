@@ -0,0 +1,158 @@
+"""
+异步作业路由
+耗时的范围计算以作业方式提交，通过 SSE 获取进度，完成后获取结果
+"""
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from ..models.schemas import (
+    JobCreateRequest,
+    JobStatusResponse,
+    JobResultResponse,
+    FlopReportRequest,
+    PushFoldSweepRequest,
+    MultiwayEquityRequest
+)
+from ..services.jobs import job_service, JobLimitError, Job, COMPLETED
+from ..services.cards import parse_board
+from typing import Optional
+import logging
+import json
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/range/jobs", tags=["jobs"])
+
+# 作业类型 -> 参数模型（与对应的同步接口相同）
+JOB_PARAMS = {
+    "flop_report": FlopReportRequest,
+    "push_fold_sweep": PushFoldSweepRequest,
+    "multiway_equity": MultiwayEquityRequest,
+}
+
+
+def _user(x_user_id: Optional[str]) -> str:
+    return (x_user_id or "anonymous").strip() or "anonymous"
+
+
+def _get_job(job_id: str, x_user_id: Optional[str]) -> Job:
+    job = job_service.get(job_id, _user(x_user_id))
+    if job is None:
+        raise HTTPException(status_code=404, detail="作业不存在或已过期")
+    return job
+
+
+@router.post("", response_model=JobStatusResponse, status_code=202)
+async def create_job(request: JobCreateRequest, x_user_id: Optional[str] = Header(None)):
+    """
+    提交异步作业
+    
+    Args:
+        request: 作业类型和参数
+        x_user_id: 用户标识（请求头 X-User-Id，用于并发限制和访问隔离）
+    
+    Returns:
+        作业状态（包含作业 ID）
+    """
+    try:
+        params = JOB_PARAMS[request.kind](**request.params)
+        if request.kind == "multiway_equity":
+            parse_board(params.board)
+    except ValidationError as e:
+        # 模型校验器的错误上下文中带有异常对象，不能序列化为 JSON
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        job = job_service.submit(_user(x_user_id), request.kind, params.model_dump())
+    except JobLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    
+    logger.info(f"📋 作业已提交: {job.kind} {job.job_id}")
+    return JobStatusResponse(**job.snapshot())
+
+
+@router.get("/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str, x_user_id: Optional[str] = Header(None)):
+    """
+    获取作业状态
+    
+    Args:
+        job_id: 作业 ID
+        x_user_id: 用户标识
+    
+    Returns:
+        作业状态和进度
+    """
+    return JobStatusResponse(**_get_job(job_id, x_user_id).snapshot())
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str, x_user_id: Optional[str] = Header(None)):
+    """
+    作业进度流（SSE），作业结束后关闭
+    
+    Args:
+        job_id: 作业 ID
+        x_user_id: 用户标识
+    
+    Returns:
+        SSE 流式响应
+    """
+    job = _get_job(job_id, x_user_id)
+    
+    async def generate():
+        async for snapshot in job_service.events(job):
+            if snapshot is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"data: {json.dumps({'type': 'status', **snapshot}, default=str)}\n\n"
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@router.get("/{job_id}/result", response_model=JobResultResponse)
+async def get_job_result(job_id: str, x_user_id: Optional[str] = Header(None)):
+    """
+    获取作业结果
+    
+    Args:
+        job_id: 作业 ID
+        x_user_id: 用户标识
+    
+    Returns:
+        作业结果；作业未完成时返回 409
+    """
+    job = _get_job(job_id, x_user_id)
+    if job.status != COMPLETED:
+        detail = f"作业状态为 {job.status}" + (f": {job.error}" if job.error else "")
+        raise HTTPException(status_code=409, detail=detail)
+    
+    return JobResultResponse(job_id=job.job_id, kind=job.kind, result=job.result)
+
+
+@router.delete("/{job_id}")
+async def delete_job(job_id: str, x_user_id: Optional[str] = Header(None)):
+    """
+    取消并删除作业（运行中的作业会立即终止子进程）
+    
+    Args:
+        job_id: 作业 ID
+        x_user_id: 用户标识
+    
+    Returns:
+        成功消息
+    """
+    job = _get_job(job_id, x_user_id)
+    cancelled = not job.finished
+    await job_service.delete(job)
+    return {"message": "作业已取消" if cancelled else "作业已删除"}
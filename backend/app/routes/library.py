@@ -0,0 +1,183 @@
+"""
+范围库路由
+服务端保存的范围：批量导入、按位置/场景/标签筛选、相似范围检索
+"""
+from fastapi import APIRouter, HTTPException, Query
+from ..models.schemas import (
+    LibraryRangeCreate,
+    LibraryImportRequest,
+    LibraryImportResponse,
+    LibraryRange,
+    LibraryListResponse,
+    LibrarySearchRequest,
+    LibrarySearchMatch,
+    LibrarySearchResponse
+)
+from ..services.range_library import range_library_service
+from typing import List, Optional
+import logging
+import asyncio
+import time
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/range/library", tags=["library"])
+
+
+@router.post("", response_model=LibraryRange, status_code=201)
+async def create_library_range(request: LibraryRangeCreate):
+    """
+    向范围库添加一个范围
+
+    Args:
+        request: 范围
+
+    Returns:
+        保存后的范围
+    """
+    try:
+        ids = await asyncio.to_thread(range_library_service.add_many, [request.model_dump()])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ 保存范围失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    library_range = await asyncio.to_thread(range_library_service.get, ids[0])
+    return LibraryRange(**library_range.to_dict())
+
+
+@router.post("/import", response_model=LibraryImportResponse, status_code=201)
+async def import_library_ranges(request: LibraryImportRequest):
+    """
+    批量导入范围（单个事务，任何一个范围无效时整体不导入）
+
+    Args:
+        request: 范围列表（可以直接使用前端导出的范围文件内容）
+
+    Returns:
+        导入数量和新范围的 ID
+    """
+    try:
+        ids = await asyncio.to_thread(
+            range_library_service.add_many, [r.model_dump() for r in request.ranges]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ 导入范围失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    logger.info(f"📚 已导入 {len(ids)} 个范围")
+    return LibraryImportResponse(imported=len(ids), ids=ids)
+
+
+@router.get("", response_model=LibraryListResponse)
+async def list_library_ranges(
+    position: Optional[str] = None,
+    scenario: Optional[str] = None,
+    tag: List[str] = Query(default_factory=list),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0)
+):
+    """
+    按位置、场景和标签筛选范围（按添加时间从新到旧）
+
+    Args:
+        position: 位置
+        scenario: 场景
+        tag: 标签（可重复，要求包含全部标签）
+        limit: 每页数量
+        offset: 偏移
+
+    Returns:
+        总数和当前页的范围
+    """
+    total, ranges = await asyncio.to_thread(
+        range_library_service.list_ranges, position, scenario, tag, limit, offset
+    )
+    return LibraryListResponse(total=total, ranges=[LibraryRange(**r.to_dict()) for r in ranges])
+
+
+@router.get("/{range_id}", response_model=LibraryRange)
+async def get_library_range(range_id: str):
+    """
+    获取范围
+
+    Args:
+        range_id: 范围 ID
+
+    Returns:
+        范围
+    """
+    library_range = await asyncio.to_thread(range_library_service.get, range_id)
+    if library_range is None:
+        raise HTTPException(status_code=404, detail="范围不存在")
+    return LibraryRange(**library_range.to_dict())
+
+
+@router.delete("/{range_id}")
+async def delete_library_range(range_id: str):
+    """
+    删除范围
+
+    Args:
+        range_id: 范围 ID
+
+    Returns:
+        成功消息
+    """
+    if not await asyncio.to_thread(range_library_service.delete, range_id):
+        raise HTTPException(status_code=404, detail="范围不存在")
+    return {"message": "范围已删除"}
+
+
+@router.post("/search", response_model=LibrarySearchResponse)
+async def search_library_ranges(request: LibrarySearchRequest):
+    """
+    检索相似范围
+
+    - jaccard: 按组合加权的重合度（组合位图 popcount）
+    - equity: 各类手牌对抗两个范围的翻前胜率越接近越相似
+
+    Args:
+        request: 查询范围、相似度和筛选条件
+
+    Returns:
+        最相似的范围
+    """
+    hands = request.hands
+    if request.range_id:
+        library_range = await asyncio.to_thread(range_library_service.get, request.range_id)
+        if library_range is None:
+            raise HTTPException(status_code=404, detail="范围不存在")
+        hands = library_range.hands
+    if not hands:
+        raise HTTPException(status_code=400, detail="请提供 hands 或 range_id")
+
+    started = time.perf_counter()
+    try:
+        matches = await asyncio.to_thread(
+            range_library_service.search,
+            hands,
+            request.metric,
+            request.position,
+            request.scenario,
+            request.tags,
+            request.limit,
+            request.range_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ 范围检索失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return LibrarySearchResponse(
+        metric=request.metric,
+        matches=[
+            LibrarySearchMatch(range=LibraryRange(**r.to_dict()), similarity=similarity)
+            for r, similarity in matches
+        ],
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2)
+    )
@@ -0,0 +1,101 @@
+"""
+性能剖析路由（settings.profiling_enabled 开启后可用）
+查询请求剖析结果、对当前 worker 进行采样剖析
+"""
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from ..config.settings import settings
+from ..services.profiling import collapsed, profile_key, sample_stacks
+from ..services.result_store import result_store
+from typing import Optional
+import asyncio
+import logging
+import os
+import secrets
+
+logger = logging.getLogger(__name__)
+
+
+def require_profiling(x_admin_token: Optional[str] = Header(None)):
+    """
+    剖析未开启时按不存在处理；开启时必须配置管理令牌并校验 X-Admin-Token
+    （接口会暴露调用栈和文件路径，采样还会占用线程，未配置令牌时一律拒绝）
+    """
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="性能剖析未开启")
+    if not settings.profiling_admin_token:
+        raise HTTPException(status_code=403, detail="未配置管理令牌（PROFILING_ADMIN_TOKEN），剖析接口不可用")
+    if not secrets.compare_digest(x_admin_token or "", settings.profiling_admin_token):
+        raise HTTPException(status_code=403, detail="管理令牌无效")
+
+
+router = APIRouter(prefix="/admin/profiling", tags=["profiling"], dependencies=[Depends(require_profiling)])
+
+
+@router.get("/profiles")
+async def list_profiles(limit: int = Query(20, ge=1, le=200)):
+    """
+    最近的请求剖析
+
+    Args:
+        limit: 最大条数
+
+    Returns:
+        剖析 ID 和请求路径（从新到旧）
+    """
+    entries = await asyncio.to_thread(lambda: list(result_store.recent("request_profile", limit)))
+    return {"profiles": [params for _, params in entries]}
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """
+    获取请求剖析结果（X-Profile-Id 响应头中的 ID）
+
+    Args:
+        profile_id: 剖析 ID
+
+    Returns:
+        各阶段耗时和 cProfile 函数统计
+    """
+    profile, _ = await asyncio.to_thread(result_store.get, profile_key(profile_id))
+    if profile is None:
+        raise HTTPException(status_code=404, detail="剖析结果不存在或已过期")
+    return profile
+
+
+@router.post("/sample", response_class=PlainTextResponse)
+async def sample_profile(
+    seconds: float = Query(5.0, gt=0),
+    interval_ms: float = Query(10.0, ge=1, le=1000)
+):
+    """
+    采样剖析当前 worker 进程
+
+    在后台线程中按固定间隔采集所有线程（包括事件循环）的调用栈，
+    返回折叠栈文本，可直接交给 flamegraph.pl 或 speedscope
+
+    Args:
+        seconds: 采样时长
+        interval_ms: 采样间隔（毫秒）
+
+    Returns:
+        折叠栈（每行“线程;根帧;...;叶帧 次数”）
+    """
+    if seconds > settings.profiling_max_sample_seconds:
+        raise HTTPException(
+            status_code=400,
+            detail=f"采样时长不能超过 {settings.profiling_max_sample_seconds} 秒"
+        )
+
+    try:
+        stacks = await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    samples = sum(stacks.values())
+    logger.info(f"⏱️  采样剖析完成: {seconds}s, {samples} 个样本")
+    return PlainTextResponse(
+        collapsed(stacks),
+        headers={"X-Samples": str(samples), "X-Worker-Pid": str(os.getpid())}
+    )
@@ -1,21 +1,132 @@
 """
 范围分析相关路由
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from ..models.schemas import (
     RangeAnalysisRequest, 
     RangeAnalysisResponse,
+    RangeMetrics,
     RangeRecommendationRequest,
-    RangeRecommendationResponse
+    RangeRecommendationResponse,
+    FlopReportRequest,
+    FlopReportResponse,
+    EquitySessionCreateRequest,
+    EquitySessionUpdateRequest,
+    EquitySessionResponse,
+    MultiwayEquityRequest,
+    MultiwayEquityResponse,
+    PushFoldRequest,
+    PushFoldResponse,
+    PushFoldSweepRequest,
+    PushFoldSweepResponse,
+    ObservedRangesResponse,
+    RiverSolveRequest,
+    RiverSolveResponse,
+    EquityHeatmapRequest,
+    EquityHeatmapResponse,
+    EquityDistributionRequest,
+    EquityDistributionResponse
 )
 from ..services.poker_agent import poker_agent
 from ..services.llm_service import llm_service
+from ..services.flop_texture import flop_texture_service
+from ..services.equity_session import equity_session_service, EquitySession
+from ..services.multiway_equity import multiway_equity, prepare_ranges
+from ..services.compute_pool import run_in_pool
+from ..services.push_fold import (
+    push_fold_service,
+    parse_stack_depth,
+    seat_index,
+    MAX_STACK_DEPTH
+)
+from ..services.hand_history import observed_range_service
+from ..services.river_solver import solve_river
+from ..services.equity_heatmap import equity_heatmap_service
+from ..services.equity_distribution import equity_distribution_service
+from ..services.range_metrics import range_metrics, metrics_prompt
+from ..services.profiling import span
+from ..services.result_store import result_key, result_store
+from ..services.cards import canonical_hands, parse_board
+from ..config.settings import settings
+from datetime import datetime
+from typing import Optional
 import logging
+import json
+import asyncio
+import base64
+import time
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/range", tags=["range"])
 
+# 提示中的固定指令放在最前面，随请求变化的数据放在最后，便于命中提供商的提示缓存
+ANALYZE_INSTRUCTIONS = """请分析下面的手牌范围，从以下方面进行分析：
+1. 范围的紧松程度评估
+2. 范围的平衡性（价值牌和诈唬牌的比例）
+3. 针对不同对手风格的适用性
+4. 具体的改进建议（请给出3-5条）
+
+请用专业但易懂的语言回答。"""
+
+RECOMMEND_INSTRUCTIONS = """请为下面的场景推荐合适的手牌范围，并提供：
+1. 推荐的具体手牌列表（使用标准格式，如 AA, KK, AKs, AKo 等）
+2. 预期的范围概率
+3. 详细的推荐理由
+4. 使用注意事项
+
+请在回答的第一行用【手牌】标记列出所有推荐手牌，用逗号分隔。
+例如：【手牌】AA, KK, QQ, AKs, AKo"""
+
+
+# 同时生成的分析叙述数，超过时流式分析只返回确定性指标
+_narrative_slots = asyncio.Semaphore(settings.ai_analysis_max_streams)
+
+
+def build_analyze_prompt(request: RangeAnalysisRequest, metrics: dict) -> str:
+    """
+    构建范围分析提示（固定指令在前，范围数据和计算好的指标在后）
+    
+    Args:
+        request: 范围分析请求
+        metrics: range_metrics 的结果
+    
+    Returns:
+        提示文本
+    """
+    total_combinations = metrics["total_combinations"]
+    probability = (total_combinations / 1326) * 100
+    with span("prompt"):
+        return f"""{ANALYZE_INSTRUCTIONS}
+
+范围名称: {request.range_name}
+手牌列表: {', '.join(canonical_hands(request.hands))}
+位置: {request.position or '未指定'}
+场景: {request.scenario or '未指定'}
+总组合数: {total_combinations}
+出现概率: {probability:.2f}%
+{metrics_prompt(metrics)}"""
+
+
+def _analysis_store_params(prompt: str) -> dict:
+    """相同的提示和模型配置直接复用之前的分析（各 worker 和重启之间共享）"""
+    return {
+        "prompt": prompt,
+        "provider": llm_service.provider,
+        "temperature": settings.ai_temperature,
+        "max_tokens": settings.ai_max_tokens
+    }
+
+
+async def _store_analysis(store_key: str, store_params: dict, analysis: str):
+    await asyncio.to_thread(
+        lambda: result_store.put(
+            store_key, "range_analysis", store_params, {"analysis": analysis},
+            ttl_seconds=settings.result_store_analysis_ttl_seconds
+        )
+    )
+
 
 @router.post("/analyze", response_model=RangeAnalysisResponse)
 async def analyze_range(request: RangeAnalysisRequest):
@@ -35,33 +146,28 @@ async def analyze_range(request: RangeAnalysisRequest):
         )
     
     try:
-        # 计算概率和组合数
-        total_combinations = calculate_total_combinations(request.hands)
+        # 先计算确定性指标，AI 在这些数字的基础上解读
+        metrics = await asyncio.to_thread(range_metrics, request.hands)
+        total_combinations = metrics["total_combinations"]
         probability = (total_combinations / 1326) * 100
+        prompt = build_analyze_prompt(request, metrics)
         
-        # 构建分析提示
-        prompt = f"""请分析以下手牌范围：
-
-范围名称: {request.range_name}
-手牌列表: {', '.join(request.hands)}
-位置: {request.position or '未指定'}
-场景: {request.scenario or '未指定'}
-总组合数: {total_combinations}
-出现概率: {probability:.2f}%
-
-请从以下方面进行分析：
-1. 范围的紧松程度评估
-2. 范围的平衡性（价值牌和诈唬牌的比例）
-3. 针对不同对手风格的适用性
-4. 具体的改进建议（请给出3-5条）
-
-请用专业但易懂的语言回答。"""
-        
-        # 调用 AI
-        analysis = await llm_service.chat(
-            message=prompt,
-            system_prompt=llm_service.get_system_prompt()
-        )
+        store_params = _analysis_store_params(prompt)
+        store_key = result_key("range_analysis", store_params)
+        cached, _ = await asyncio.to_thread(result_store.get, store_key)
+        if cached is not None:
+            analysis = cached["analysis"]
+        else:
+            # 调用 AI（出错时抛出异常，错误不会被当作分析结果缓存）
+            try:
+                analysis = await llm_service.complete(
+                    message=prompt,
+                    system_prompt=llm_service.get_system_prompt()
+                )
+            except Exception as e:
+                logger.error(f"❌ AI 范围分析请求失败: {e}")
+                raise HTTPException(status_code=502, detail=f"AI 服务请求失败: {e}")
+            await _store_analysis(store_key, store_params, analysis)
         
         # 提取建议（简单的文本处理）
         suggestions = extract_suggestions(analysis)
@@ -70,14 +176,104 @@ async def analyze_range(request: RangeAnalysisRequest):
             analysis=analysis,
             suggestions=suggestions,
             probability=round(probability, 2),
-            total_combinations=total_combinations
+            total_combinations=total_combinations,
+            metrics=RangeMetrics(**metrics)
         )
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"❌ 范围分析失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/analyze/stream")
+async def analyze_range_stream(request: RangeAnalysisRequest):
+    """
+    分析手牌范围（两阶段流式响应）
+    
+    先立即发送 metrics 事件（确定性指标，不依赖 AI），
+    再以 content 事件流式发送 AI 分析，最后发送 suggestions 事件；
+    AI 不可用或繁忙时发送 narrative_unavailable 事件，指标照常返回
+    
+    Args:
+        request: 范围分析请求
+    
+    Returns:
+        SSE 流式响应
+    """
+    try:
+        metrics = await asyncio.to_thread(range_metrics, request.hands)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    def event(payload: dict) -> str:
+        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    
+    async def narrative():
+        prompt = build_analyze_prompt(request, metrics)
+        store_params = _analysis_store_params(prompt)
+        store_key = result_key("range_analysis", store_params)
+        cached, _ = await asyncio.to_thread(result_store.get, store_key)
+        if cached is not None:
+            analysis = cached["analysis"]
+            yield event({'type': 'content', 'content': analysis})
+        else:
+            chunks = []
+            try:
+                async for chunk in llm_service.complete_stream(
+                    message=prompt,
+                    system_prompt=llm_service.get_system_prompt()
+                ):
+                    chunks.append(chunk)
+                    yield event({'type': 'content', 'content': chunk})
+            except Exception as e:
+                # 出错或中途断开的回复不完整，不写入结果存储
+                logger.error(f"❌ AI 范围分析请求失败: {e}")
+                yield event({'type': 'narrative_unavailable', 'reason': f'AI 服务请求失败: {e}'})
+                return
+            analysis = "".join(chunks)
+            await _store_analysis(store_key, store_params, analysis)
+        yield event({'type': 'suggestions', 'suggestions': extract_suggestions(analysis)})
+    
+    async def generate():
+        total_combinations = metrics["total_combinations"]
+        yield event({
+            'type': 'metrics',
+            'total_combinations': total_combinations,
+            'probability': round(total_combinations / 1326 * 100, 2),
+            'metrics': metrics
+        })
+        
+        try:
+            if not llm_service.is_available():
+                yield event({'type': 'narrative_unavailable', 'reason': 'AI 服务当前不可用'})
+            elif _narrative_slots.locked():
+                yield event({'type': 'narrative_unavailable', 'reason': 'AI 服务繁忙，请稍后重试'})
+            else:
+                async with _narrative_slots:
+                    async for item in narrative():
+                        yield item
+            
+            yield event({'type': 'done', 'timestamp': datetime.now().isoformat()})
+            
+        except Exception as e:
+            logger.error(f"❌ 流式范围分析失败: {e}")
+            yield event({'type': 'error', 'error': str(e)})
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
 @router.post("/recommend", response_model=RangeRecommendationResponse)
 async def recommend_range(request: RangeRecommendationRequest):
     """
@@ -97,27 +293,17 @@ async def recommend_range(request: RangeRecommendationRequest):
     
     try:
         # 构建推荐提示
-        prompt = f"""请为以下场景推荐合适的手牌范围：
-
-位置: {request.position}
-场景: {request.scenario}
-对手风格: {request.opponent_style or '标准'}
-筹码深度: {request.stack_depth or '100bb'}
-
-请提供：
-1. 推荐的具体手牌列表（使用标准格式，如 AA, KK, AKs, AKo 等）
-2. 预期的范围概率
-3. 详细的推荐理由
-4. 使用注意事项
-
-请在回答的第一行用【手牌】标记列出所有推荐手牌，用逗号分隔。
-例如：【手牌】AA, KK, QQ, AKs, AKo"""
+        prompt = await build_recommend_prompt(request)
         
-        # 调用 AI
-        response = await llm_service.chat(
-            message=prompt,
-            system_prompt=llm_service.get_system_prompt()
-        )
+        # 调用 AI（出错时抛出异常，错误不会被当作推荐结果解析）
+        try:
+            response = await llm_service.complete(
+                message=prompt,
+                system_prompt=llm_service.get_system_prompt()
+            )
+        except Exception as e:
+            logger.error(f"❌ AI 范围推荐请求失败: {e}")
+            raise HTTPException(status_code=502, detail=f"AI 服务请求失败: {e}")
         
         # 提取手牌列表
         hands = extract_hands(response)
@@ -132,11 +318,508 @@ async def recommend_range(request: RangeRecommendationRequest):
             probability=round(probability, 2)
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ 范围推荐失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/recommend/stream")
+async def recommend_range_stream(request: RangeRecommendationRequest):
+    """
+    推荐手牌范围（流式响应）
+    
+    【手牌】行一完成就发送 hands 事件（手牌、组合数、概率），
+    之后以 content 事件流式发送推荐理由
+    
+    Args:
+        request: 范围推荐请求
+    
+    Returns:
+        SSE 流式响应
+    """
+    if not llm_service.is_available():
+        raise HTTPException(
+            status_code=503,
+            detail="AI 服务当前不可用，请检查配置"
+        )
+    
+    def hands_event(hands: list[str]) -> str:
+        total_combinations = calculate_total_combinations(hands)
+        probability = (total_combinations / 1326) * 100
+        return f"data: {json.dumps({'type': 'hands', 'hands': hands, 'total_combinations': total_combinations, 'probability': round(probability, 2)})}\n\n"
+    
+    def content_event(content: str) -> str:
+        return f"data: {json.dumps({'type': 'content', 'content': content})}\n\n"
+    
+    async def generate():
+        try:
+            prompt = await build_recommend_prompt(request)
+            parser = HandsLineParser()
+            
+            # 出错时抛出异常，以 error 事件结束，不把错误文本解析成手牌
+            async for chunk in llm_service.complete_stream(
+                message=prompt,
+                system_prompt=llm_service.get_system_prompt()
+            ):
+                content = parser.feed(chunk)
+                if parser.hands is not None and not parser.hands_sent:
+                    parser.hands_sent = True
+                    yield hands_event(parser.hands)
+                if content:
+                    yield content_event(content)
+            
+            # 回复结束仍未发送手牌时，按完整文本提取
+            content = parser.finish()
+            if not parser.hands_sent:
+                yield hands_event(parser.hands)
+            if content:
+                yield content_event(content)
+            
+            yield f"data: {json.dumps({'type': 'done', 'timestamp': datetime.now().isoformat()})}\n\n"
+            
+        except Exception as e:
+            logger.error(f"❌ 流式范围推荐失败: {e}")
+            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+async def build_recommend_prompt(request: RangeRecommendationRequest) -> str:
+    """
+    构建范围推荐提示
+    
+    Args:
+        request: 范围推荐请求
+    
+    Returns:
+        提示文本
+    """
+    # 短码时附上求解得到的全下范围
+    with span("prompt"):
+        push_fold_reference = await get_push_fold_reference(request)
+        observed_reference = get_observed_reference(request)
+    
+    return f"""{RECOMMEND_INSTRUCTIONS}
+
+位置: {request.position}
+场景: {request.scenario}
+对手风格: {request.opponent_style or '标准'}
+筹码深度: {request.stack_depth or '100bb'}
+{push_fold_reference}{observed_reference}"""
+
+
+@router.post("/flop-report", response_model=FlopReportResponse)
+async def flop_report(request: FlopReportRequest):
+    """
+    翻牌面纹理报告
+    
+    在全部 1755 个花色同构翻牌上计算范围的击中分类和胜率，
+    并按纹理分组汇总
+    
+    Args:
+        request: 翻牌报告请求
+    
+    Returns:
+        纹理分组汇总（可选每个翻牌的明细）
+    """
+    try:
+        report = await flop_texture_service.report(
+            hands=request.hands,
+            villain_hands=request.villain_hands,
+            runouts=request.runouts
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ 翻牌纹理报告失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return FlopReportResponse(
+        range_key=report["range_key"],
+        buckets=report["buckets"],
+        flops=report["flops"] if request.include_flops else None
+    )
+
+
+def _equity_session_response(session: EquitySession, changed: list[str]) -> EquitySessionResponse:
+    """构建增量胜率会话响应"""
+    return EquitySessionResponse(
+        session_id=session.session_id,
+        equity=round(session.equity, 4),
+        total_combinations=session.combos,
+        class_equities=equity_session_service.class_equities(session, changed),
+        expires_in=settings.equity_session_ttl_seconds
+    )
+
+
+@router.post("/equity-sessions", response_model=EquitySessionResponse)
+async def create_equity_session(request: EquitySessionCreateRequest):
+    """
+    创建增量胜率会话
+    
+    一次性计算所有手牌类别对抗对手范围的胜率分项，
+    之后矩阵中的每次切换只需增量更新
+    
+    Args:
+        request: 创建会话请求
+    
+    Returns:
+        会话 ID 和当前胜率
+    """
+    try:
+        session = await equity_session_service.create(
+            hands=request.hands,
+            villain_hands=request.villain_hands,
+            board=parse_board(request.board),
+            samples=request.samples
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ 创建胜率会话失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return _equity_session_response(session, request.hands)
+
+
+@router.patch("/equity-sessions/{session_id}", response_model=EquitySessionResponse)
+async def update_equity_session(session_id: str, request: EquitySessionUpdateRequest):
+    """
+    增量更新胜率会话（如 +AKs, -T9o）
+    
+    Args:
+        session_id: 会话 ID
+        request: 增减的手牌
+    
+    Returns:
+        更新后的胜率
+    """
+    session = equity_session_service.update(session_id, add=request.add, remove=request.remove)
+    if session is None:
+        raise HTTPException(status_code=404, detail="会话不存在或已过期")
+    
+    # 加入和移出的手牌都返回各自的胜率，前端可以同时更新两者的显示
+    return _equity_session_response(session, request.add + request.remove)
+
+
+@router.delete("/equity-sessions/{session_id}")
+async def delete_equity_session(session_id: str):
+    """
+    删除胜率会话
+    
+    Args:
+        session_id: 会话 ID
+    
+    Returns:
+        成功消息
+    """
+    if not equity_session_service.delete(session_id):
+        raise HTTPException(status_code=404, detail="会话不存在或已过期")
+    return {"message": "会话已删除"}
+
+
+@router.post("/multiway-equity", response_model=MultiwayEquityResponse)
+async def calculate_multiway_equity(request: MultiwayEquityRequest):
+    """
+    多人底池（2-6 人）全下胜率
+    
+    按卡牌移除联合抽样，持续采样直到每位玩家的标准误差都不超过目标值
+    
+    Args:
+        request: 多人胜率请求
+    
+    Returns:
+        每位玩家的胜率、标准误差和实际样本数
+    """
+    try:
+        result = await run_in_pool(
+            multiway_equity,
+            prepare_ranges(request.ranges),
+            parse_board(request.board),
+            request.target_std_error,
+            request.max_samples
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ 多人胜率计算失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return MultiwayEquityResponse(**result)
+
+
+@router.post("/equity-heatmap", response_model=EquityHeatmapResponse)
+async def equity_heatmap(request: EquityHeatmapRequest, accept: Optional[str] = Header(None)):
+    """
+    手牌矩阵胜率热力图
+    
+    一次计算 169 个手牌类别对抗对手范围的胜率（可选公共牌），
+    用于按胜率给 13x13 矩阵着色
+    
+    Args:
+        request: 热力图请求
+        accept: 为 application/octet-stream 时直接返回 676 字节的小端 float32 数组
+    
+    Returns:
+        169 个类别的胜率（行优先，与 HandMatrix 顺序一致）
+    """
+    started = time.perf_counter()
+    try:
+        equity = await equity_heatmap_service.heatmap(
+            villain_hands=request.villain_hands,
+            board=request.board,
+            samples=request.samples
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ 胜率热力图计算失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    payload = equity.astype("<f4").tobytes()
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    if accept and "application/octet-stream" in accept:
+        return Response(
+            content=payload,
+            media_type="application/octet-stream",
+            headers={"X-Elapsed-Ms": str(elapsed_ms)}
+        )
+    return EquityHeatmapResponse(equity=base64.b64encode(payload).decode("ascii"), elapsed_ms=elapsed_ms)
+
+
+@router.post("/equity-distribution", response_model=EquityDistributionResponse)
+async def equity_distribution(request: EquityDistributionRequest):
+    """
+    范围对范围的胜率分布
+    
+    英雄范围每个组合对抗对手范围的胜率（一次向量化计算），
+    以及由同一组组合胜率得出的直方图和形状统计
+    
+    Args:
+        request: 胜率分布请求
+    
+    Returns:
+        组合胜率（从高到低）、直方图和形状统计
+    """
+    started = time.perf_counter()
+    try:
+        result = await equity_distribution_service.distribution(
+            hero_hands=request.hero_hands,
+            villain_hands=request.villain_hands,
+            board=request.board,
+            bins=request.bins,
+            samples=request.samples
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ 胜率分布计算失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return EquityDistributionResponse(**result, elapsed_ms=round((time.perf_counter() - started) * 1000, 2))
+
+
+@router.post("/river-solve", response_model=RiverSolveResponse)
+async def river_solve(request: RiverSolveRequest):
+    """
+    河牌子博弈 CFR+ 求解
+    
+    在固定公共牌上按给定的下注尺度树求解两个范围的均衡策略，
+    返回每个决策节点上每个组合的策略和每个组合的期望收益
+    
+    Args:
+        request: 河牌求解请求
+    
+    Returns:
+        策略、期望收益和可利用度
+    """
+    for sizes in (request.oop_bet_sizes, request.ip_bet_sizes, request.raise_sizes):
+        if any(size <= 0 or size > 10 for size in sizes):
+            raise HTTPException(status_code=400, detail="下注尺度必须在 0 到 10 倍底池之间")
+    
+    params = request.model_dump()
+    params["oop_hands"] = list(canonical_hands(request.oop_hands))
+    params["ip_hands"] = list(canonical_hands(request.ip_hands))
+    store_key = result_key("river_solve", params)
+    result, _ = await asyncio.to_thread(result_store.get, store_key)
+    if result is None:
+        try:
+            result = await run_in_pool(
+                solve_river,
+                params["oop_hands"],
+                params["ip_hands"],
+                request.board,
+                request.pot,
+                request.effective_stack,
+                request.oop_bet_sizes,
+                request.ip_bet_sizes,
+                request.raise_sizes,
+                request.max_raises,
+                request.allin,
+                request.max_iterations,
+                request.target_exploitability,
+                request.include_combos
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f"❌ 河牌求解失败: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        await asyncio.to_thread(result_store.put, store_key, "river_solve", params, result)
+    
+    return RiverSolveResponse(**result)
+
+
+@router.post("/push-fold", response_model=PushFoldResponse)
+async def solve_push_fold(request: PushFoldRequest):
+    """
+    求解短码全下/弃牌均衡图表
+    
+    Args:
+        request: 求解参数（筹码深度、座位数、前注、盲注）
+    
+    Returns:
+        每个座位的全下范围和跟注范围
+    """
+    try:
+        result = await push_fold_service.solve(
+            stack_depth=request.stack_depth,
+            players=request.players,
+            ante=request.ante,
+            small_blind=request.small_blind,
+            big_blind=request.big_blind
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ 全下/弃牌求解失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return PushFoldResponse(**result)
+
+
+@router.post("/push-fold/sweep", response_model=PushFoldSweepResponse)
+async def sweep_push_fold(request: PushFoldSweepRequest):
+    """
+    在一组筹码深度上求解全下/弃牌图表（如 1-25bb）
+    
+    Args:
+        request: 扫描参数
+    
+    Returns:
+        每个筹码深度的求解结果
+    """
+    try:
+        results = await push_fold_service.sweep(
+            players=request.players,
+            ante=request.ante,
+            min_stack=request.min_stack,
+            max_stack=request.max_stack,
+            step=request.step
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ 全下/弃牌扫描失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return PushFoldSweepResponse(results=[PushFoldResponse(**r) for r in results])
+
+
+@router.get("/observed/{player}", response_model=ObservedRangesResponse)
+async def get_observed_ranges(player: str):
+    """
+    获取手牌历史导入工具生成的玩家观察范围
+    
+    Args:
+        player: 玩家名（不区分大小写）
+    
+    Returns:
+        按位置的 VPIP/PFR 范围和摊牌手牌
+    """
+    positions = observed_range_service.get(player)
+    if positions is None:
+        raise HTTPException(status_code=404, detail=f"没有玩家 {player} 的手牌历史数据")
+    
+    return ObservedRangesResponse(player=player, positions=positions)
+
+
+def get_observed_reference(request: RangeRecommendationRequest) -> str:
+    """
+    根据手牌历史中观察到的对手范围生成供 AI 参考的文本
+    
+    Args:
+        request: 范围推荐请求
+    
+    Returns:
+        参考文本；没有对手数据时返回空字符串
+    """
+    if not request.opponent_name:
+        return ""
+    positions = observed_range_service.get(request.opponent_name)
+    if not positions:
+        return ""
+    
+    lines = [f"\n对手 {request.opponent_name} 的手牌历史统计（按位置）:"]
+    for position, observed in positions.items():
+        line = f"- {position}: {observed['hands']} 手，VPIP {observed['vpip']:.1f}%，PFR {observed['pfr']:.1f}%"
+        if observed["showdown_counts"]:
+            # 只列出摊牌次数最多的手牌，避免提示过长
+            shown = sorted(observed["showdown_counts"].items(), key=lambda item: -item[1])[:30]
+            line += f"，摊牌过: {', '.join(f'{hand}×{count}' for hand, count in shown)}"
+        lines.append(line)
+    lines.append("请结合这些数据判断对手的实际范围。")
+    return "\n".join(lines) + "\n"
+
+
+async def get_push_fold_reference(request: RangeRecommendationRequest) -> str:
+    """
+    短码（不超过 25bb）时求解全下/弃牌均衡，生成供 AI 参考的文本
+    
+    Args:
+        request: 范围推荐请求
+    
+    Returns:
+        参考文本；不适用时返回空字符串
+    """
+    stack = parse_stack_depth(request.stack_depth)
+    if stack is None or stack > MAX_STACK_DEPTH:
+        return ""
+    
+    players = request.table_size or 6
+    # 大盲最后行动，没有首先全下的图表
+    seat = seat_index(request.position, players)
+    if seat is None or seat == players - 1:
+        return ""
+    
+    try:
+        result = await push_fold_service.solve(stack_depth=stack, players=players)
+    except Exception as e:
+        logger.warning(f"⚠️  全下/弃牌求解失败，跳过参考范围: {e}")
+        return ""
+    
+    chart = result["seats"][seat]["push"]
+    convergence = "" if result["converged"] else (
+        f"注意：求解在迭代上限内未完全收敛（可被利用度约 {result['exploitability']:.4f} bb/手），"
+        "边缘手牌可能不准确，请把它当作近似参考。\n"
+    )
+    return f"""
+纳什均衡全下范围（{players} 人桌，{stack:g}bb，前面玩家都弃牌时，约 {chart['percent']:.1f}% 的手牌）:
+{', '.join(chart['hands'])}
+{convergence}如果场景是全下/弃牌（open shove），请以这个范围为准给出【手牌】，并解释原因。
+"""
+
+
 def calculate_total_combinations(hands: list[str]) -> int:
     """
     计算手牌总组合数
@@ -186,6 +869,81 @@ def extract_suggestions(text: str) -> list[str]:
     return suggestions[:5]  # 最多返回5条
 
 
+HANDS_MARKER = "【手牌】"
+
+# 超过该长度仍未出现【手牌】标记时，不再等待，直接流式发送内容
+HANDS_LINE_MAX_WAIT = 400
+
+
+class HandsLineParser:
+    """
+    流式推荐回复的增量解析
+    
+    在【手牌】行完成之前缓存输出；该行完成后解析手牌，
+    并把其余内容（不含【手牌】行本身）交给调用方流式发送
+    """
+    
+    def __init__(self):
+        self.text = ""
+        self.hands: list[str] | None = None
+        self.hands_sent = False
+        self._pending = ""
+        self._waiting = True
+    
+    def feed(self, chunk: str) -> str:
+        """
+        追加一段输出
+        
+        Args:
+            chunk: 模型输出的文本块
+        
+        Returns:
+            可以立即发送的内容
+        """
+        self.text += chunk
+        if not self._waiting:
+            return chunk
+        
+        self._pending += chunk
+        marker = self._pending.find(HANDS_MARKER)
+        if marker >= 0:
+            line_end = self._pending.find("\n", marker)
+            if line_end < 0:
+                return ""
+            self.hands = extract_hands(self._pending[marker:line_end + 1])
+            return self._release(self._pending[:marker] + self._pending[line_end + 1:])
+        
+        if len(self._pending) > HANDS_LINE_MAX_WAIT:
+            return self._release(self._pending)
+        return ""
+    
+    def finish(self) -> str:
+        """
+        输出结束：解析剩余缓存（必要时从完整文本中提取手牌）
+        
+        Returns:
+            剩余需要发送的内容
+        """
+        remaining = ""
+        if self._waiting:
+            marker = self._pending.find(HANDS_MARKER)
+            if marker >= 0:
+                self.hands = extract_hands(self._pending[marker:])
+                line_end = self._pending.find("\n", marker)
+                remaining = self._pending[:marker] + (self._pending[line_end + 1:] if line_end >= 0 else "")
+            else:
+                remaining = self._pending
+            self._release("")
+        if self.hands is None:
+            self.hands = extract_hands(self.text)
+        return remaining
+    
+    def _release(self, content: str) -> str:
+        self._waiting = False
+        self._pending = ""
+        return content.lstrip("\n") if self.hands is not None else content
+
+
 def extract_hands(text: str) -> list[str]:
     """
     从推荐文本中提取手牌列表
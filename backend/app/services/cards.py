@@ -0,0 +1,242 @@
+"""
+牌与手牌组合的基础数据
+将前端使用的手牌类别（AA, AKs, AKo）映射到 1326 种具体组合
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import hashlib
+import numpy as np
+
+# 牌力从小到大（索引即点数大小）
+RANKS = "23456789TJQKA"
+SUITS = "cdhs"
+
+# 前端矩阵的牌力顺序（从大到小）
+MATRIX_RANKS = RANKS[::-1]
+
+TOTAL_COMBOS = 1326
+
+
+def card_index(card: str) -> int:
+    """
+    将牌面字符串转换为索引
+
+    Args:
+        card: 牌面，如 "Ah"、"Tc"
+
+    Returns:
+        0-51 的索引（点数 * 4 + 花色）
+    """
+    if len(card) != 2 or card[0].upper() not in RANKS or card[1].lower() not in SUITS:
+        raise ValueError(f"无效的牌: {card}")
+    return RANKS.index(card[0].upper()) * 4 + SUITS.index(card[1].lower())
+
+
+def card_name(index: int) -> str:
+    """将索引转换回牌面字符串"""
+    return RANKS[index // 4] + SUITS[index % 4]
+
+
+def parse_board(board: Optional[Iterable[str] | str]) -> List[int]:
+    """
+    解析公共牌
+
+    Args:
+        board: 公共牌，可以是 "AhKd7c" 或 ["Ah", "Kd", "7c"]
+
+    Returns:
+        牌索引列表
+    """
+    if not board:
+        return []
+    if isinstance(board, str):
+        text = board.replace(" ", "").replace(",", "")
+        board = [text[i:i + 2] for i in range(0, len(text), 2)]
+    cards = [card_index(card) for card in board]
+    if len(set(cards)) != len(cards):
+        raise ValueError("公共牌中存在重复的牌")
+    if len(cards) > 5:
+        raise ValueError("公共牌最多 5 张")
+    return cards
+
+
+def _build_combos() -> np.ndarray:
+    combos = [(a, b) for b in range(52) for a in range(b)]
+    # 每个组合按 (大牌, 小牌) 存储
+    return np.array([(b, a) for a, b in combos], dtype=np.int16)
+
+
+# 所有 1326 种组合，形状 (1326, 2)
+COMBOS = _build_combos()
+
+# (52, 52) 查找表：两张牌 -> 组合索引
+COMBO_INDEX = np.full((52, 52), -1, dtype=np.int32)
+COMBO_INDEX[COMBOS[:, 0], COMBOS[:, 1]] = np.arange(TOTAL_COMBOS)
+COMBO_INDEX[COMBOS[:, 1], COMBOS[:, 0]] = np.arange(TOTAL_COMBOS)
+
+# (1326, 52) 组合是否包含某张牌
+COMBO_HAS_CARD = np.zeros((TOTAL_COMBOS, 52), dtype=bool)
+COMBO_HAS_CARD[np.arange(TOTAL_COMBOS), COMBOS[:, 0]] = True
+COMBO_HAS_CARD[np.arange(TOTAL_COMBOS), COMBOS[:, 1]] = True
+
+# (52, 51) 包含某张牌的所有组合索引
+CARD_COMBOS = np.nonzero(COMBO_HAS_CARD.T)[1].reshape(52, 51)
+
+# 每个组合的 52 位掩码，用于快速判断冲突
+COMBO_MASKS = (np.uint64(1) << COMBOS[:, 0].astype(np.uint64)) | (
+    np.uint64(1) << COMBOS[:, 1].astype(np.uint64)
+)
+
+# 每个组合的名称（如 AhKd，大牌在前）
+COMBO_NAMES = [card_name(int(a)) + card_name(int(b)) for a, b in COMBOS]
+
+
+def _build_hand_classes() -> List[str]:
+    """按前端 13x13 矩阵的顺序生成 169 个手牌类别"""
+    classes = []
+    for i, high in enumerate(MATRIX_RANKS):
+        for j, low in enumerate(MATRIX_RANKS):
+            if i == j:
+                classes.append(high + low)
+            elif i < j:
+                classes.append(high + low + "s")
+            else:
+                classes.append(low + high + "o")
+    return classes
+
+
+# 169 个手牌类别（行优先，与 HandMatrix 一致）
+HAND_CLASSES = _build_hand_classes()
+CLASS_INDEX: Dict[str, int] = {name: i for i, name in enumerate(HAND_CLASSES)}
+
+
+def _class_of_combo(high: int, low: int) -> str:
+    r1, r2 = RANKS[high // 4], RANKS[low // 4]
+    if r1 == r2:
+        return r1 + r2
+    if RANKS.index(r1) < RANKS.index(r2):
+        r1, r2 = r2, r1
+    return r1 + r2 + ("s" if high % 4 == low % 4 else "o")
+
+
+# (1326,) 每个组合所属类别的索引
+COMBO_CLASS = np.array(
+    [CLASS_INDEX[_class_of_combo(int(a), int(b))] for a, b in COMBOS],
+    dtype=np.int16,
+)
+
+# (169,) 每个类别的组合数
+CLASS_COMBO_COUNTS = np.bincount(COMBO_CLASS, minlength=169).astype(np.int16)
+
+
+def hand_combos(hand: str) -> int:
+    """
+    计算单个手牌类别的组合数
+
+    Args:
+        hand: 手牌，如 "AA", "AKs", "AKo"
+
+    Returns:
+        组合数（未知格式返回 0）
+    """
+    if len(hand) == 2:  # 对子，如 AA
+        return 6
+    if hand.endswith('s'):  # 同色，如 AKs
+        return 4
+    if hand.endswith('o'):  # 不同色，如 AKo
+        return 12
+    return 0
+
+
+def normalize_hand(hand: str) -> Optional[str]:
+    """
+    规范化手牌类别名称
+
+    Args:
+        hand: 手牌，如 "aks"、"KAo"、"TT"
+
+    Returns:
+        规范名称；无法识别时返回 None
+    """
+    hand = hand.strip()
+    if len(hand) not in (2, 3):
+        return None
+    r1, r2 = hand[0].upper(), hand[1].upper()
+    if r1 not in RANKS or r2 not in RANKS:
+        return None
+    if RANKS.index(r1) < RANKS.index(r2):
+        r1, r2 = r2, r1
+    if r1 == r2:
+        return r1 + r2 if len(hand) == 2 else None
+    if len(hand) != 3 or hand[2].lower() not in "so":
+        return None
+    return r1 + r2 + hand[2].lower()
+
+
+def canonical_hands(hands: Iterable[str]) -> Tuple[str, ...]:
+    """
+    将手牌列表去重、规范化，并按矩阵顺序排序
+
+    Args:
+        hands: 手牌列表
+
+    Returns:
+        规范化后的手牌元组（忽略无法识别的手牌）
+    """
+    # 已经是规范名称的手牌（最常见的情况）不需要逐字符解析
+    normalized = {h if h in CLASS_INDEX else normalize_hand(h) for h in hands}
+    normalized.discard(None)
+    return tuple(sorted(normalized, key=CLASS_INDEX.__getitem__))
+
+
+def range_key(hands: Iterable[str]) -> str:
+    """
+    计算范围的规范哈希，用于缓存
+
+    Args:
+        hands: 手牌列表
+
+    Returns:
+        与手牌顺序、大小写、重复无关的哈希字符串
+    """
+    canonical = ",".join(canonical_hands(hands))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=256)
+def _class_weights(hands: Tuple[str, ...]) -> np.ndarray:
+    weights = np.zeros(169, dtype=np.float64)
+    weights[[CLASS_INDEX[h] for h in hands]] = 1.0
+    weights.setflags(write=False)
+    return weights
+
+
+def class_weights(hands: Iterable[str]) -> np.ndarray:
+    """
+    将手牌列表转换为 169 维的类别权重向量
+
+    Args:
+        hands: 手牌列表
+
+    Returns:
+        (169,) 只读向量，选中的类别为 1
+    """
+    return _class_weights(canonical_hands(hands))
+
+
+def range_weights(hands: Iterable[str], dead_cards: Iterable[int] = ()) -> np.ndarray:
+    """
+    将手牌列表转换为 1326 维的组合权重向量
+
+    Args:
+        hands: 手牌列表
+        dead_cards: 已知的死牌（如公共牌），包含这些牌的组合权重为 0
+
+    Returns:
+        (1326,) 组合权重向量
+    """
+    weights = class_weights(hands)[COMBO_CLASS]
+    dead = list(dead_cards)
+    if dead:
+        weights = weights * ~COMBO_HAS_CARD[:, dead].any(axis=1)
+    return weights
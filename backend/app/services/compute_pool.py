@@ -0,0 +1,50 @@
+"""
+范围计算进程池
+CPU 密集的计算（胜率、翻牌报告等）统一提交到这里，避免阻塞事件循环
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+import asyncio
+import os
+
+from ..config.settings import settings
+from .profiling import span
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def worker_count() -> int:
+    """计算进程数"""
+    return settings.compute_workers or os.cpu_count() or 1
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """获取（必要时创建）全局进程池"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=worker_count())
+    return _executor
+
+
+async def run_in_pool(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    在进程池中执行函数
+
+    Args:
+        func: 可被 pickle 的模块级函数
+        *args: 参数
+
+    Returns:
+        函数返回值
+    """
+    loop = asyncio.get_running_loop()
+    with span("compute"):
+        return await loop.run_in_executor(get_executor(), func, *args)
+
+
+def shutdown():
+    """关闭进程池"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
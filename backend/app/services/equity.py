@@ -0,0 +1,254 @@
+"""
+范围对范围的胜率计算
+在给定公共牌上一次性计算所有 1326 个组合的强度，
+再用排序 + 前缀和处理手牌之间的卡牌移除（card removal）
+"""
+from typing import Iterable, Optional, Tuple
+import numpy as np
+
+from .cards import CARD_COMBOS, COMBOS, COMBO_HAS_CARD, TOTAL_COMBOS
+from .hand_evaluator import evaluate
+
+# 按牌分组排序时，牌索引占用强度之上的位
+_KEY_SHIFT = 24
+
+
+def board_strengths(boards: np.ndarray) -> np.ndarray:
+    """
+    计算每个完整公共牌面上所有组合的强度
+
+    Args:
+        boards: (B, 5) 公共牌索引
+
+    Returns:
+        (B, 1326) 强度；与公共牌冲突的组合为 -1
+    """
+    boards = np.asarray(boards, dtype=np.int64).reshape(-1, 5)
+    count = boards.shape[0]
+    hands = np.empty((count, TOTAL_COMBOS, 7), dtype=np.int64)
+    hands[:, :, :2] = COMBOS
+    hands[:, :, 2:] = boards[:, None, :]
+    strengths = evaluate(hands.reshape(-1, 7)).reshape(count, TOTAL_COMBOS)
+    strengths[COMBO_HAS_CARD.T[boards].any(axis=1)] = -1
+    return strengths
+
+
+class ShowdownIndex:
+    """
+    一个完整公共牌面上的摊牌排序结构
+
+    只依赖组合强度的排序和查找在构造时完成一次，
+    之后对不同的对手权重只需做前缀和（河牌求解器每次迭代都要调用）
+    """
+
+    def __init__(self, strength: np.ndarray):
+        """
+        Args:
+            strength: (1326,) 组合强度，-1 表示与公共牌冲突
+        """
+        self.live = strength >= 0
+        self.order = np.argsort(strength, kind="stable")
+        sorted_strength = strength[self.order]
+        self.lo = np.searchsorted(sorted_strength, strength, side="left")
+        self.hi = np.searchsorted(sorted_strength, strength, side="right")
+
+        # 按牌分组：每张牌对应包含它的 51 个组合，组内按强度排序后做前缀和，
+        # 用于扣除与 h 共享牌的对手组合
+        card_keys = (np.arange(52)[:, None] << _KEY_SHIFT) + (strength[CARD_COMBOS] + 1)
+        self.card_order = np.argsort(card_keys, axis=None, kind="stable")
+        sorted_keys = card_keys.ravel()[self.card_order]
+
+        self.first, self.second = COMBOS[:, 0].astype(np.int64), COMBOS[:, 1].astype(np.int64)
+        # 与 h 共享某张牌且强度低于（left）或不高于（right）h 的组合在分组前缀和中的位置
+        self.positions = {
+            (card, side): np.searchsorted(sorted_keys, (cards << _KEY_SHIFT) + strength + 1, side=side)
+            for card, cards in (("first", self.first), ("second", self.second))
+            for side in ("left", "right")
+        }
+
+    def terms(self, villain_weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        计算每个英雄组合对抗对手范围的摊牌结果
+
+        对每个英雄组合 h，只统计与 h 不冲突的对手组合：
+        胜利计 1，平局计 0.5。
+
+        Args:
+            villain_weights: (1326,) 对手范围的组合权重
+
+        Returns:
+            (share, total)：share 为加权的胜利份额，total 为可匹配的对手权重；
+            英雄组合胜率 = share / total
+        """
+        weights = np.where(self.live, villain_weights, 0.0)
+        cumulative = np.concatenate(([0.0], np.cumsum(weights[self.order])))
+        card_cumulative = np.concatenate(([0.0], np.cumsum(weights[CARD_COMBOS].ravel()[self.card_order])))
+
+        def shared(card: str, side: str) -> np.ndarray:
+            """与 h 共享 card 且强度低于（或不高于）h 的对手权重"""
+            cards = self.first if card == "first" else self.second
+            return card_cumulative[self.positions[(card, side)]] - card_cumulative[cards * 51]
+
+        card_totals = card_cumulative[51::51] - card_cumulative[0:-1:51]
+
+        # 强度低于 h 的对手权重（扣除与 h 共享牌的组合，h 自身不在其中）
+        below = cumulative[self.lo] - shared("first", "left") - shared("second", "left")
+        # 强度不高于 h 的对手权重（h 自身被扣除了两次，加回一次后恰好不计入）
+        at_most = cumulative[self.hi] - shared("first", "right") - shared("second", "right") + weights
+        total = cumulative[-1] - card_totals[self.first] - card_totals[self.second] + weights
+
+        share = below + 0.5 * (at_most - below)
+        share = np.where(self.live, share, 0.0)
+        total = np.where(self.live, total, 0.0)
+        return share, total
+
+
+def showdown_terms(
+    strength: np.ndarray,
+    villain_weights: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    在一个完整公共牌面上，计算每个英雄组合对抗对手范围的摊牌结果
+
+    Args:
+        strength: (1326,) 组合强度，-1 表示与公共牌冲突
+        villain_weights: (1326,) 对手范围的组合权重
+
+    Returns:
+        (share, total)，见 ShowdownIndex.terms
+    """
+    return ShowdownIndex(strength).terms(villain_weights)
+
+
+def sample_boards(
+    count: int,
+    known: Iterable[int] = (),
+    rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    """
+    随机补全公共牌
+
+    Args:
+        count: 需要的牌面数量
+        known: 已知的公共牌（0-5 张）
+        rng: 随机数生成器
+
+    Returns:
+        (count, 5) 公共牌索引，前几张为已知牌
+    """
+    rng = rng or np.random.default_rng()
+    known = list(known)
+    missing = 5 - len(known)
+    boards = np.empty((count, 5), dtype=np.int64)
+    boards[:, :len(known)] = known
+    if missing:
+        deck = np.setdiff1d(np.arange(52), known)
+        keys = rng.random((count, deck.size))
+        picks = np.argpartition(keys, missing, axis=1)[:, :missing]
+        boards[:, len(known):] = deck[picks]
+    return boards
+
+
+def equity_terms(
+    villain_weights: np.ndarray,
+    board: Iterable[int] = (),
+    samples: int = 2000,
+    batch_size: int = 64,
+    rng: Optional[np.random.Generator] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算每个英雄组合对抗对手范围的累计胜率项
+
+    公共牌完整时精确计算；否则对剩余公共牌做蒙特卡洛采样。
+
+    Args:
+        villain_weights: (1326,) 对手范围的组合权重
+        board: 已知公共牌
+        samples: 补全公共牌的采样次数
+        batch_size: 每批同时评估的牌面数量
+        rng: 随机数生成器
+
+    Returns:
+        (share, total)，形状均为 (1326,)；英雄组合胜率 = share / total
+    """
+    board = list(board)
+    share = np.zeros(TOTAL_COMBOS)
+    total = np.zeros(TOTAL_COMBOS)
+
+    if len(board) == 5:
+        return showdown_terms(board_strengths(np.array([board]))[0], villain_weights)
+
+    rng = rng or np.random.default_rng()
+    remaining = samples
+    while remaining > 0:
+        batch = min(batch_size, remaining)
+        remaining -= batch
+        for strength in board_strengths(sample_boards(batch, board, rng)):
+            s, t = showdown_terms(strength, villain_weights)
+            share += s
+            total += t
+    return share, total
+
+
+def runout_terms(
+    villain_weights: np.ndarray,
+    board: Iterable[int],
+    samples: int,
+    seed: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    在全部（转牌时）或采样的（翻牌时）后续牌面上累计每个英雄组合的胜率项
+
+    与 equity_terms 相同，但 4 张公共牌时精确枚举全部河牌，不再采样
+
+    Args:
+        villain_weights: (1326,) 对手范围的组合权重
+        board: 3-5 张公共牌
+        samples: 翻牌时采样的牌面数量（转牌、河牌时忽略）
+        seed: 随机种子
+
+    Returns:
+        (share, total)，形状均为 (1326,)
+    """
+    board = list(board)
+    if len(board) != 4:
+        return equity_terms(villain_weights, board=board, samples=samples, rng=np.random.default_rng(seed))
+
+    rivers = np.setdiff1d(np.arange(52), board)
+    boards = np.column_stack([np.tile(board, (len(rivers), 1)), rivers])
+    share = np.zeros(TOTAL_COMBOS)
+    total = np.zeros(TOTAL_COMBOS)
+    for start in range(0, len(boards), 64):
+        for strength in board_strengths(boards[start:start + 64]):
+            s, t = ShowdownIndex(strength).terms(villain_weights)
+            share += s
+            total += t
+    return share, total
+
+
+def combo_equities(share: np.ndarray, total: np.ndarray) -> np.ndarray:
+    """将累计项转换为组合胜率，无法匹配的组合为 NaN"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, share / np.where(total > 0, total, 1), np.nan)
+
+
+def range_equity(
+    hero_weights: np.ndarray,
+    share: np.ndarray,
+    total: np.ndarray,
+) -> float:
+    """
+    汇总英雄范围的整体胜率
+
+    Args:
+        hero_weights: (1326,) 英雄范围的组合权重
+        share: equity_terms 返回的胜利份额
+        total: equity_terms 返回的可匹配权重
+
+    Returns:
+        整体胜率（0-1），无法匹配时返回 0
+    """
+    denominator = float(hero_weights @ total)
+    if denominator <= 0:
+        return 0.0
+    return float(hero_weights @ share) / denominator
@@ -0,0 +1,249 @@
+"""
+范围对范围的胜率分布
+英雄范围中每个组合对抗对手范围的胜率，以及按组合加权的直方图和形状统计。
+平均胜率相同的范围可能一个极化、一个紧凑，分布能区分两者
+
+组合胜率只计算一次（有公共牌时保存到结果存储），直方图和统计都从同一个数组得出
+"""
+from typing import Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import numpy as np
+
+from .cards import COMBO_CLASS, COMBO_NAMES, canonical_hands, class_weights, parse_board, range_key, range_weights
+from .compute_pool import run_in_pool, worker_count
+from .equity import combo_equities, runout_terms
+from .preflop_equity import class_equity_vs_ranges
+from .result_store import result_key, result_store
+
+logger = logging.getLogger(__name__)
+
+# 强牌、弱牌的胜率界线（用于形状统计）
+STRONG_EQUITY = 0.7
+WEAK_EQUITY = 0.3
+
+# 形状判断：偏离平均胜率超过该值的组合视为两端；标准差低于该值视为紧凑
+# （相对平均值判断，翻前对抗随机手牌时胜率集中在 30%-85%，不能用固定界线）
+POLAR_DISTANCE = 0.15
+CONDENSED_STD = 0.1
+
+
+async def combo_terms(villain_weights: np.ndarray, board: List[int], samples: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    在进程池中计算每个英雄组合对抗对手范围的胜率项（翻牌时按 worker 数分块采样）
+
+    Args:
+        villain_weights: (1326,) 对手范围的组合权重（已去掉与公共牌冲突的组合）
+        board: 3-5 张公共牌
+        samples: 翻牌时采样的转牌+河牌数量
+
+    Returns:
+        (share, total)，形状均为 (1326,)
+    """
+    if len(board) != 3:
+        return await run_in_pool(runout_terms, villain_weights, board, samples)
+
+    chunks = min(worker_count(), max(1, samples // 64))
+    sizes = [len(c) for c in np.array_split(np.arange(samples), chunks)]
+    results = await asyncio.gather(*[
+        run_in_pool(runout_terms, villain_weights, board, size, seed)
+        for seed, size in enumerate(sizes)
+    ])
+    return sum(r[0] for r in results), sum(r[1] for r in results)
+
+
+async def stored_combo_terms(
+    villain: Tuple[str, ...], board: List[int], samples: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    每个英雄组合对抗对手范围的胜率项（优先读取结果存储，热力图和胜率分布共用）
+
+    Args:
+        villain: 规范化后的对手范围
+        board: 3-5 张公共牌
+        samples: 翻牌时采样的转牌+河牌数量
+
+    Returns:
+        (share, total)，形状均为 (1326,)
+
+    Raises:
+        ValueError: 对手范围中没有与公共牌不冲突的组合
+    """
+    villain_weights = range_weights(villain, dead_cards=board)
+    if not villain_weights.any():
+        raise ValueError("对手范围中没有与公共牌不冲突的组合")
+
+    params = {
+        "villain": range_key(villain),
+        "board": sorted(board),
+        "samples": samples if len(board) == 3 else None,
+    }
+    store_key = result_key("combo_equity", params)
+    _, arrays = await asyncio.to_thread(result_store.get, store_key)
+    if arrays is not None:
+        return np.asarray(arrays["share"]), np.asarray(arrays["total"])
+
+    share, total = await combo_terms(villain_weights, board, samples)
+    await asyncio.to_thread(
+        result_store.put, store_key, "combo_equity", params, None, {"share": share, "total": total}
+    )
+    return share, total
+
+
+def _weighted_quantiles(values: np.ndarray, weights: np.ndarray, quantiles: Iterable[float]) -> List[float]:
+    order = np.argsort(values, kind="stable")
+    cumulative = np.cumsum(weights[order])
+    positions = np.searchsorted(cumulative, np.asarray(list(quantiles)) * cumulative[-1], side="left")
+    return [float(values[order][min(p, len(order) - 1)]) for p in positions]
+
+
+def distribution_stats(equities: np.ndarray, weights: np.ndarray) -> Optional[dict]:
+    """
+    按组合加权的胜率分布形状统计
+
+    Args:
+        equities: 胜率（NaN 表示无法匹配，不计入）
+        weights: 与 equities 对应的组合权重
+
+    Returns:
+        与 EquityDistributionStats 对应的字典；没有可用组合时为 None
+    """
+    valid = ~np.isnan(equities) & (weights > 0)
+    if not valid.any():
+        return None
+    values, weights = equities[valid].astype(np.float64), weights[valid].astype(np.float64)
+    weights = weights / weights.sum()
+    mean = float(values @ weights)
+    p10, p25, median, p75, p90 = _weighted_quantiles(values, weights, (0.1, 0.25, 0.5, 0.75, 0.9))
+    std = float(np.sqrt(((values - mean) ** 2) @ weights))
+    above = float(weights[values >= mean + POLAR_DISTANCE].sum())
+    below = float(weights[values <= mean - POLAR_DISTANCE].sum())
+    if above + below >= 0.6 and min(above, below) >= 0.15:
+        shape = "极化"
+    elif std < CONDENSED_STD:
+        shape = "紧凑"
+    else:
+        shape = "线性"
+    return {
+        "mean": round(mean, 4),
+        "std": round(std, 4),
+        "p10": round(p10, 4),
+        "p25": round(p25, 4),
+        "median": round(median, 4),
+        "p75": round(p75, 4),
+        "p90": round(p90, 4),
+        "strong_share": round(float(weights[values >= STRONG_EQUITY].sum()), 4),
+        "weak_share": round(float(weights[values < WEAK_EQUITY].sum()), 4),
+        "shape": shape,
+    }
+
+
+def histogram(equities: np.ndarray, weights: np.ndarray, bins: int) -> List[float]:
+    """
+    按组合加权的胜率直方图（[0, 1] 等宽分箱，最后一箱包含 1）
+
+    Returns:
+        每个分箱的组合占比
+    """
+    valid = ~np.isnan(equities) & (weights > 0)
+    counts, _ = np.histogram(equities[valid], bins=bins, range=(0.0, 1.0), weights=weights[valid])
+    total = counts.sum()
+    return [round(float(c / total), 4) if total > 0 else 0.0 for c in counts]
+
+
+class EquityDistributionService:
+    """胜率分布服务"""
+
+    async def combo_equities(
+        self,
+        hero_hands: List[str],
+        villain_hands: List[str],
+        board: Optional[str] = None,
+        samples: int = 600,
+    ) -> Tuple[np.ndarray, np.ndarray, float]:
+        """
+        计算英雄范围每个组合对抗对手范围的胜率
+
+        翻前使用翻前类别胜率表（同一类别的组合胜率相同）；
+        有公共牌时每个牌面只评估一次 1326 个组合的强度，转牌、河牌精确枚举，翻牌采样
+
+        Args:
+            hero_hands: 英雄范围
+            villain_hands: 对手范围
+            board: 公共牌（可选，0、3、4 或 5 张）
+            samples: 翻牌时采样的转牌+河牌数量
+
+        Returns:
+            (equities, hero_weights, equity)：(1326,) 组合胜率（不在范围内或无法匹配为 NaN）、
+            (1326,) 英雄组合权重、范围整体胜率
+
+        Raises:
+            ValueError: 公共牌或范围无效
+        """
+        hero = canonical_hands(hero_hands)
+        villain = canonical_hands(villain_hands)
+        if not hero or not villain:
+            raise ValueError("英雄和对手范围中都必须有有效的手牌")
+        board_cards = parse_board(board)
+        if len(board_cards) not in (0, 3, 4, 5):
+            raise ValueError("公共牌必须是 0、3、4 或 5 张")
+
+        hero_weights = range_weights(hero, dead_cards=board_cards)
+        if not hero_weights.any():
+            raise ValueError("英雄范围中没有与公共牌不冲突的组合")
+
+        if not board_cards:
+            class_equity = await asyncio.to_thread(
+                lambda: class_equity_vs_ranges(class_weights(villain)[None, :])[0]
+            )
+            equities = class_equity[COMBO_CLASS].astype(np.float64)
+            weights = hero_weights * ~np.isnan(equities)
+            equity = float(np.nansum(equities * weights) / weights.sum()) if weights.any() else 0.0
+        else:
+            share, total = await stored_combo_terms(villain, board_cards, samples)
+            equities = combo_equities(share, total)
+            denominator = float(hero_weights @ total)
+            equity = float(hero_weights @ share) / denominator if denominator > 0 else 0.0
+
+        equities = np.where(hero_weights > 0, equities, np.nan)
+        return equities, hero_weights, equity
+
+    async def distribution(
+        self,
+        hero_hands: List[str],
+        villain_hands: List[str],
+        board: Optional[str] = None,
+        bins: int = 20,
+        samples: int = 600,
+    ) -> dict:
+        """
+        胜率分布：组合明细（按胜率从高到低）、直方图和形状统计
+
+        Args:
+            hero_hands: 英雄范围
+            villain_hands: 对手范围
+            board: 公共牌（可选）
+            bins: 直方图分箱数
+            samples: 翻牌时采样的转牌+河牌数量
+
+        Returns:
+            与 EquityDistributionResponse 对应的字典
+
+        Raises:
+            ValueError: 公共牌或范围无效
+        """
+        equities, weights, equity = await self.combo_equities(hero_hands, villain_hands, board, samples)
+        members = np.flatnonzero(~np.isnan(equities))
+        order = members[np.argsort(-equities[members], kind="stable")]
+        return {
+            "equity": round(equity, 4),
+            "combos": [COMBO_NAMES[i] for i in order],
+            "equities": [round(float(equities[i]), 4) for i in order],
+            "histogram": histogram(equities, weights, bins),
+            "bin_edges": [round(float(edge), 4) for edge in np.linspace(0.0, 1.0, bins + 1)],
+            "stats": distribution_stats(equities, weights),
+        }
+
+
+# 全局胜率分布服务实例
+equity_distribution_service = EquityDistributionService()
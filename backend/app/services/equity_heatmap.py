@@ -0,0 +1,61 @@
+"""
+手牌矩阵胜率热力图
+一次计算 169 个手牌类别对抗对手范围的胜率：
+
+- 翻前：查翻前类别胜率表，一次矩阵乘法
+- 转牌：枚举全部河牌，精确计算
+- 翻牌：采样转牌+河牌，分块在进程池中计算
+
+有公共牌时每个牌面只评估一次 1326 个组合的强度，所有类别共用，
+最后按类别对组合的胜率项做 bincount 汇总（组合胜率项与胜率分布共用）
+"""
+from typing import List, Optional
+import logging
+import numpy as np
+
+from .cards import COMBO_CLASS, canonical_hands, class_weights, parse_board
+from .equity_distribution import stored_combo_terms
+from .preflop_equity import class_equity_vs_ranges
+
+logger = logging.getLogger(__name__)
+
+
+class EquityHeatmapService:
+    """胜率热力图服务"""
+
+    async def heatmap(self, villain_hands: List[str], board: Optional[str] = None, samples: int = 600) -> np.ndarray:
+        """
+        计算 169 个类别对抗对手范围的胜率
+
+        Args:
+            villain_hands: 对手范围
+            board: 公共牌（可选，0、3、4 或 5 张）
+            samples: 翻牌时采样的转牌+河牌数量
+
+        Returns:
+            (169,) float32，按 HAND_CLASSES 顺序；与公共牌冲突的类别为 NaN
+
+        Raises:
+            ValueError: 公共牌或范围无效
+        """
+        villain = canonical_hands(villain_hands)
+        if not villain:
+            raise ValueError("对手范围中没有有效的手牌")
+        board_cards = parse_board(board)
+        if len(board_cards) not in (0, 3, 4, 5):
+            raise ValueError("公共牌必须是 0、3、4 或 5 张")
+
+        if not board_cards:
+            return class_equity_vs_ranges(class_weights(villain)[None, :])[0]
+
+        # 组合级的胜率项与胜率分布共用（同一份结果存储）
+        share, total = await stored_combo_terms(villain, board_cards, samples)
+        share = np.bincount(COMBO_CLASS, weights=share, minlength=169)
+        total = np.bincount(COMBO_CLASS, weights=total, minlength=169)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            equity = np.where(total > 0, share / total, np.nan).astype(np.float32)
+        return equity
+
+
+# 全局胜率热力图服务实例
+equity_heatmap_service = EquityHeatmapService()
@@ -0,0 +1,198 @@
+"""
+增量胜率会话
+在服务端保存每个手牌类别对抗当前对手范围的胜率分项，
+矩阵中单个手牌的增减只需更新对应类别，不必重新计算整个范围
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import time
+import uuid
+import numpy as np
+
+from ..config.settings import settings
+from .cards import CLASS_COMBO_COUNTS, CLASS_INDEX, COMBO_CLASS, canonical_hands, range_weights
+from .compute_pool import run_in_pool
+from .equity import equity_terms
+
+# 累计若干次增量更新后重新求和，避免浮点误差累积
+_RESUM_INTERVAL = 1000
+
+
+def class_equity_terms(
+    villain_hands: Tuple[str, ...],
+    board: Tuple[int, ...],
+    samples: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算每个手牌类别对抗对手范围的胜率分项（在进程池中执行）
+
+    Args:
+        villain_hands: 对手范围
+        board: 已知公共牌
+        samples: 补全公共牌的采样次数
+
+    Returns:
+        (share, total)，形状均为 (169,)；类别胜率 = share / total
+    """
+    villain_weights = range_weights(villain_hands, dead_cards=board)
+    share, total = equity_terms(villain_weights, board=board, samples=samples)
+    return (
+        np.bincount(COMBO_CLASS, weights=share, minlength=169),
+        np.bincount(COMBO_CLASS, weights=total, minlength=169),
+    )
+
+
+@dataclass
+class EquitySession:
+    """单个胜率会话"""
+    session_id: str
+    board: Tuple[int, ...]
+    class_share: np.ndarray
+    class_total: np.ndarray
+    selected: Set[int] = field(default_factory=set)
+    share_sum: float = 0.0
+    total_sum: float = 0.0
+    combos: int = 0
+    updates: int = 0
+    expires_at: float = 0.0
+
+    @property
+    def equity(self) -> float:
+        """当前英雄范围对抗对手范围的胜率"""
+        return self.share_sum / self.total_sum if self.total_sum > 0 else 0.0
+
+    def resum(self):
+        """根据当前选中的类别重新求和"""
+        indices = list(self.selected)
+        self.share_sum = float(self.class_share[indices].sum())
+        self.total_sum = float(self.class_total[indices].sum())
+        self.combos = int(CLASS_COMBO_COUNTS[indices].sum())
+        self.updates = 0
+
+    def apply(self, add: Iterable[int], remove: Iterable[int]):
+        """
+        增减手牌类别，只更新变化的部分
+
+        Args:
+            add: 新增的类别索引
+            remove: 移除的类别索引
+        """
+        for index in add:
+            if index not in self.selected:
+                self.selected.add(index)
+                self.share_sum += self.class_share[index]
+                self.total_sum += self.class_total[index]
+                self.combos += int(CLASS_COMBO_COUNTS[index])
+                self.updates += 1
+        for index in remove:
+            if index in self.selected:
+                self.selected.discard(index)
+                self.share_sum -= self.class_share[index]
+                self.total_sum -= self.class_total[index]
+                self.combos -= int(CLASS_COMBO_COUNTS[index])
+                self.updates += 1
+        if self.updates >= _RESUM_INTERVAL or not self.selected:
+            self.resum()
+
+    def class_equity(self, index: int) -> Optional[float]:
+        """单个类别的胜率"""
+        total = self.class_total[index]
+        return float(self.class_share[index] / total) if total > 0 else None
+
+
+class EquitySessionService:
+    """增量胜率会话管理"""
+
+    def __init__(self):
+        self.sessions: Dict[str, EquitySession] = {}
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        for session_id in [k for k, s in self.sessions.items() if s.expires_at <= now]:
+            del self.sessions[session_id]
+
+    def _touch(self, session: EquitySession):
+        session.expires_at = time.monotonic() + settings.equity_session_ttl_seconds
+
+    async def create(
+        self,
+        hands: List[str],
+        villain_hands: List[str],
+        board: Iterable[int] = (),
+        samples: int = 1500,
+    ) -> EquitySession:
+        """
+        创建会话：一次性计算所有类别对抗对手范围的胜率分项
+
+        Args:
+            hands: 英雄初始范围
+            villain_hands: 对手范围
+            board: 已知公共牌
+            samples: 补全公共牌的采样次数
+
+        Returns:
+            新会话
+        """
+        villain = canonical_hands(villain_hands)
+        if not villain:
+            raise ValueError("对手范围中没有有效的手牌")
+        board = tuple(board)
+
+        self._purge_expired()
+        class_share, class_total = await run_in_pool(class_equity_terms, villain, board, samples)
+        session = EquitySession(
+            session_id=str(uuid.uuid4()),
+            board=board,
+            class_share=class_share,
+            class_total=class_total,
+            selected={CLASS_INDEX[h] for h in canonical_hands(hands)},
+        )
+        session.resum()
+        self._touch(session)
+        self.sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id: str) -> Optional[EquitySession]:
+        """获取未过期的会话（并刷新过期时间）"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            return None
+        if session.expires_at <= time.monotonic():
+            del self.sessions[session_id]
+            return None
+        self._touch(session)
+        return session
+
+    def update(self, session_id: str, add: List[str], remove: List[str]) -> Optional[EquitySession]:
+        """
+        对会话应用手牌增减
+
+        Args:
+            session_id: 会话 ID
+            add: 新增的手牌
+            remove: 移除的手牌
+
+        Returns:
+            更新后的会话；会话不存在或已过期时返回 None
+        """
+        session = self.get(session_id)
+        if session is None:
+            return None
+        session.apply(
+            add=[CLASS_INDEX[h] for h in canonical_hands(add)],
+            remove=[CLASS_INDEX[h] for h in canonical_hands(remove)],
+        )
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        """删除会话"""
+        return self.sessions.pop(session_id, None) is not None
+
+    @staticmethod
+    def class_equities(session: EquitySession, hands: Iterable[str]) -> Dict[str, Optional[float]]:
+        """取指定手牌类别的胜率"""
+        return {h: session.class_equity(CLASS_INDEX[h]) for h in canonical_hands(hands)}
+
+
+# 全局胜率会话服务实例
+equity_session_service = EquitySessionService()
@@ -0,0 +1,316 @@
+"""
+翻牌面纹理报告
+在全部 1755 个花色同构的翻牌类别上评估范围的击中情况和胜率，
+按纹理分组（对子面、单色面、连张面、高牌面等）汇总
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import permutations
+from typing import List, Optional, Tuple
+import asyncio
+import logging
+import numpy as np
+
+from ..config.settings import settings
+from .cards import COMBO_HAS_CARD, COMBOS, RANKS, TOTAL_COMBOS, canonical_hands, card_name, range_key, range_weights
+from .compute_pool import run_in_pool, worker_count
+from .equity import equity_terms, range_equity
+from .hand_evaluator import FULL_HOUSE, STRAIGHT, STRAIGHT_HIGH, category, evaluate
+from .result_store import result_key, result_store
+
+logger = logging.getLogger(__name__)
+
+HIT_CATEGORIES = [
+    "high_card",
+    "one_pair",
+    "two_pair",
+    "three_of_a_kind",
+    "straight",
+    "flush",
+    "full_house_plus",
+    "flush_draw",
+    "straight_draw",
+    "gutshot",
+]
+
+TEXTURES = ["all", "paired", "monotone", "two_tone", "rainbow", "connected", "high_card", "low_card"]
+
+# 高牌面：最大的牌至少是 T
+HIGH_CARD_RANK = RANKS.index("T")
+
+
+@lru_cache(maxsize=1)
+def canonical_flops() -> Tuple[np.ndarray, np.ndarray]:
+    """
+    枚举所有花色同构的翻牌类别
+
+    Returns:
+        (flops, weights)：(1755, 3) 的代表翻牌，以及每个类别对应的原始翻牌数（合计 22100）
+    """
+    cards = np.arange(52)
+    a, b, c = np.meshgrid(cards, cards, cards, indexing="ij")
+    keep = (a > b) & (b > c)
+    flops = np.stack([a[keep], b[keep], c[keep]], axis=1)
+
+    # 对 24 种花色置换取最小编码作为规范形式
+    ranks, suits = flops >> 2, flops & 3
+    keys = []
+    for perm in permutations(range(4)):
+        permuted = np.sort(ranks * 4 + np.array(perm)[suits], axis=1)
+        keys.append(permuted[:, 0] * 2704 + permuted[:, 1] * 52 + permuted[:, 2])
+    canonical = np.min(keys, axis=0)
+
+    unique, counts = np.unique(canonical, return_counts=True)
+    result = np.stack([unique // 2704, unique // 52 % 52, unique % 52], axis=1)
+    return result[:, ::-1].copy(), counts
+
+
+def flop_textures(flop: np.ndarray) -> List[str]:
+    """
+    判断翻牌面所属的纹理分组
+
+    Args:
+        flop: 3 张牌的索引
+
+    Returns:
+        纹理名称列表（一个翻牌可同时属于多个分组）
+    """
+    ranks = sorted({int(card) >> 2 for card in flop}, reverse=True)
+    suits = len({int(card) & 3 for card in flop})
+    textures = ["all"]
+    if len(ranks) < 3:
+        textures.append("paired")
+    textures.append({1: "monotone", 2: "two_tone", 3: "rainbow"}[suits])
+    if len(ranks) == 3:
+        # 三张不同点数落在 5 张的窗口内（A 也可作为 1）
+        wheel = sorted(-1 if r == 12 else r for r in ranks)
+        if ranks[0] - ranks[2] <= 4 or wheel[2] - wheel[0] <= 4:
+            textures.append("connected")
+    textures.append("high_card" if ranks[0] >= HIGH_CARD_RANK else "low_card")
+    return textures
+
+
+def _hit_rates(flops: np.ndarray, hero_weights: np.ndarray) -> np.ndarray:
+    """计算每个翻牌上英雄范围落入各击中分类的比例，形状 (F, len(HIT_CATEGORIES))"""
+    count = flops.shape[0]
+    hands = np.empty((count, TOTAL_COMBOS, 5), dtype=np.int64)
+    hands[:, :, :2] = COMBOS
+    hands[:, :, 2:] = flops[:, None, :]
+    cards = hands.reshape(-1, 5)
+    made = category(evaluate(cards)).reshape(count, TOTAL_COMBOS)
+
+    # 听牌：只统计尚未成顺子/同花的组合
+    ranks, suits = cards >> 2, cards & 3
+    rank_mask = np.bitwise_or.reduce(1 << ranks, axis=1)
+    suit_counts = (suits[:, :, None] == np.arange(4)).sum(axis=1)
+    hole_suits = suits[:, :2]
+    flush_draw = ((suit_counts == 4) & (
+        (hole_suits[:, :1] == np.arange(4)) | (hole_suits[:, 1:] == np.arange(4))
+    )).any(axis=1)
+    outs = np.zeros(cards.shape[0], dtype=np.int64)
+    for rank in range(13):
+        completed = STRAIGHT_HIGH[rank_mask | (1 << rank)] >= 0
+        outs += completed & (STRAIGHT_HIGH[rank_mask] < 0)
+    drawing = made.ravel() < STRAIGHT
+
+    hits = np.zeros((count, TOTAL_COMBOS, len(HIT_CATEGORIES)))
+    for index in range(FULL_HOUSE):
+        hits[:, :, index] = made == index
+    hits[:, :, FULL_HOUSE] = made >= FULL_HOUSE
+    hits[:, :, 7] = (flush_draw & drawing).reshape(count, TOTAL_COMBOS)
+    hits[:, :, 8] = ((outs >= 2) & drawing).reshape(count, TOTAL_COMBOS)
+    hits[:, :, 9] = ((outs == 1) & drawing).reshape(count, TOTAL_COMBOS)
+
+    live = hero_weights[None, :] * ~COMBO_HAS_CARD.T[flops].any(axis=1)
+    totals = live.sum(axis=1, keepdims=True)
+    return np.einsum("fc,fck->fk", live, hits) / np.where(totals > 0, totals, 1)
+
+
+def analyze_flops(
+    flops: np.ndarray,
+    hands: Tuple[str, ...],
+    villain_hands: Optional[Tuple[str, ...]],
+    runouts: int,
+    seed: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    分析一批翻牌（在进程池中执行）
+
+    Args:
+        flops: (F, 3) 翻牌
+        hands: 英雄范围
+        villain_hands: 对手范围（可选）
+        runouts: 每个翻牌采样的转牌+河牌数量
+        seed: 随机种子
+
+    Returns:
+        (hits, equity)：(F, K) 击中比例，(F,) 胜率（无对手范围时为 NaN）
+    """
+    hero_weights = range_weights(hands)
+    hits = _hit_rates(flops, hero_weights)
+    equity = np.full(flops.shape[0], np.nan)
+    if villain_hands:
+        villain_weights = range_weights(villain_hands)
+        rng = np.random.default_rng(seed)
+        for index, flop in enumerate(flops):
+            share, total = equity_terms(villain_weights, board=flop.tolist(), samples=runouts, rng=rng)
+            equity[index] = range_equity(hero_weights, share, total)
+    return hits, equity
+
+
+def flop_report_params(hero: List[str], villain: Optional[List[str]], runouts: int) -> dict:
+    """翻牌报告在结果存储中的参数（范围使用规范哈希）"""
+    return {"hero": range_key(hero), "villain": range_key(villain) if villain else None, "runouts": runouts}
+
+
+def stored_flop_report(params: dict) -> Optional[dict]:
+    """从结果存储中读取击中和胜率数组并重建报告，未命中时返回 None"""
+    _, arrays = result_store.get(result_key("flop_report", params))
+    if arrays is None:
+        return None
+    flops, weights = canonical_flops()
+    return build_report(flops, weights, arrays["hits"], arrays["equity"])
+
+
+def store_flop_report(params: dict, hits: np.ndarray, equity: np.ndarray):
+    """保存翻牌报告的击中和胜率数组"""
+    result_store.put(
+        result_key("flop_report", params), "flop_report", params,
+        arrays={"hits": hits, "equity": equity},
+    )
+
+
+class FlopTextureService:
+    """翻牌面纹理报告服务"""
+
+    def __init__(self):
+        self._cache: "OrderedDict[tuple, dict]" = OrderedDict()
+
+    def _remember(self, key: tuple, report: dict):
+        self._cache[key] = report
+        while len(self._cache) > settings.flop_report_cache_size:
+            self._cache.popitem(last=False)
+
+    async def report(
+        self,
+        hands: List[str],
+        villain_hands: Optional[List[str]] = None,
+        runouts: int = 24,
+    ) -> dict:
+        """
+        生成翻牌面纹理报告（结果按规范范围哈希缓存，并保存到结果存储）
+
+        Args:
+            hands: 英雄范围
+            villain_hands: 对手范围（可选，提供时计算胜率）
+            runouts: 每个翻牌采样的转牌+河牌数量
+
+        Returns:
+            包含每个翻牌结果和纹理分组汇总的字典
+        """
+        hero = canonical_hands(hands)
+        villain = canonical_hands(villain_hands) if villain_hands else None
+        if not hero:
+            raise ValueError("范围中没有有效的手牌")
+
+        params = flop_report_params(hero, villain, runouts)
+        key = (params["hero"], params["villain"], runouts)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        report = await asyncio.to_thread(stored_flop_report, params)
+        if report is None:
+            flops, weights = canonical_flops()
+            chunks = np.array_split(np.arange(len(flops)), worker_count() * 4)
+            results = await asyncio.gather(*[
+                run_in_pool(analyze_flops, flops[chunk], hero, villain, runouts, seed)
+                for seed, chunk in enumerate(chunks)
+            ])
+            hits = np.concatenate([r[0] for r in results])
+            equity = np.concatenate([r[1] for r in results])
+            await asyncio.to_thread(store_flop_report, params, hits, equity)
+            report = build_report(flops, weights, hits, equity)
+
+        report["range_key"] = key[0]
+        self._remember(key, report)
+        return report
+
+    async def warm(self, limit: int) -> int:
+        """
+        从结果存储加载最近使用的报告到内存缓存（启动时调用）
+
+        Args:
+            limit: 最多加载的报告数
+
+        Returns:
+            加载的报告数
+        """
+        def load() -> List[Tuple[tuple, dict]]:
+            loaded = []
+            for _, params in result_store.recent("flop_report", min(limit, settings.flop_report_cache_size)):
+                report = stored_flop_report(params)
+                if report is not None:
+                    report["range_key"] = params["hero"]
+                    loaded.append(((params["hero"], params["villain"], params["runouts"]), report))
+            return loaded
+
+        loaded = await asyncio.to_thread(load)
+        # 从最久的开始加入，最近使用的报告排在内存缓存的末尾
+        for key, report in reversed(loaded):
+            if key not in self._cache:
+                self._remember(key, report)
+        return len(loaded)
+
+
+def build_report(
+    flops: np.ndarray,
+    weights: np.ndarray,
+    hits: np.ndarray,
+    equity: np.ndarray,
+) -> dict:
+    """
+    按纹理分组汇总每个翻牌的结果
+
+    Args:
+        flops: (F, 3) 翻牌
+        weights: (F,) 每个翻牌类别的原始翻牌数
+        hits: (F, K) 击中比例
+        equity: (F,) 胜率
+
+    Returns:
+        报告字典
+    """
+    textures = [flop_textures(flop) for flop in flops]
+    has_equity = not np.isnan(equity).all()
+
+    buckets = []
+    for texture in TEXTURES:
+        mask = np.array([texture in t for t in textures])
+        if not mask.any():
+            continue
+        w = weights[mask].astype(np.float64)
+        hit_rates = (w @ hits[mask]) / w.sum()
+        buckets.append({
+            "texture": texture,
+            "flops": int(mask.sum()),
+            "frequency": round(float(w.sum() / weights.sum()), 4),
+            "hit_rates": {name: round(float(v), 4) for name, v in zip(HIT_CATEGORIES, hit_rates)},
+            "equity": round(float(w @ equity[mask] / w.sum()), 4) if has_equity else None,
+        })
+
+    entries = [
+        {
+            "board": "".join(card_name(int(card)) for card in flop),
+            "textures": textures[index][1:],
+            "weight": int(weights[index]),
+            "hit_rates": {name: round(float(v), 4) for name, v in zip(HIT_CATEGORIES, hits[index])},
+            "equity": round(float(equity[index]), 4) if has_equity else None,
+        }
+        for index, flop in enumerate(flops)
+    ]
+    return {"buckets": buckets, "flops": entries}
+
+
+# 全局翻牌纹理服务实例
+flop_texture_service = FlopTextureService()
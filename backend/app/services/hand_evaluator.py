@@ -0,0 +1,171 @@
+"""
+向量化的手牌强度评估
+一次性评估大批 5-7 张牌的组合，返回可直接比较大小的整数强度
+"""
+import numpy as np
+
+# 牌型分类
+HIGH_CARD = 0
+ONE_PAIR = 1
+TWO_PAIR = 2
+THREE_OF_A_KIND = 3
+STRAIGHT = 4
+FLUSH = 5
+FULL_HOUSE = 6
+FOUR_OF_A_KIND = 7
+STRAIGHT_FLUSH = 8
+
+CATEGORY_NAMES = [
+    "high_card",
+    "one_pair",
+    "two_pair",
+    "three_of_a_kind",
+    "straight",
+    "flush",
+    "full_house",
+    "four_of_a_kind",
+    "straight_flush",
+]
+
+# 强度编码: 牌型 << 20 | 最多 5 个 4 位的踢脚
+CATEGORY_SHIFT = 20
+
+
+def _build_tables():
+    masks = np.arange(1 << 13)
+
+    popcount = np.zeros(1 << 13, dtype=np.int8)
+    highest = np.full(1 << 13, -1, dtype=np.int8)
+    top5 = np.zeros(1 << 13, dtype=np.int32)
+    straight_high = np.full(1 << 13, -1, dtype=np.int8)
+
+    for rank in range(13):
+        has = (masks >> rank) & 1 == 1
+        popcount += has
+        highest[has] = rank
+
+    # 取最高的 5 个点数，高位在前打包
+    remaining = masks.copy()
+    for slot in range(5):
+        top = highest[remaining]
+        valid = top >= 0
+        top5[valid] |= top[valid].astype(np.int32) << (4 * (4 - slot))
+        remaining[valid] &= ~(1 << top[valid].astype(np.int64))
+
+    # 顺子：5 个连续点数，A 可以作为 1（A2345）
+    for high in range(3, 13):
+        if high == 3:
+            pattern = 0b1000000001111
+        else:
+            pattern = 0b11111 << (high - 4)
+        straight_high[(masks & pattern) == pattern] = high
+
+    return popcount, highest, top5, straight_high
+
+
+POPCOUNT, HIGHEST_RANK, TOP5, STRAIGHT_HIGH = _build_tables()
+
+
+def _top(mask: np.ndarray, count: int) -> np.ndarray:
+    """取掩码中最高的 count 个点数，打包在高位"""
+    packed = TOP5[mask]
+    return (packed >> (4 * (5 - count))) << (4 * (5 - count))
+
+
+def evaluate(cards: np.ndarray) -> np.ndarray:
+    """
+    批量评估手牌强度
+
+    Args:
+        cards: (N, k) 的牌索引数组，5 <= k <= 7，索引为 点数 * 4 + 花色
+
+    Returns:
+        (N,) int32 强度，数值越大牌力越强
+    """
+    cards = np.asarray(cards, dtype=np.int64)
+    n = cards.shape[0]
+    if n == 0:
+        return np.zeros(0, dtype=np.int32)
+
+    ranks = cards >> 2
+    bits = (1 << ranks).astype(np.int32)
+    # 每种花色占 16 位，一次按位或即可得到所有花色的点数掩码
+    suit_bits = np.left_shift(1, (cards & 3) * 16 + ranks)
+
+    # 逐张累加，得到出现至少 1/2/3/4 次的点数掩码
+    m1 = np.zeros(n, dtype=np.int32)
+    m2 = np.zeros(n, dtype=np.int32)
+    m3 = np.zeros(n, dtype=np.int32)
+    m4 = np.zeros(n, dtype=np.int32)
+    packed = np.zeros(n, dtype=np.int64)
+    for column in range(cards.shape[1]):
+        bit = bits[:, column]
+        m4 |= m3 & bit
+        m3 |= m2 & bit
+        m2 |= m1 & bit
+        m1 |= bit
+        packed |= suit_bits[:, column]
+
+    # 每种花色包含的点数掩码 (N, 4)
+    suit_masks = (packed[:, None] >> np.arange(0, 64, 16)) & 0x1FFF
+
+    # 7 张牌内最多只有一种花色能凑成同花
+    flush_mask = np.where(POPCOUNT[suit_masks] >= 5, suit_masks, 0).max(axis=1)
+    has_flush = flush_mask != 0
+
+    result = _top(m1, 5)  # 高牌
+
+    # 一对
+    pair = HIGHEST_RANK[m2].astype(np.int32)
+    has_pair = pair >= 0
+    pair_bit = np.where(has_pair, 1 << np.maximum(pair, 0), 0)
+    value = (ONE_PAIR << CATEGORY_SHIFT) | (pair << 16) | (_top(m1 & ~pair_bit, 3) >> 4)
+    result = np.where(has_pair, value, result)
+
+    # 两对
+    second = HIGHEST_RANK[m2 & ~pair_bit].astype(np.int32)
+    has_two = has_pair & (second >= 0)
+    second_bit = np.where(has_two, 1 << np.maximum(second, 0), 0)
+    kicker = HIGHEST_RANK[m1 & ~pair_bit & ~second_bit].astype(np.int32)
+    value = (TWO_PAIR << CATEGORY_SHIFT) | (pair << 16) | (second << 12) | (np.maximum(kicker, 0) << 8)
+    result = np.where(has_two, value, result)
+
+    # 三条
+    trips = HIGHEST_RANK[m3].astype(np.int32)
+    has_trips = trips >= 0
+    trips_bit = np.where(has_trips, 1 << np.maximum(trips, 0), 0)
+    value = (THREE_OF_A_KIND << CATEGORY_SHIFT) | (trips << 16) | (_top(m1 & ~trips_bit, 2) >> 4)
+    result = np.where(has_trips, value, result)
+
+    # 顺子
+    straight = STRAIGHT_HIGH[m1].astype(np.int32)
+    result = np.where(straight >= 0, (STRAIGHT << CATEGORY_SHIFT) | (straight << 16), result)
+
+    # 同花
+    result = np.where(has_flush, (FLUSH << CATEGORY_SHIFT) | _top(flush_mask, 5), result)
+
+    # 葫芦：三条 + 剩余点数中最大的对子（可能是第二个三条）
+    full_pair = HIGHEST_RANK[m2 & ~trips_bit].astype(np.int32)
+    has_full = has_trips & (full_pair >= 0)
+    value = (FULL_HOUSE << CATEGORY_SHIFT) | (trips << 16) | (full_pair << 12)
+    result = np.where(has_full, value, result)
+
+    # 四条
+    quads = HIGHEST_RANK[m4].astype(np.int32)
+    has_quads = quads >= 0
+    quads_bit = np.where(has_quads, 1 << np.maximum(quads, 0), 0)
+    kicker = HIGHEST_RANK[m1 & ~quads_bit].astype(np.int32)
+    value = (FOUR_OF_A_KIND << CATEGORY_SHIFT) | (quads << 16) | (np.maximum(kicker, 0) << 12)
+    result = np.where(has_quads, value, result)
+
+    # 同花顺
+    straight_flush = STRAIGHT_HIGH[flush_mask].astype(np.int32)
+    value = (STRAIGHT_FLUSH << CATEGORY_SHIFT) | (straight_flush << 16)
+    result = np.where(straight_flush >= 0, value, result)
+
+    return result.astype(np.int32)
+
+
+def category(strength: np.ndarray) -> np.ndarray:
+    """从强度中取出牌型分类"""
+    return np.asarray(strength) >> CATEGORY_SHIFT
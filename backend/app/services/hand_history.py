@@ -0,0 +1,366 @@
+"""
+手牌历史导入
+流式解析 PokerStars / GG 格式的手牌历史文本，按玩家和位置统计
+VPIP/PFR 以及摊牌（或已知底牌）手牌，生成可直接用于范围接口的手牌列表
+
+文件通过 mmap 读取，并按手牌边界切分成若干块交给进程池并行处理，
+每个工作进程只保留按（玩家, 位置）汇总的计数，内存占用与文件大小无关
+"""
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+import logging
+import mmap
+import os
+import re
+import numpy as np
+
+from ..config.settings import settings
+from .cards import COMBO_CLASS, COMBO_INDEX, HAND_CLASSES, card_index
+from .preflop_equity import top_percent_range
+from .push_fold import POSITION_NAMES, position_names
+
+logger = logging.getLogger(__name__)
+
+# 每块的大小（字节），块边界会对齐到下一手牌的开头
+CHUNK_SIZE = 64 * 1024 * 1024
+
+# 手牌开头：PokerStars "PokerStars Hand #..." / "PokerStars Zoom Hand #..."，GG "Poker Hand #..."
+HAND_START = re.compile(rb"^(?:\xef\xbb\xbf)?(?:PokerStars (?:Zoom )?Hand|Poker Hand) #", re.M)
+
+_BUTTON = re.compile(r"Seat #(\d+) is the button")
+_SEAT = re.compile(r"^Seat (\d+): (.+?) \([^\n]*?in chips\)(.*)$", re.M)
+_DEALT = re.compile(r"^Dealt to (.+?) \[(\S\S) (\S\S)\]", re.M)
+_ACTION = re.compile(r"^(.+?): (calls|raises|bets|checks|folds)\b", re.M)
+_SHOWS = re.compile(r"^(.+?): shows \[(\S\S) (\S\S)\]", re.M)
+_SUMMARY_SHOWN = re.compile(r"^Seat (\d+): .*?(?:showed|mucked) \[(\S\S) (\S\S)\]", re.M)
+
+# 汇总向量的行：摊牌手牌、已知底牌且主动入池的手牌
+SHOWDOWN_ROW = 0
+VPIP_KNOWN_ROW = 1
+
+
+@dataclass
+class HandRecord:
+    """单手牌的解析结果"""
+    positions: Dict[str, str]
+    vpip: set = field(default_factory=set)
+    pfr: set = field(default_factory=set)
+    # 玩家 -> 底牌所属类别索引
+    known: Dict[str, int] = field(default_factory=dict)
+    showdown: set = field(default_factory=set)
+
+
+@dataclass
+class PositionStats:
+    """某个玩家在某个位置上的统计"""
+    hands: int = 0
+    vpip: int = 0
+    pfr: int = 0
+    # (2, 169)：摊牌次数、已知底牌且主动入池的次数
+    classes: np.ndarray = field(default_factory=lambda: np.zeros((2, 169), dtype=np.int32))
+
+    def merge(self, other: "PositionStats"):
+        self.hands += other.hands
+        self.vpip += other.vpip
+        self.pfr += other.pfr
+        self.classes += other.classes
+
+
+def _hole_class(first: str, second: str) -> Optional[int]:
+    """两张底牌 -> 手牌类别索引；无法识别时返回 None"""
+    try:
+        a, b = card_index(first), card_index(second)
+    except ValueError:
+        return None
+    combo = COMBO_INDEX[max(a, b), min(a, b)]
+    return int(COMBO_CLASS[combo]) if combo >= 0 else None
+
+
+def _seat_positions(seats: List[Tuple[int, str]], button: int) -> Dict[str, str]:
+    """
+    根据按钮位推算每位玩家的位置
+
+    Args:
+        seats: 按座位号排序的 (座位号, 玩家名)
+        button: 按钮座位号
+
+    Returns:
+        玩家名 -> 位置名称
+    """
+    count = len(seats)
+    # 从按钮后第一个座位开始：小盲、大盲、枪口……按钮
+    order = [s for s in seats if s[0] > button] + [s for s in seats if s[0] <= button]
+    if count == 2:
+        # 单挑时按钮位是小盲
+        return {order[0][1]: "BB", order[1][1]: "SB"}
+    names = position_names(count)
+    positions = {order[0][1]: "SB", order[1][1]: "BB"}
+    for (_, player), name in zip(order[2:], names[:-2]):
+        positions[player] = name
+    return positions
+
+
+def parse_hand(text: str) -> Optional[HandRecord]:
+    """
+    解析一手德州扑克手牌
+
+    Args:
+        text: 单手牌的完整文本
+
+    Returns:
+        解析结果；非德州扑克或格式无法识别时返回 None
+    """
+    header, _, body = text.partition("\n")
+    if "Hold'em" not in header:
+        return None
+    button = _BUTTON.search(body)
+    setup, marker, rest = body.partition("*** HOLE CARDS ***")
+    if button is None or not marker:
+        return None
+
+    seats = sorted(
+        (int(number), name)
+        for number, name, tail in _SEAT.findall(setup)
+        if "sitting out" not in tail
+    )
+    if not 2 <= len(seats) <= len(POSITION_NAMES):
+        return None
+    record = HandRecord(positions=_seat_positions(seats, int(button.group(1))))
+    seat_names = dict(seats)
+
+    # 翻前行动：到下一个 "*** " 标记为止
+    preflop = rest.split("\n*** ", 1)[0]
+    for player, action in _ACTION.findall(preflop):
+        if action in ("calls", "raises", "bets"):
+            record.vpip.add(player)
+        if action in ("raises", "bets"):
+            record.pfr.add(player)
+
+    for player, first, second in _DEALT.findall(preflop):
+        hole = _hole_class(first, second)
+        if hole is not None:
+            record.known[player] = hole
+    for player, first, second in _SHOWS.findall(rest):
+        hole = _hole_class(first, second)
+        if hole is not None:
+            record.known[player] = hole
+            record.showdown.add(player)
+    for number, first, second in _SUMMARY_SHOWN.findall(rest):
+        player = seat_names.get(int(number))
+        hole = _hole_class(first, second)
+        if player is not None and hole is not None:
+            record.known[player] = hole
+            record.showdown.add(player)
+    return record
+
+
+def iter_hands(data: mmap.mmap, start: int, end: int) -> Iterator[str]:
+    """
+    逐手产出开头位于 [start, end) 内的手牌文本
+
+    Args:
+        data: 文件的内存映射
+        start: 起始偏移（不必对齐手牌边界）
+        end: 结束偏移
+
+    Yields:
+        单手牌文本
+    """
+    match = HAND_START.search(data, start)
+    while match is not None and match.start() < end:
+        following = HAND_START.search(data, match.end())
+        stop = following.start() if following is not None else len(data)
+        yield data[match.start():stop].decode("utf-8", errors="replace").lstrip("\ufeff")
+        match = following
+
+
+def aggregate(records: Iterable[Optional[HandRecord]]) -> Dict[Tuple[str, str], PositionStats]:
+    """
+    将手牌记录汇总为（玩家, 位置）-> 统计
+
+    Args:
+        records: 手牌记录（None 会被跳过）
+
+    Returns:
+        汇总结果
+    """
+    stats: Dict[Tuple[str, str], PositionStats] = {}
+    for record in records:
+        if record is None:
+            continue
+        for player, position in record.positions.items():
+            entry = stats.get((player, position))
+            if entry is None:
+                entry = stats[(player, position)] = PositionStats()
+            entry.hands += 1
+            voluntary = player in record.vpip
+            entry.vpip += voluntary
+            entry.pfr += player in record.pfr
+            hole = record.known.get(player)
+            if hole is None:
+                continue
+            if player in record.showdown:
+                entry.classes[SHOWDOWN_ROW, hole] += 1
+            if voluntary:
+                entry.classes[VPIP_KNOWN_ROW, hole] += 1
+    return stats
+
+
+def ingest_chunk(path: str, start: int, end: int) -> Dict[Tuple[str, str], PositionStats]:
+    """
+    解析文件中的一块（在进程池中执行）
+
+    Args:
+        path: 文件路径
+        start: 起始偏移
+        end: 结束偏移
+
+    Returns:
+        这一块的汇总结果
+    """
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return {}
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return aggregate(parse_hand(text) for text in iter_hands(data, start, end))
+
+
+def _chunks(paths: Iterable[str], chunk_size: int) -> Iterator[Tuple[str, int, int]]:
+    for path in paths:
+        size = os.path.getsize(path)
+        for start in range(0, size, chunk_size):
+            yield path, start, min(start + chunk_size, size)
+
+
+def merge_stats(
+    target: Dict[Tuple[str, str], PositionStats],
+    partial: Dict[Tuple[str, str], PositionStats],
+):
+    """将部分汇总结果合并到 target"""
+    for key, entry in partial.items():
+        if key in target:
+            target[key].merge(entry)
+        else:
+            target[key] = entry
+
+
+def ingest_files(
+    paths: Iterable[str],
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Dict[Tuple[str, str], PositionStats]:
+    """
+    并行解析手牌历史文件
+
+    Args:
+        paths: 文件路径
+        workers: 进程数（默认使用 CPU 核数）
+        chunk_size: 每块大小（字节）
+
+    Returns:
+        （玩家, 位置）-> 统计
+    """
+    stats: Dict[Tuple[str, str], PositionStats] = {}
+    chunks = list(_chunks(paths, chunk_size))
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        futures = [executor.submit(ingest_chunk, *chunk) for chunk in chunks]
+        for done, future in enumerate(futures, start=1):
+            merge_stats(stats, future.result())
+            logger.info(f"📥 已处理 {done}/{len(chunks)} 块")
+    return stats
+
+
+def _class_list(counts: np.ndarray) -> List[str]:
+    return [HAND_CLASSES[i] for i in np.flatnonzero(counts)]
+
+
+def build_ranges(stats: Dict[Tuple[str, str], PositionStats], min_hands: int = 1) -> Dict[str, dict]:
+    """
+    将统计转换为可直接用于范围接口的结果
+
+    VPIP/PFR 范围按翻前手牌排名取相同比例的前 X% 手牌；
+    摊牌和已知底牌的手牌列出实际观察到的类别及次数
+
+    Args:
+        stats: 汇总统计
+        min_hands: 某个位置至少需要的手数
+
+    Returns:
+        玩家 -> 位置 -> 范围
+    """
+    players: Dict[str, dict] = {}
+    for (player, position), entry in sorted(stats.items()):
+        if entry.hands < min_hands:
+            continue
+        vpip = entry.vpip / entry.hands * 100
+        pfr = entry.pfr / entry.hands * 100
+        showdown, vpip_known = entry.classes[SHOWDOWN_ROW], entry.classes[VPIP_KNOWN_ROW]
+        players.setdefault(player, {})[position] = {
+            "hands": entry.hands,
+            "vpip": round(vpip, 2),
+            "pfr": round(pfr, 2),
+            "vpip_range": top_percent_range(vpip),
+            "pfr_range": top_percent_range(pfr),
+            "showdown_hands": _class_list(showdown),
+            "showdown_counts": {HAND_CLASSES[i]: int(showdown[i]) for i in np.flatnonzero(showdown)},
+            "observed_vpip_hands": _class_list(vpip_known),
+        }
+    return players
+
+
+def _position_order(position: str) -> int:
+    return POSITION_NAMES.index(position) if position in POSITION_NAMES else len(POSITION_NAMES)
+
+
+class ObservedRangeService:
+    """读取导入工具生成的观察范围文件（文件变化时自动重新加载）"""
+
+    def __init__(self):
+        self._players: Dict[str, dict] = {}
+        self._mtime: Optional[float] = None
+
+    @property
+    def path(self) -> Path:
+        return Path(settings.observed_ranges_file)
+
+    def _load(self):
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            self._players, self._mtime = {}, None
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️  观察范围文件读取失败: {e}")
+            return
+        # 玩家名不区分大小写查找
+        self._players = {name.lower(): positions for name, positions in data.get("players", {}).items()}
+        self._mtime = mtime
+
+    def get(self, player: str) -> Optional[Dict[str, dict]]:
+        """
+        获取玩家按位置的观察范围
+
+        Args:
+            player: 玩家名
+
+        Returns:
+            位置 -> 范围（按位置顺序）；没有该玩家时返回 None
+        """
+        self._load()
+        positions = self._players.get(player.strip().lower())
+        if positions is None:
+            return None
+        return OrderedDict(sorted(positions.items(), key=lambda item: _position_order(item[0])))
+
+
+# 全局观察范围服务实例
+observed_range_service = ObservedRangeService()
@@ -0,0 +1,362 @@
+"""
+异步作业
+耗时的范围计算（翻牌纹理报告、全下/弃牌扫描、多人胜率等）以作业方式提交：
+每个作业在独立的子进程中运行，通过管道回传进度和结果，取消时直接终止子进程
+
+- 每个用户同时运行的作业数有上限，超出的作业排队；排队过多时拒绝提交
+- 结束的作业保留一段时间供查询结果，过期后删除
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+import asyncio
+import logging
+import multiprocessing
+import time
+import uuid
+import numpy as np
+
+from ..config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERMINAL_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+# 事件流在没有进度变化时发送心跳的间隔（秒）
+HEARTBEAT_SECONDS = 15.0
+
+
+class JobLimitError(Exception):
+    """用户排队的作业过多"""
+
+
+# ==========================================
+# 作业内容（在子进程中执行）
+# ==========================================
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def _flop_report_job(params: dict, progress: ProgressCallback) -> dict:
+    from .cards import canonical_hands
+    from .flop_texture import (
+        analyze_flops, build_report, canonical_flops, flop_report_params, store_flop_report, stored_flop_report
+    )
+
+    hero = canonical_hands(params["hands"])
+    villain = canonical_hands(params["villain_hands"]) if params.get("villain_hands") else None
+    if not hero:
+        raise ValueError("范围中没有有效的手牌")
+
+    store_params = flop_report_params(hero, villain, params["runouts"])
+    report = stored_flop_report(store_params)
+    if report is None:
+        flops, weights = canonical_flops()
+        chunks = np.array_split(np.arange(len(flops)), 50)
+        hits, equity = [], []
+        for seed, chunk in enumerate(chunks):
+            chunk_hits, chunk_equity = analyze_flops(flops[chunk], hero, villain, params["runouts"], seed)
+            hits.append(chunk_hits)
+            equity.append(chunk_equity)
+            progress(seed + 1, len(chunks))
+        hits, equity = np.concatenate(hits), np.concatenate(equity)
+        store_flop_report(store_params, hits, equity)
+        report = build_report(flops, weights, hits, equity)
+    else:
+        progress(1, 1)
+
+    return {
+        "range_key": store_params["hero"],
+        "buckets": report["buckets"],
+        "flops": report["flops"] if params.get("include_flops") else None,
+    }
+
+
+def _push_fold_sweep_job(params: dict, progress: ProgressCallback) -> dict:
+    from .push_fold import solve_push_fold
+
+    step = params["step"]
+    stacks = np.arange(params["min_stack"], params["max_stack"] + step / 2, step)
+    results = []
+    for index, stack in enumerate(stacks):
+        results.append(solve_push_fold(float(stack), players=params["players"], ante=params["ante"]))
+        progress(index + 1, len(stacks))
+    return {"results": results}
+
+
+def _multiway_equity_job(params: dict, progress: ProgressCallback) -> dict:
+    from .cards import parse_board
+    from .multiway_equity import multiway_equity, prepare_ranges
+
+    progress(0, 1)
+    result = multiway_equity(
+        prepare_ranges(params["ranges"]),
+        board=parse_board(params.get("board")),
+        target_std_error=params["target_std_error"],
+        max_samples=params["max_samples"],
+    )
+    progress(1, 1)
+    return result
+
+
+JOB_RUNNERS: Dict[str, Callable[[dict, ProgressCallback], dict]] = {
+    "flop_report": _flop_report_job,
+    "push_fold_sweep": _push_fold_sweep_job,
+    "multiway_equity": _multiway_equity_job,
+}
+
+
+def _job_main(kind: str, params: dict, conn):
+    """子进程入口：执行作业，通过管道发送进度和结果"""
+    def progress(done: int, total: int):
+        conn.send(("progress", done, total))
+
+    try:
+        conn.send(("result", JOB_RUNNERS[kind](params, progress)))
+    except Exception as e:
+        conn.send(("error", str(e)))
+    finally:
+        conn.close()
+
+
+def _context():
+    # forkserver 从干净的服务进程 fork，避免复制事件循环和线程；并预先导入计算模块
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+# ==========================================
+# 作业管理（在主进程中执行）
+# ==========================================
+
+@dataclass
+class Job:
+    """单个作业"""
+    job_id: str
+    user: str
+    kind: str
+    params: dict
+    status: str = QUEUED
+    done: int = 0
+    total: int = 0
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[float] = None
+    process: Any = None
+    task: Optional[asyncio.Task] = None
+    updated: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def progress(self) -> float:
+        if self.status == COMPLETED:
+            return 1.0
+        return self.done / self.total if self.total else 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def snapshot(self) -> dict:
+        """作业状态（不含结果）"""
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "done": self.done,
+            "total": self.total,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobService:
+    """作业管理服务"""
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._context = None
+
+    def _notify(self, job: Job):
+        """唤醒正在等待该作业变化的事件流"""
+        event, job.updated = job.updated, asyncio.Event()
+        event.set()
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None):
+        if job.finished:
+            return
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.now()
+        job.expires_at = time.monotonic() + settings.job_retention_seconds
+        self._notify(job)
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        for job_id in [k for k, j in self.jobs.items() if j.expires_at is not None and j.expires_at <= now]:
+            del self.jobs[job_id]
+
+    def _semaphore(self, user: str) -> asyncio.Semaphore:
+        if user not in self._semaphores:
+            self._semaphores[user] = asyncio.Semaphore(settings.job_max_running_per_user)
+        return self._semaphores[user]
+
+    def _prune_semaphore(self, job: Job):
+        """用户没有其他运行中或排队中的作业时删除其信号量，避免信号量随用户数累积"""
+        pending = any(
+            j is not job and j.user == job.user and j.task is not None and not j.task.done()
+            for j in self.jobs.values()
+        )
+        if not pending:
+            self._semaphores.pop(job.user, None)
+
+    def submit(self, user: str, kind: str, params: dict) -> Job:
+        """
+        提交作业
+
+        Args:
+            user: 用户标识
+            kind: 作业类型
+            params: 已校验的作业参数
+
+        Returns:
+            新作业
+
+        Raises:
+            JobLimitError: 用户未结束的作业过多
+        """
+        self._purge_expired()
+        active = sum(1 for j in self.jobs.values() if j.user == user and not j.finished)
+        limit = settings.job_max_running_per_user + settings.job_max_queued_per_user
+        if active >= limit:
+            raise JobLimitError(f"未结束的作业过多（上限 {limit} 个），请等待完成或取消部分作业")
+
+        job = Job(job_id=str(uuid.uuid4()), user=user, kind=kind, params=params)
+        self.jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str, user: str) -> Optional[Job]:
+        """获取作业（只能访问自己的作业）"""
+        self._purge_expired()
+        job = self.jobs.get(job_id)
+        return job if job is not None and job.user == user else None
+
+    async def _run(self, job: Job):
+        try:
+            async with self._semaphore(job.user):
+                if job.finished:
+                    return
+                if self._context is None:
+                    self._context = _context()
+                receiver, sender = self._context.Pipe(duplex=False)
+                job.process = self._context.Process(
+                    target=_job_main, args=(job.kind, job.params, sender), daemon=True
+                )
+                job.process.start()
+                sender.close()
+                job.status = RUNNING
+                job.started_at = datetime.now()
+                self._notify(job)
+                try:
+                    await self._receive(job, receiver)
+                finally:
+                    receiver.close()
+                    await asyncio.to_thread(job.process.join, 5)
+        finally:
+            self._prune_semaphore(job)
+
+    async def _receive(self, job: Job, receiver):
+        """通过事件循环监听管道，处理子进程发来的进度和结果"""
+        loop = asyncio.get_running_loop()
+        closed = loop.create_future()
+
+        def on_readable():
+            try:
+                while receiver.poll():
+                    message = receiver.recv()
+                    if message[0] == "progress":
+                        job.done, job.total = message[1], message[2]
+                        self._notify(job)
+                    elif message[0] == "result" and not job.finished:
+                        job.result = message[1]
+                        self._finish(job, COMPLETED)
+                    elif message[0] == "error":
+                        self._finish(job, FAILED, message[1])
+            except (EOFError, OSError):
+                # 子进程退出（正常结束、被终止或崩溃）
+                if not closed.done():
+                    closed.set_result(None)
+
+        loop.add_reader(receiver.fileno(), on_readable)
+        try:
+            await closed
+        finally:
+            loop.remove_reader(receiver.fileno())
+        if not job.finished:
+            # 管道关闭时子进程可能还没退出完，先等待退出才能拿到退出码
+            await asyncio.to_thread(job.process.join, 5)
+            self._finish(job, FAILED, f"作业进程异常退出（退出码 {job.process.exitcode}）")
+
+    async def cancel(self, job: Job):
+        """
+        取消作业：排队中直接标记取消，运行中终止子进程
+
+        Args:
+            job: 作业
+        """
+        if job.finished:
+            return
+        self._finish(job, CANCELLED)
+        if job.process is not None and job.process.is_alive():
+            job.process.terminate()
+            await asyncio.to_thread(job.process.join, 2)
+            if job.process.is_alive():
+                job.process.kill()
+
+    async def delete(self, job: Job):
+        """取消（如未结束）并删除作业"""
+        await self.cancel(job)
+        self.jobs.pop(job.job_id, None)
+
+    async def events(self, job: Job) -> AsyncIterator[Optional[dict]]:
+        """
+        作业状态变化流，直到作业结束
+
+        Yields:
+            作业状态；长时间没有变化时产出 None 作为心跳
+        """
+        while True:
+            updated = job.updated
+            yield job.snapshot()
+            if job.finished:
+                return
+            while not updated.is_set():
+                try:
+                    await asyncio.wait_for(updated.wait(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+
+    def shutdown(self):
+        """应用关闭时终止所有运行中的作业"""
+        for job in self.jobs.values():
+            if job.process is not None and job.process.is_alive():
+                job.process.terminate()
+
+
+# 全局作业服务实例
+job_service = JobService()
@@ -1,15 +1,163 @@
 """
 LLM 服务
 支持 Azure OpenAI 和标准 OpenAI
+
+多提供商模式下同时持有两个客户端（共用一个 HTTP 连接池）：
+- 首选提供商超过其首字延迟的 p95 仍未返回内容时，向另一个提供商发出对冲请求，
+  先返回首个内容的一方胜出，另一方被取消
+- 请求出错时自动切换到另一个提供商
 """
-from typing import Optional, List
+from collections import deque
+from functools import lru_cache
+from typing import AsyncIterator, Optional, List, Tuple
 from langchain_openai import AzureChatOpenAI, ChatOpenAI
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from ..config.settings import settings
+from .cards import canonical_hands, hand_combos
+from .stub_llm import StubChatModel
+from .profiling import span
+import asyncio
 import logging
+import time
+import httpx
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# 系统提示的固定前缀：内容不能包含任何随请求变化的部分
+SYSTEM_PROMPT = """你是一个专业的德州扑克策略助手。你的任务是：
+
+1. 帮助玩家分析手牌范围的合理性
+2. 根据位置、场景和对手风格提供策略建议
+3. 解释扑克概率和数学概念
+4. 回答关于德州扑克的各种问题
+
+回答时请：
+- 使用清晰简洁的语言
+- 提供具体的数字和概率
+- 基于GTO（博弈论最优）策略
+- 考虑实战中的灵活应用
+- 使用中文回答
+
+重要概念：
+- 对子（如 AA）有 6 种组合
+- 同色（如 AKs）有 4 种组合
+- 不同色（如 AKo）有 12 种组合
+- 总共 1326 种起手牌组合
+
+请保持专业、友好和耐心。"""
+
+
+@lru_cache(maxsize=512)
+def _system_prompt_with_range(hands: Tuple[str, ...], name: str) -> str:
+    """
+    固定前缀 + 范围信息（按规范化后的范围缓存）
+    
+    Args:
+        hands: 规范化后的手牌（按矩阵顺序）
+        name: 范围名称
+    
+    Returns:
+        系统提示文本
+    """
+    total_combos = sum(hand_combos(hand) for hand in hands)
+    probability = (total_combos / 1326) * 100
+    
+    range_info = f"""
+
+**当前用户选择的范围信息：**
+- 范围名称：{name}
+- 包含手牌：{', '.join(hands)}
+- 手牌数量：{len(hands)} 种
+- 总组合数：{total_combos} 种
+- 出现概率：{probability:.2f}%
+
+请在回答时优先考虑并分析用户当前选择的这个范围。你可以：
+- 评价这个范围的强度和松紧程度
+- 分析这个范围在不同位置和场景下的适用性
+- 提供针对这个范围的优化建议
+- 回答关于这个范围的具体问题"""
+    
+    return SYSTEM_PROMPT + range_info
+
+
+def stable_history_window(history: List[dict], size: int) -> List[dict]:
+    """
+    截取最近的对话历史，截断位置按 size 对齐
+    
+    每轮都取最后 size 条会让历史的起点每轮都变化，之前的提示前缀无法复用；
+    按 size 对齐后，起点每 size 条消息才移动一次（实际条数在 size 到 2*size-1 之间）
+    
+    Args:
+        history: 对话历史
+        size: 至少保留的消息数
+    
+    Returns:
+        截取后的历史
+    """
+    start = max(0, len(history) - size) // size * size
+    return history[start:]
+
+
+# 估计首字延迟分位数前至少需要的样本数
+MIN_LATENCY_SAMPLES = 20
+
+
+class LLMProvider:
+    """单个 LLM 提供商及其首字延迟统计"""
+
+    def __init__(self, name: str, llm):
+        self.name = name
+        self.llm = llm
+        self.latencies = deque(maxlen=200)
+        self.cooldown_until = 0.0
+
+    def hedge_delay(self) -> float:
+        """对冲等待时间（秒）：最近首字延迟的分位数，样本不足时使用初始值"""
+        if len(self.latencies) < MIN_LATENCY_SAMPLES:
+            return settings.ai_hedge_initial_delay_ms / 1000
+        return float(np.quantile(self.latencies, settings.ai_hedge_quantile))
+
+    def record_latency(self, seconds: float):
+        self.latencies.append(seconds)
+
+    def record_failure(self):
+        """出错后一段时间内不作为首选提供商"""
+        self.cooldown_until = time.monotonic() + settings.ai_failover_cooldown_seconds
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    async def stream(self, messages: list) -> AsyncIterator[str]:
+        """流式调用，只产出非空文本块"""
+        async for chunk in self.llm.astream(messages):
+            if hasattr(chunk, 'content') and chunk.content:
+                yield chunk.content
+
+
+class _Attempt:
+    """对某个提供商的一次请求（等待首个文本块）"""
+
+    def __init__(self, provider: LLMProvider, messages: list):
+        self.provider = provider
+        self.started = time.monotonic()
+        self.stream = provider.stream(messages)
+        self.first = asyncio.ensure_future(self.stream.__anext__())
+
+    async def cancel(self):
+        """取消请求并关闭连接"""
+        self.first.cancel()
+        try:
+            await self.first
+        except (asyncio.CancelledError, Exception):
+            pass
+        await self.stream.aclose()
+
+
+class LLMUnavailableError(RuntimeError):
+    """AI 服务未配置"""
+
 
 class LLMService:
     """LLM 服务类"""
@@ -17,47 +165,234 @@ class LLMService:
     def __init__(self):
         self.llm = None
         self.provider = None
+        self.providers: List[LLMProvider] = []
+        self.http_client: Optional[httpx.AsyncClient] = None
         self._initialize_llm()
     
     def _initialize_llm(self):
         """初始化 LLM"""
         try:
-            if settings.is_azure_configured:
+            multi_provider = (
+                settings.ai_multi_provider
+                and not settings.ai_stub_llm
+                and settings.is_azure_configured
+                and settings.is_openai_configured
+            )
+            options = {
+                "temperature": settings.ai_temperature,
+                "max_tokens": settings.ai_max_tokens,
+            }
+            if multi_provider:
+                # 两个客户端共用连接池；失败时直接切换提供商，不在同一提供商上重试
+                self.http_client = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.ai_http_max_connections,
+                        max_keepalive_connections=settings.ai_http_max_connections,
+                    ),
+                    timeout=httpx.Timeout(60.0, connect=5.0),
+                )
+                options["http_async_client"] = self.http_client
+                options["max_retries"] = 0
+            
+            if settings.ai_stub_llm:
+                # 压测用的模拟模型，优先于真实配置
+                self.providers.append(LLMProvider("Stub", StubChatModel(
+                    first_token_ms=settings.ai_stub_first_token_ms,
+                    token_ms=settings.ai_stub_token_ms,
+                    tokens=settings.ai_stub_tokens,
+                )))
+                logger.warning("⚠️  使用模拟 LLM（AI_STUB_LLM=true），回复内容与请求无关")
+            
+            elif settings.is_azure_configured:
                 # 使用 Azure OpenAI
-                self.llm = AzureChatOpenAI(
+                self.providers.append(LLMProvider("Azure OpenAI", AzureChatOpenAI(
                     azure_endpoint=settings.azure_openai_endpoint,
                     api_key=settings.azure_openai_api_key,
                     deployment_name=settings.azure_openai_deployment_name,
                     api_version=settings.azure_openai_api_version,
-                    temperature=settings.ai_temperature,
-                    max_tokens=settings.ai_max_tokens,
-                )
-                self.provider = "Azure OpenAI"
+                    **options,
+                )))
                 logger.info(f"✅ Azure OpenAI 初始化成功: {settings.azure_openai_deployment_name}")
                 
-            elif settings.is_openai_configured:
+            if settings.is_openai_configured and not settings.ai_stub_llm and (multi_provider or not self.providers):
                 # 使用标准 OpenAI
-                self.llm = ChatOpenAI(
+                self.providers.append(LLMProvider("OpenAI", ChatOpenAI(
                     api_key=settings.openai_api_key,
                     model=settings.openai_model,
-                    temperature=settings.ai_temperature,
-                    max_tokens=settings.ai_max_tokens,
-                )
-                self.provider = "OpenAI"
+                    base_url=settings.openai_base_url,
+                    **options,
+                )))
                 logger.info(f"✅ OpenAI 初始化成功: {settings.openai_model}")
                 
-            else:
+            if not self.providers:
                 logger.warning("⚠️  未配置 AI 服务，AI 功能将不可用")
+                return
+            
+            self.llm = self.providers[0].llm
+            self.provider = " + ".join(p.name for p in self.providers)
+            if multi_provider:
+                logger.info("🔀 多提供商模式：首字超时对冲 + 出错自动切换")
                 
         except Exception as e:
             logger.error(f"❌ LLM 初始化失败: {e}")
             self.llm = None
             self.provider = None
+            self.providers = []
     
     def is_available(self) -> bool:
         """检查 LLM 是否可用"""
         return self.llm is not None
     
+    async def aclose(self):
+        """关闭共用的 HTTP 连接池"""
+        if self.http_client is not None:
+            await self.http_client.aclose()
+    
+    def _ordered_providers(self) -> List[LLMProvider]:
+        """
+        健康的提供商优先；已有足够首字延迟样本的优先于样本不足的
+        （从未胜出的提供商没有样本，不能用初始等待时间和实测值比较），
+        其次按对冲等待时间（首字延迟 p95）从低到高
+        """
+        return sorted(
+            self.providers,
+            key=lambda p: (not p.healthy, len(p.latencies) < MIN_LATENCY_SAMPLES, p.hedge_delay())
+        )
+    
+    @staticmethod
+    def _build_messages(
+        message: str,
+        system_prompt: Optional[str] = None,
+        history: Optional[List[dict]] = None
+    ) -> list:
+        """构建消息列表"""
+        messages = []
+        
+        # 添加系统提示
+        if system_prompt:
+            messages.append(SystemMessage(content=system_prompt))
+        
+        # 添加历史消息
+        if history:
+            for msg in history:
+                if msg["role"] == "user":
+                    messages.append(HumanMessage(content=msg["content"]))
+                elif msg["role"] == "assistant":
+                    messages.append(AIMessage(content=msg["content"]))
+        
+        # 添加当前消息
+        messages.append(HumanMessage(content=message))
+        return messages
+    
+    async def _race(self, messages: list) -> AsyncIterator[str]:
+        """
+        按对冲和切换策略流式调用提供商
+        
+        首个文本块产出之前：超过首选提供商的对冲等待时间就启动下一个提供商，
+        出错则立即启动下一个；先产出首个文本块的请求胜出，其余请求被取消。
+        首个文本块之后的错误不再切换（内容已经发出）
+        
+        Args:
+            messages: 消息列表
+        
+        Yields:
+            胜出提供商的文本块
+        """
+        waiting = list(self._ordered_providers())
+        running: List[_Attempt] = []
+        winner: Optional[_Attempt] = None
+        first_chunk: Optional[str] = None
+        last_error: Optional[BaseException] = None
+        
+        try:
+            while winner is None:
+                if not running:
+                    if not waiting:
+                        raise last_error or RuntimeError("没有可用的 AI 提供商")
+                    running.append(_Attempt(waiting.pop(0), messages))
+                
+                # 只有还有备选提供商时才需要对冲计时
+                timeout = running[0].provider.hedge_delay() if waiting and len(running) == 1 else None
+                done, _ = await asyncio.wait(
+                    [attempt.first for attempt in running],
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    logger.info(
+                        f"⏱️  {running[0].provider.name} 首字超过 {timeout * 1000:.0f}ms，"
+                        f"对冲请求 {waiting[0].name}"
+                    )
+                    running.append(_Attempt(waiting.pop(0), messages))
+                    continue
+                
+                for attempt in [a for a in running if a.first in done]:
+                    try:
+                        first_chunk = attempt.first.result()
+                    except StopAsyncIteration:
+                        first_chunk = ""
+                    except Exception as e:
+                        logger.warning(f"⚠️  {attempt.provider.name} 请求失败，切换提供商: {e}")
+                        attempt.provider.record_failure()
+                        last_error = e
+                        running.remove(attempt)
+                        await attempt.stream.aclose()
+                        continue
+                    winner = attempt
+                    break
+        finally:
+            # 取消落败（或因异常未完成）的请求；它们没有产出首字，已等待时间不是首字延迟，不记录
+            for attempt in running:
+                if attempt is not winner:
+                    await attempt.cancel()
+        
+        # 只记录真正产出首个文本块的请求
+        if first_chunk:
+            winner.provider.record_latency(time.monotonic() - winner.started)
+        try:
+            if first_chunk:
+                yield first_chunk
+                async for chunk in winner.stream:
+                    yield chunk
+        finally:
+            await winner.stream.aclose()
+    
+    async def complete(
+        self,
+        message: str,
+        system_prompt: Optional[str] = None,
+        history: Optional[List[dict]] = None
+    ) -> str:
+        """
+        生成完整回复（非流式），出错时抛出异常而不是返回错误文本，
+        供需要区分成功回复的调用方使用（如只缓存成功的分析）
+        
+        Args:
+            message: 用户消息
+            system_prompt: 系统提示（可选）
+            history: 对话历史（可选）
+        
+        Returns:
+            AI 回复
+        
+        Raises:
+            LLMUnavailableError: AI 服务未配置
+            Exception: 提供商请求失败
+        """
+        if not self.is_available():
+            raise LLMUnavailableError("AI 服务当前不可用")
+        
+        with span("prompt"):
+            messages = self._build_messages(message, system_prompt, history)
+        
+        # 调用 LLM
+        with span("llm"):
+            if len(self.providers) == 1:
+                response = await self.llm.ainvoke(messages)
+                return response.content
+            # 多提供商时同样按首字对冲，再拼接完整回复
+            return "".join([chunk async for chunk in self._race(messages)])
+    
     async def chat(
         self, 
         message: str, 
@@ -73,37 +408,51 @@ class LLMService:
             history: 对话历史（可选）
         
         Returns:
-            AI 回复
+            AI 回复（出错时为错误提示文本）
         """
         if not self.is_available():
             return "抱歉，AI 服务当前不可用。请检查配置。"
         
         try:
-            messages = []
-            
-            # 添加系统提示
-            if system_prompt:
-                messages.append(SystemMessage(content=system_prompt))
-            
-            # 添加历史消息
-            if history:
-                for msg in history:
-                    if msg["role"] == "user":
-                        messages.append(HumanMessage(content=msg["content"]))
-                    elif msg["role"] == "assistant":
-                        messages.append(AIMessage(content=msg["content"]))
-            
-            # 添加当前消息
-            messages.append(HumanMessage(content=message))
-            
-            # 调用 LLM
-            response = await self.llm.ainvoke(messages)
-            return response.content
+            return await self.complete(message, system_prompt, history)
             
         except Exception as e:
             logger.error(f"❌ 聊天失败: {e}")
             return f"抱歉，处理您的请求时出现错误: {str(e)}"
     
+    async def complete_stream(
+        self,
+        message: str,
+        system_prompt: Optional[str] = None,
+        history: Optional[List[dict]] = None
+    ) -> AsyncIterator[str]:
+        """
+        流式生成回复，出错时（包括中途断开）抛出异常而不是产出错误文本，
+        调用方据此判断回复是否完整
+        
+        Args:
+            message: 用户消息
+            system_prompt: 系统提示（可选）
+            history: 对话历史（可选）
+        
+        Yields:
+            AI 回复的文本块
+        
+        Raises:
+            LLMUnavailableError: AI 服务未配置
+            Exception: 提供商请求失败
+        """
+        if not self.is_available():
+            raise LLMUnavailableError("AI 服务当前不可用")
+        
+        with span("prompt"):
+            messages = self._build_messages(message, system_prompt, history)
+        
+        # 流式调用 LLM
+        with span("llm"):
+            async for chunk in self._race(messages):
+                yield chunk
+    
     async def chat_stream(
         self, 
         message: str, 
@@ -126,27 +475,8 @@ class LLMService:
             return
         
         try:
-            messages = []
-            
-            # 添加系统提示
-            if system_prompt:
-                messages.append(SystemMessage(content=system_prompt))
-            
-            # 添加历史消息
-            if history:
-                for msg in history:
-                    if msg["role"] == "user":
-                        messages.append(HumanMessage(content=msg["content"]))
-                    elif msg["role"] == "assistant":
-                        messages.append(AIMessage(content=msg["content"]))
-            
-            # 添加当前消息
-            messages.append(HumanMessage(content=message))
-            
-            # 流式调用 LLM
-            async for chunk in self.llm.astream(messages):
-                if hasattr(chunk, 'content') and chunk.content:
-                    yield chunk.content
+            async for chunk in self.complete_stream(message, system_prompt, history):
+                yield chunk
             
         except Exception as e:
             logger.error(f"❌ 流式聊天失败: {e}")
@@ -156,71 +486,22 @@ class LLMService:
         """
         获取德州扑克助手的系统提示
         
+        固定的 SYSTEM_PROMPT 在前、范围信息在后，保证不同范围之间共享尽可能长的前缀，
+        以命中提供商的提示缓存；范围部分按规范化后的范围缓存，不会每次重新计算
+        
         Args:
             range_context: 当前选择的范围上下文（可选）
         
         Returns:
             系统提示文本
         """
-        base_prompt = """你是一个专业的德州扑克策略助手。你的任务是：
-
-1. 帮助玩家分析手牌范围的合理性
-2. 根据位置、场景和对手风格提供策略建议
-3. 解释扑克概率和数学概念
-4. 回答关于德州扑克的各种问题
-
-回答时请：
-- 使用清晰简洁的语言
-- 提供具体的数字和概率
-- 基于GTO（博弈论最优）策略
-- 考虑实战中的灵活应用
-- 使用中文回答
-
-重要概念：
-- 对子（如 AA）有 6 种组合
-- 同色（如 AKs）有 4 种组合
-- 不同色（如 AKo）有 12 种组合
-- 总共 1326 种起手牌组合
-
-请保持专业、友好和耐心。"""
-
-        # 如果有范围上下文，添加到 system prompt
         if range_context and range_context.get('hands'):
-            hands = range_context.get('hands', [])
-            name = range_context.get('name', '当前范围')
-            
-            # 计算总组合数
-            total_combos = 0
-            for hand in hands:
-                if len(hand) == 2:  # 对子，如 AA
-                    total_combos += 6
-                elif hand.endswith('s'):  # 同花，如 AKs
-                    total_combos += 4
-                elif hand.endswith('o'):  # 不同花，如 AKo
-                    total_combos += 12
-                else:
-                    total_combos += 16  # 未指定花色，计算所有组合
-            
-            probability = (total_combos / 1326) * 100
-            
-            range_info = f"""
-
-**当前用户选择的范围信息：**
-- 范围名称：{name}
-- 包含手牌：{', '.join(sorted(hands))}
-- 手牌数量：{len(hands)} 种
-- 总组合数：{total_combos} 种
-- 出现概率：{probability:.2f}%
-
-请在回答时优先考虑并分析用户当前选择的这个范围。你可以：
-- 评价这个范围的强度和松紧程度
-- 分析这个范围在不同位置和场景下的适用性
-- 提供针对这个范围的优化建议
-- 回答关于这个范围的具体问题"""
-            
-            return base_prompt + range_info
-        
-        return base_prompt
+            with span("prompt"):
+                return _system_prompt_with_range(
+                    canonical_hands(range_context.get('hands', [])),
+                    range_context.get('name', '当前范围')
+                )
+        return SYSTEM_PROMPT
 
 
 # 全局 LLM 服务实例
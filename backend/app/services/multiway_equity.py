@@ -0,0 +1,168 @@
+"""
+多人底池胜率
+对 2-6 个范围做带卡牌移除的联合抽样，按目标标准误差自适应地决定采样次数
+"""
+from typing import List, Optional, Sequence, Tuple
+import time
+import numpy as np
+
+from .cards import COMBO_MASKS, COMBOS, TOTAL_COMBOS, canonical_hands, range_weights
+from .hand_evaluator import evaluate
+
+# 估计方差前至少需要的有效样本数
+MIN_SAMPLES = 1000
+MIN_BATCH = 1024
+MAX_BATCH = 65536
+# 连续抽样却几乎得不到有效发牌时，认为范围之间无法共存
+MAX_REJECTION_RATIO = 200
+
+
+def _sample_deals(
+    cumulative: np.ndarray,
+    count: int,
+    board_mask: np.uint64,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    为每位玩家独立抽样组合，丢弃存在重复牌的发牌
+
+    Args:
+        cumulative: (P, 1326) 每位玩家的累计抽样概率
+        count: 抽样次数
+        board_mask: 公共牌的 52 位掩码
+        rng: 随机数生成器
+
+    Returns:
+        (n, P) 有效发牌的组合索引（n <= count）
+    """
+    players = cumulative.shape[0]
+    picks = np.empty((count, players), dtype=np.int64)
+    for player in range(players):
+        picks[:, player] = np.searchsorted(cumulative[player], rng.random(count), side="right")
+    np.minimum(picks, TOTAL_COMBOS - 1, out=picks)
+
+    used = np.full(count, board_mask, dtype=np.uint64)
+    valid = np.ones(count, dtype=bool)
+    for player in range(players):
+        masks = COMBO_MASKS[picks[:, player]]
+        valid &= (used & masks) == 0
+        used |= masks
+    return picks[valid]
+
+
+def _complete_boards(deals: np.ndarray, board: Sequence[int], rng: np.random.Generator) -> np.ndarray:
+    """为每个发牌从剩余的牌中补全公共牌，返回 (n, 5)"""
+    count = deals.shape[0]
+    boards = np.empty((count, 5), dtype=np.int64)
+    boards[:, :len(board)] = board
+    missing = 5 - len(board)
+    if missing:
+        keys = rng.random((count, 52))
+        keys[:, list(board)] = 2.0
+        hole_cards = COMBOS[deals].reshape(count, -1)
+        keys[np.arange(count)[:, None], hole_cards] = 2.0
+        boards[:, len(board):] = np.argpartition(keys, missing, axis=1)[:, :missing]
+    return boards
+
+
+def _showdown_shares(deals: np.ndarray, boards: np.ndarray) -> np.ndarray:
+    """计算每次发牌中每位玩家分得的底池份额，返回 (n, P)"""
+    count, players = deals.shape
+    hands = np.empty((count, players, 7), dtype=np.int64)
+    hands[:, :, :2] = COMBOS[deals]
+    hands[:, :, 2:] = boards[:, None, :]
+    strengths = evaluate(hands.reshape(-1, 7)).reshape(count, players)
+    winners = strengths == strengths.max(axis=1, keepdims=True)
+    return winners / winners.sum(axis=1, keepdims=True)
+
+
+def multiway_equity(
+    ranges: Sequence[Tuple[str, ...]],
+    board: Sequence[int] = (),
+    target_std_error: float = 0.005,
+    max_samples: int = 500000,
+    seed: Optional[int] = None,
+) -> dict:
+    """
+    计算多人全下胜率，直到每位玩家的标准误差都不超过目标值
+
+    Args:
+        ranges: 每位玩家的范围
+        board: 已知公共牌
+        target_std_error: 目标标准误差
+        max_samples: 最大有效样本数
+        seed: 随机种子
+
+    Returns:
+        每位玩家的胜率和标准误差，以及实际样本数
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    board = list(board)
+
+    weights = np.array([range_weights(hands, dead_cards=board) for hands in ranges])
+    totals = weights.sum(axis=1)
+    if (totals <= 0).any():
+        raise ValueError("存在没有有效组合的范围（可能全部与公共牌冲突）")
+    cumulative = np.cumsum(weights / totals[:, None], axis=1)
+
+    board_mask = np.uint64(0)
+    for card in board:
+        board_mask |= np.uint64(1) << np.uint64(card)
+
+    players = len(ranges)
+    share_sum = np.zeros(players)
+    share_squares = np.zeros(players)
+    samples = 0
+    drawn = 0
+    batch = MIN_BATCH
+    std_error = np.full(players, np.inf)
+
+    while samples < max_samples:
+        batch = min(batch, max_samples - samples)
+        deals = _sample_deals(cumulative, batch, board_mask, rng)
+        drawn += batch
+        if deals.shape[0] == 0:
+            if drawn >= MIN_BATCH * MAX_REJECTION_RATIO:
+                raise ValueError("各范围之间的手牌冲突过多，无法发出有效的牌")
+            continue
+
+        shares = _showdown_shares(deals, _complete_boards(deals, board, rng))
+        samples += shares.shape[0]
+        share_sum += shares.sum(axis=0)
+        share_squares += (shares ** 2).sum(axis=0)
+
+        mean = share_sum / samples
+        variance = np.maximum(share_squares / samples - mean ** 2, 0.0)
+        std_error = np.sqrt(variance / samples)
+        if samples >= MIN_SAMPLES and (std_error <= target_std_error).all():
+            break
+
+        # 按当前方差估计还需要的样本数，避免过度采样
+        needed = variance.max() / target_std_error ** 2 - samples
+        acceptance = samples / drawn
+        batch = int(np.clip(needed / max(acceptance, 1e-3) * 1.1, MIN_BATCH, MAX_BATCH))
+
+    equity = share_sum / max(samples, 1)
+    return {
+        "players": [
+            {
+                "hands": list(hands),
+                "equity": round(float(equity[index]), 5),
+                "std_error": round(float(std_error[index]), 5),
+            }
+            for index, hands in enumerate(ranges)
+        ],
+        "samples": samples,
+        "std_error": round(float(std_error.max()), 5),
+        "converged": bool((std_error <= target_std_error).all()),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def prepare_ranges(ranges: List[List[str]]) -> List[Tuple[str, ...]]:
+    """规范化每位玩家的范围，空范围报错"""
+    prepared = [canonical_hands(hands) for hands in ranges]
+    if any(not hands for hands in prepared):
+        raise ValueError("每位玩家的范围中至少需要一个有效手牌")
+    return prepared
@@ -5,11 +5,29 @@
 from typing import TypedDict, Annotated, List, Dict, Any
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import HumanMessage, AIMessage
-from .llm_service import llm_service
+from .llm_service import llm_service, stable_history_window
+from .profiling import span
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 固定的指令放在用户消息之前，只有最后的用户内容随请求变化
+AGENT_ANALYZE_INSTRUCTIONS = """请分析下面的手牌范围，从以下方面进行分析：
+1. 范围的紧松程度
+2. 范围的平衡性（价值牌和诈唬牌的比例）
+3. 针对不同对手的适用性
+4. 可能的改进建议
+
+需要分析的内容："""
+
+AGENT_RECOMMEND_INSTRUCTIONS = """请根据下面的信息推荐合适的手牌范围，并提供：
+1. 推荐的具体手牌列表
+2. 预期的范围概率
+3. 推荐理由
+4. 使用注意事项
+
+场景信息："""
+
 
 class AgentState(TypedDict):
     """Agent 状态"""
@@ -79,7 +97,7 @@ class PokerAgent:
         range_context = state.get("range_context", {})
         
         # 准备上下文
-        history = state["messages"][:-1][-5:]  # 最近5条消息
+        history = stable_history_window(state["messages"][:-1], 5)  # 最近5条以上消息
         
         # 生成包含范围信息的 system prompt
         system_prompt = llm_service.get_system_prompt(range_context=range_context)
@@ -100,15 +118,9 @@ class PokerAgent:
         range_context = state.get("range_context", {})
         
         # 构建分析提示
-        prompt = f"""请分析以下手牌范围：
-
-{last_message}
+        prompt = f"""{AGENT_ANALYZE_INSTRUCTIONS}
 
-请从以下方面进行分析：
-1. 范围的紧松程度
-2. 范围的平衡性（价值牌和诈唬牌的比例）
-3. 针对不同对手的适用性
-4. 可能的改进建议"""
+{last_message}"""
         
         # 生成包含范围信息的 system prompt
         system_prompt = llm_service.get_system_prompt(range_context=range_context)
@@ -126,15 +138,9 @@ class PokerAgent:
         last_message = state["messages"][-1]["content"]
         range_context = state.get("range_context", {})
         
-        prompt = f"""请根据以下信息推荐合适的手牌范围：
+        prompt = f"""{AGENT_RECOMMEND_INSTRUCTIONS}
 
-{last_message}
-
-请提供：
-1. 推荐的具体手牌列表
-2. 预期的范围概率
-3. 推荐理由
-4. 使用注意事项"""
+{last_message}"""
         
         # 生成包含范围信息的 system prompt
         system_prompt = llm_service.get_system_prompt(range_context=range_context)
@@ -179,7 +185,8 @@ class PokerAgent:
             }
             
             # 运行工作流
-            result = await self.graph.ainvoke(state)
+            with span("agent"):
+                result = await self.graph.ainvoke(state)
             
             return result.get("analysis_result", "抱歉，无法生成回复。")
             
@@ -225,7 +232,7 @@ class PokerAgent:
             async for chunk in llm_service.chat_stream(
                 message=message,
                 system_prompt=system_prompt,
-                history=history[-5:]  # 最近5条消息
+                history=stable_history_window(history, 5)  # 最近5条以上消息
             ):
                 yield chunk
             
@@ -0,0 +1,164 @@
+"""
+翻前手牌类别胜率表
+169 x 169 的类别对类别全下胜率，以及考虑卡牌移除后的组合对数。
+首次使用时计算并保存到结果存储，之后直接加载
+"""
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import logging
+import numpy as np
+
+from ..config.settings import settings
+from .cards import CLASS_COMBO_COUNTS, COMBO_CLASS, COMBO_MASKS, HAND_CLASSES, TOTAL_COMBOS
+from .equity import board_strengths, sample_boards
+from .result_store import result_key, result_store
+
+logger = logging.getLogger(__name__)
+
+TABLE_VERSION = 1
+
+
+def _class_incidence() -> np.ndarray:
+    """(1326, 169) 组合 -> 类别的指示矩阵"""
+    incidence = np.zeros((len(COMBO_CLASS), 169))
+    incidence[np.arange(len(COMBO_CLASS)), COMBO_CLASS] = 1.0
+    return incidence
+
+
+def _disjoint() -> np.ndarray:
+    """(1326, 1326) 两个组合之间没有重复牌"""
+    return (COMBO_MASKS[:, None] & COMBO_MASKS[None, :]) == 0
+
+
+def compute_table(
+    boards: int,
+    batch_size: int = 16,
+    seed: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算翻前类别胜率表
+
+    同一类别中的组合在花色置换下等价，因此每个英雄类别只需一个代表组合
+    对抗全部 1326 个对手组合，再按对手类别汇总。
+
+    Args:
+        boards: 采样的公共牌数量
+        batch_size: 每批评估的公共牌数量
+        seed: 随机种子
+
+    Returns:
+        (equity, pairs)：equity[i, j] 为类别 i 对抗类别 j 的胜率，
+        pairs[i, j] 为两个类别之间没有重复牌的组合对数
+    """
+    rng = np.random.default_rng(seed)
+    representatives = np.array([np.flatnonzero(COMBO_CLASS == c)[0] for c in range(169)])
+    disjoint = _disjoint()
+    rep_disjoint = disjoint[representatives]
+    incidence = _class_incidence()
+
+    share = np.zeros((169, len(COMBO_CLASS)))
+    total = np.zeros((169, len(COMBO_CLASS)))
+    remaining = boards
+    while remaining > 0:
+        batch = min(batch_size, remaining)
+        remaining -= batch
+        strengths = board_strengths(sample_boards(batch, (), rng)).astype(np.int64)
+        hero = strengths[:, representatives]
+        valid = rep_disjoint & (hero[:, :, None] >= 0) & (strengths[:, None, :] >= 0)
+        diff = np.sign(hero[:, :, None] - strengths[:, None, :])
+        share += ((diff + 1) * 0.5 * valid).sum(axis=0)
+        total += valid.sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        equity = (share @ incidence) / (total @ incidence)
+    # 胜率应满足 E[i, j] + E[j, i] = 1，对称化以减小采样误差
+    equity = (equity + 1.0 - equity.T) / 2.0
+    equity = np.nan_to_num(equity, nan=0.5)
+
+    pairs = incidence.T @ disjoint @ incidence
+    return equity, pairs
+
+
+def _table_params() -> dict:
+    return {"table_version": TABLE_VERSION, "boards": settings.preflop_table_boards}
+
+
+@lru_cache(maxsize=1)
+def preflop_equity_table() -> Tuple[np.ndarray, np.ndarray]:
+    """
+    获取翻前类别胜率表（优先从结果存储加载，各进程共享同一份内存映射）
+
+    Returns:
+        (equity, pairs)，形状均为 (169, 169)
+    """
+    params = _table_params()
+    key = result_key("preflop_equity", params)
+    _, arrays = result_store.get(key)
+    if arrays is not None:
+        return arrays["equity"], arrays["pairs"]
+
+    logger.info(f"⏳ 计算翻前胜率表（{settings.preflop_table_boards} 个公共牌）...")
+    equity, pairs = compute_table(settings.preflop_table_boards, seed=0)
+    result_store.put(key, "preflop_equity", params, arrays={"equity": equity, "pairs": pairs})
+    logger.info("✅ 翻前胜率表已保存")
+    return equity, pairs
+
+
+def preflop_table_ready() -> bool:
+    """翻前胜率表是否已经可用（只检查，不会触发计算）"""
+    if preflop_equity_table.cache_info().currsize:
+        return True
+    _, arrays = result_store.get(result_key("preflop_equity", _table_params()))
+    return arrays is not None
+
+
+@lru_cache(maxsize=1)
+def equity_vs_random() -> np.ndarray:
+    """(169,) 每个类别对抗随机手牌的胜率"""
+    equity, pairs = preflop_equity_table()
+    return (equity * pairs).sum(axis=1) / pairs.sum(axis=1)
+
+
+def class_equity_vs_ranges(weights: np.ndarray) -> np.ndarray:
+    """
+    每个类别对抗各个范围的翻前胜率（按类别间不冲突的组合对数加权）
+
+    Args:
+        weights: (N, 169) 每个范围的类别权重
+
+    Returns:
+        (N, 169) float32；与范围完全冲突的类别为 NaN
+    """
+    equity, pairs = preflop_equity_table()
+    weights = np.asarray(weights, dtype=np.float32)
+    share = weights @ (equity * pairs).T.astype(np.float32)
+    total = weights @ pairs.T.astype(np.float32)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, share / total, np.nan).astype(np.float32)
+
+
+@lru_cache(maxsize=1)
+def hand_ranking() -> np.ndarray:
+    """(169,) 按对抗随机手牌胜率从高到低排序的类别索引"""
+    return np.argsort(-equity_vs_random(), kind="stable")
+
+
+def top_percent_range(percent: float) -> List[str]:
+    """
+    按手牌排名取前 percent% 的组合对应的手牌类别
+
+    Args:
+        percent: 范围占全部组合的百分比（0-100）
+
+    Returns:
+        手牌类别列表
+    """
+    target = max(0.0, min(percent, 100.0)) / 100.0 * TOTAL_COMBOS
+    hands = []
+    combos = 0
+    for index in hand_ranking():
+        if combos >= target - 1e-9:
+            break
+        hands.append(HAND_CLASSES[index])
+        combos += int(CLASS_COMBO_COUNTS[index])
+    return hands
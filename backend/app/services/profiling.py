@@ -0,0 +1,280 @@
+"""
+按需性能剖析（settings.profiling_enabled 开启后可用）
+
+- 带 X-Profile 请求头的请求记录各阶段耗时（agent、prompt、llm、compute、serialize），
+  通过 Server-Timing 响应头返回；同时记录 cProfile 函数统计，保存到结果存储，按 X-Profile-Id 查询
+- 采样剖析器：按固定间隔采集当前 worker 所有线程的调用栈，输出火焰图可用的折叠栈
+
+未开启剖析的请求只多一次 ContextVar 读取
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+import asyncio
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+
+from starlette.datastructures import MutableHeaders
+
+from ..config.settings import settings
+from .result_store import result_key, result_store
+
+logger = logging.getLogger(__name__)
+
+# 返回的函数统计条数（按累计耗时）
+TOP_FUNCTIONS = 40
+
+# 计入 serialize 阶段的函数：(函数名, 所在文件路径片段)
+SERIALIZE_FUNCTIONS = (("serialize_response", "fastapi"), ("render", "starlette"))
+
+
+@dataclass
+class RequestProfile:
+    """单个请求的剖析结果"""
+    method: str
+    path: str
+    profile_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    started_at: float = field(default_factory=time.time)
+    started: float = field(default_factory=time.perf_counter)
+    # 阶段名称 -> [累计秒数, 次数]
+    spans: Dict[str, List[float]] = field(default_factory=dict)
+
+    def add(self, name: str, seconds: float):
+        entry = self.spans.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self) -> str:
+        """Server-Timing 响应头（app 为到发送响应头为止的总耗时）"""
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, (seconds, _) in self.spans.items()]
+        entries.append(f"app;dur={self.elapsed_ms():.2f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+# cProfile 在同一线程内只能有一个，同时到达的其他剖析请求只记录阶段耗时
+_cprofile_lock = threading.Lock()
+
+# 同一时间只运行一个采样剖析
+_sampler_lock = threading.Lock()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    记录一个阶段的耗时（计入当前请求的剖析结果，未剖析时不做任何事）
+
+    Args:
+        name: 阶段名称（出现在 Server-Timing 中）
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - started)
+
+
+def start_request_profile(method: str, path: str):
+    """
+    开始剖析当前请求
+
+    Args:
+        method: 请求方法
+        path: 请求路径
+
+    Returns:
+        (profile, profiler, token)：profiler 在已有其他请求占用 cProfile 时为 None
+    """
+    profile = RequestProfile(method=method, path=path)
+    token = _current.set(profile)
+    profiler = None
+    if _cprofile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        profiler.enable()
+    return profile, profiler, token
+
+
+def record_serialize(profile: RequestProfile, profiler: Optional[cProfile.Profile]):
+    """从 cProfile 统计中取出序列化响应的耗时，计入 serialize 阶段"""
+    if profiler is None:
+        return
+    profiler.disable()
+    try:
+        seconds = 0.0
+        for entry in profiler.getstats():
+            code = entry.code
+            if isinstance(code, str):
+                continue
+            for name, package in SERIALIZE_FUNCTIONS:
+                if code.co_name == name and package in code.co_filename:
+                    seconds += entry.totaltime
+        if seconds:
+            profile.add("serialize", seconds)
+    finally:
+        profiler.enable()
+
+
+def _short_path(path: str) -> str:
+    parts = path.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+
+
+def finish_request_profile(profile: RequestProfile, profiler: Optional[cProfile.Profile], token, status: int) -> dict:
+    """
+    结束剖析并生成结果
+
+    Args:
+        profile: 请求剖析
+        profiler: cProfile（可能为 None）
+        token: start_request_profile 返回的 ContextVar token
+        status: 响应状态码
+
+    Returns:
+        可 JSON 序列化的剖析结果
+    """
+    _current.reset(token)
+    functions = []
+    if profiler is not None:
+        profiler.disable()
+        _cprofile_lock.release()
+        stats = pstats.Stats(profiler).stats
+        top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+        functions = [
+            {
+                "function": f"{func} ({_short_path(filename)}:{line})",
+                "calls": calls,
+                "total_ms": round(total * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+            }
+            for (filename, line, func), (_, calls, total, cumulative, _) in top
+        ]
+    return {
+        "id": profile.profile_id,
+        "method": profile.method,
+        "path": profile.path,
+        "status": status,
+        "started_at": profile.started_at,
+        "total_ms": round(profile.elapsed_ms(), 3),
+        "spans": {
+            name: {"ms": round(seconds * 1000, 3), "count": count}
+            for name, (seconds, count) in profile.spans.items()
+        },
+        # cProfile 按线程记录，同一事件循环上并发的其他请求也会计入函数统计
+        "cprofile": profiler is not None,
+        "functions": functions,
+    }
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float) -> Counter:
+    """
+    采样当前进程所有线程的调用栈（在调用线程中阻塞运行）
+
+    Args:
+        seconds: 采样时长
+        interval: 采样间隔（秒）
+
+    Returns:
+        折叠栈（线程名;根帧;...;叶帧）-> 采样次数
+
+    Raises:
+        RuntimeError: 已有采样在运行
+    """
+    if not _sampler_lock.acquire(blocking=False):
+        raise RuntimeError("已有采样剖析在运行")
+    try:
+        own = threading.get_ident()
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(_frame_name(frame))
+                    frame = frame.f_back
+                frames.append(names.get(ident, f"thread-{ident}"))
+                stacks[";".join(reversed(frames))] += 1
+            time.sleep(interval)
+        return stacks
+    finally:
+        _sampler_lock.release()
+
+
+def collapsed(stacks: Counter) -> str:
+    """折叠栈文本（每行“栈 次数”，可直接交给 flamegraph.pl / speedscope）"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def profile_key(profile_id: str) -> str:
+    return result_key("request_profile", {"id": profile_id})
+
+
+class ProfilingMiddleware:
+    """
+    请求剖析中间件（ASGI）
+
+    X-Profile 请求头不为空且不为 0 时剖析该请求：响应头带 Server-Timing 和 X-Profile-Id，
+    完整结果（含流式响应的全部耗时）在响应结束后保存到结果存储
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.profiling_enabled:
+            await self.app(scope, receive, send)
+            return
+        flag = dict(scope["headers"]).get(b"x-profile", b"").strip().lower()
+        if flag in (b"", b"0", b"false", b"off"):
+            await self.app(scope, receive, send)
+            return
+
+        profile, profiler, token = start_request_profile(scope["method"], scope["path"])
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                # 非流式响应此时已经序列化完成
+                status = message["status"]
+                record_serialize(profile, profiler)
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing())
+                headers.append("X-Profile-Id", profile.profile_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            result = finish_request_profile(profile, profiler, token, status)
+            logger.info(f"⏱️  {result['method']} {result['path']} {result['total_ms']:.1f}ms 剖析已保存: {result['id']}")
+            await asyncio.to_thread(
+                lambda: result_store.put(
+                    profile_key(result["id"]), "request_profile",
+                    {"id": result["id"], "path": result["path"]}, result,
+                    ttl_seconds=settings.profiling_retention_seconds
+                )
+            )
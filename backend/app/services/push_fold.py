@@ -0,0 +1,327 @@
+"""
+短码全下/弃牌（push/fold）纳什均衡求解
+基于翻前类别胜率表用 CFR+ 求解，支持单挑和多人座位
+
+模型：
+- 每位玩家的有效筹码相同（stack_depth，单位 bb，包含盲注）
+- 只有第一个行动的玩家可以全下，后面的玩家依次选择跟注或弃牌
+- 第一个跟注者出现后其余玩家弃牌（不考虑多人跟注）
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import re
+import numpy as np
+
+from .cards import CLASS_COMBO_COUNTS, HAND_CLASSES
+from .compute_pool import run_in_pool
+from .preflop_equity import preflop_equity_table
+from .result_store import result_key, result_store
+
+POSITION_NAMES = ["UTG", "UTG+1", "UTG+2", "LJ", "HJ", "CO", "BTN", "SB", "BB"]
+
+MAX_STACK_DEPTH = 25.0
+
+# 结果格式或求解方法变化时递增，使结果存储中旧的图表失效
+SOLVER_VERSION = 3
+
+# 每隔多少次迭代计算一次可被利用度
+EXPLOITABILITY_CHECK_INTERVAL = 10
+
+
+def position_names(players: int) -> List[str]:
+    """返回从第一个行动位置到大盲的位置名称"""
+    return POSITION_NAMES[-players:]
+
+
+def seat_index(position: str, players: int) -> Optional[int]:
+    """
+    将用户输入的位置换算成座位序号（0 是第一个行动的位置）
+
+    position_names 按 9 人桌从后往前取名（6 人桌第一个位置叫 LJ），
+    而用户通常把第一个行动的位置叫 UTG，因此先按相对牌桌人数的别名换算：
+    UTG/EP 是第一个位置，UTG+n 向后数 n 个（不超过 CO 之前），MP 是 UTG 和 CO 之间居中的位置，
+    BU/BUTTON 即 BTN；其余按位置名称匹配（LJ、HJ 等在人数不足时不存在）
+
+    Args:
+        position: 位置（不区分大小写）
+        players: 座位数
+
+    Returns:
+        座位序号；无法对应到这张牌桌时返回 None
+    """
+    names = position_names(players)
+    position = position.strip().upper().replace(" ", "")
+    # CO 之前的座位数（3 人桌没有 CO）
+    early = names.index("CO") if "CO" in names else 0
+    if position in ("UTG", "EP"):
+        return 0 if players > 2 else None
+    match = re.fullmatch(r"UTG\+(\d)", position)
+    if match:
+        offset = int(match.group(1))
+        return offset if 0 < offset < early else None
+    if position == "MP":
+        return early // 2 if early else None
+    if position in ("BU", "BUTTON"):
+        position = "BTN"
+    return names.index(position) if position in names else None
+
+
+def parse_stack_depth(text: Optional[str]) -> Optional[float]:
+    """
+    从 "10bb"、"12.5 BB" 之类的文本中解析筹码深度
+
+    Returns:
+        筹码深度（bb）；无法解析时返回 None
+    """
+    if not text:
+        return None
+    match = re.search(r"(\d+(?:\.\d+)?)", text)
+    return float(match.group(1)) if match else None
+
+
+class _Spot:
+    """某个座位全下后的局面（全下者 pusher，依次可跟注的座位 callers）"""
+
+    def __init__(self, pusher: int, callers: List[int]):
+        self.pusher = pusher
+        self.callers = callers
+
+
+def solve_push_fold(
+    stack_depth: float,
+    players: int = 2,
+    ante: float = 0.0,
+    small_blind: float = 0.5,
+    big_blind: float = 1.0,
+    iterations: int = 2000,
+    tolerance: float = 1e-3,
+) -> dict:
+    """
+    求解全下/弃牌均衡（CFR+）
+
+    每个全下者和它后面的每个跟注者都是一组 169 维的二选一决策（全下/跟注或弃牌），
+    所有座位的决策按矩阵一起计算：遗憾值截断为非负、先更新全下者再更新跟注者、
+    按迭代次数线性加权平均策略；每隔 EXPLOITABILITY_CHECK_INTERVAL 次迭代检查一次可被利用度。
+    单挑通常几十次迭代、9 人桌几百次迭代即可达到默认 tolerance
+
+    Args:
+        stack_depth: 有效筹码（bb，包含盲注和前注）
+        players: 座位数（2-9）
+        ante: 每人前注（bb）
+        small_blind: 小盲（bb）
+        big_blind: 大盲（bb）
+        iterations: 最大迭代次数
+        tolerance: 可被利用度（bb）低于该值时提前停止
+
+    Returns:
+        每个座位的全下频率、各座位对每个全下者的跟注频率、可被利用度，
+        以及是否在 iterations 次迭代内达到 tolerance
+    """
+    stack = stack_depth
+    if not 2 <= players <= len(POSITION_NAMES):
+        raise ValueError(f"座位数必须在 2 到 {len(POSITION_NAMES)} 之间")
+    if stack < big_blind + ante:
+        raise ValueError("筹码深度不能小于大盲加前注")
+
+    equity, pairs = preflop_equity_table()
+    # 给定自己的类别，对手每个类别的条件概率（考虑卡牌移除）
+    opponent_probs = pairs / pairs.sum(axis=1, keepdims=True)
+    win_probs = opponent_probs * equity
+
+    def versus(strategies: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(k, 169) 每行一个对手策略：每个类别遇到该策略时的出现概率，以及对抗它的胜率"""
+        prob = strategies @ opponent_probs.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            eq = np.where(prob > 0, (strategies @ win_probs.T) / prob, 0.5)
+        return prob, eq
+
+    posted = np.full(players, ante)
+    posted[-2] += small_blind if players > 2 else 0.0
+    posted[-1] += big_blind
+    if players == 2:
+        # 单挑时按钮位是小盲
+        posted[0] = small_blind + ante
+    dead_total = posted.sum()
+
+    spots = [_Spot(pusher, list(range(pusher + 1, players))) for pusher in range(players - 1)]
+    # 跟注决策按 (全下者, 跟注者) 排成行，每个全下者的跟注者按座位顺序连续排列
+    rows = [(index, caller) for index, spot in enumerate(spots) for caller in spot.callers]
+    row_spot = np.array([index for index, _ in rows])
+    bounds = np.cumsum([0] + [len(spot.callers) for spot in spots])
+    # 全下被跟注时的底池（双方筹码加上其他人已投入的死钱）
+    row_pot = np.array([2 * stack + dead_total - posted[spots[index].pusher] - posted[caller] for index, caller in rows])[:, None]
+    call_fold = -posted[[caller for _, caller in rows]][:, None]
+    push_fold = -posted[[spot.pusher for spot in spots]][:, None]
+    steal = dead_total + push_fold[:, 0]
+
+    def push_evs(call: np.ndarray) -> np.ndarray:
+        """(全下者数, 169) 面对跟注策略时全下的收益"""
+        prob, eq = versus(call)
+        called = prob * (eq * row_pot - stack)
+        ev = np.empty((len(spots), 169))
+        for index in range(len(spots)):
+            start, end = bounds[index], bounds[index + 1]
+            # 按座位顺序：前面的座位都弃牌才轮到后面的座位
+            reach = np.cumprod(np.vstack([np.ones(169), 1.0 - prob[start:end]]), axis=0)
+            ev[index] = (reach[:-1] * called[start:end]).sum(axis=0) + reach[-1] * steal[index]
+        return ev
+
+    def call_evs(push: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(跟注行数, 169) 面对全下策略时跟注的收益，以及遇到全下的概率（反事实权重）"""
+        prob, eq = versus(push)
+        return eq[row_spot] * row_pot - stack, prob[row_spot]
+
+    push_regrets = np.zeros((2, len(spots), 169))
+    call_regrets = np.zeros((2, len(rows), 169))
+    push_sum = np.zeros((len(spots), 169))
+    call_sum = np.zeros((len(rows), 169))
+    weight_sum = 0.0
+
+    exploitability = np.inf
+    iteration = 0
+    for iteration in range(1, iterations + 1):
+        push = _aggressive_frequency(push_regrets)
+        call = _aggressive_frequency(call_regrets)
+        _update_regrets(push_regrets, push, push_evs(call), push_fold)
+        push_sum += iteration * push
+
+        ev, weight = call_evs(_aggressive_frequency(push_regrets))
+        _update_regrets(call_regrets, call, ev, call_fold, weight)
+        call_sum += iteration * call
+        weight_sum += iteration
+
+        if iteration % EXPLOITABILITY_CHECK_INTERVAL == 0 or iteration == iterations:
+            push, call = push_sum / weight_sum, call_sum / weight_sum
+            # 平均策略与最优反应之间的收益差（按类别组合数加权），取所有决策中的最大值
+            exploitability = max(
+                _gaps(push, push_evs(call), push_fold).max(),
+                _gaps(call, call_evs(push)[0], call_fold).max(),
+            )
+            if exploitability < tolerance:
+                break
+
+    push, call = push_sum / weight_sum, call_sum / weight_sum
+    names = position_names(players)
+    return {
+        "stack_depth": stack,
+        "players": players,
+        "ante": ante,
+        "iterations": iteration,
+        "exploitability": round(float(exploitability), 5),
+        "converged": bool(exploitability < tolerance),
+        "seats": [
+            {
+                "position": names[spot.pusher],
+                "push": _chart(push[index]),
+                "calls": {
+                    names[caller]: _chart(call[bounds[index] + offset])
+                    for offset, caller in enumerate(spot.callers)
+                },
+            }
+            for index, spot in enumerate(spots)
+        ],
+    }
+
+
+def _aggressive_frequency(regrets: np.ndarray) -> np.ndarray:
+    """(2, k, 169) 全下/跟注和弃牌的遗憾值 -> 全下/跟注的频率（遗憾值全为 0 时各一半）"""
+    positive = np.maximum(regrets, 0.0)
+    total = positive.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, positive[0] / total, 0.5)
+
+
+def _update_regrets(regrets: np.ndarray, strategy: np.ndarray, ev: np.ndarray, fold_ev: np.ndarray, weight=1.0):
+    """CFR+ 更新：累加两个动作相对当前策略的收益差（乘以反事实权重），截断为非负"""
+    value = strategy * ev + (1 - strategy) * fold_ev
+    regrets[0] = np.maximum(regrets[0] + weight * (ev - value), 0.0)
+    regrets[1] = np.maximum(regrets[1] + weight * (fold_ev - value), 0.0)
+
+
+def _gaps(strategy: np.ndarray, ev: np.ndarray, fold_ev: np.ndarray) -> np.ndarray:
+    """每个决策的策略与最优反应之间的收益差（bb，按类别组合数加权平均）"""
+    value = strategy * ev + (1 - strategy) * fold_ev
+    return (np.maximum(ev, fold_ev) - value) @ CLASS_COMBO_COUNTS / 1326.0
+
+
+def _chart(strategy: np.ndarray) -> dict:
+    """将 169 维策略转换为图表：频率、手牌列表（频率 >= 50%）和范围占比"""
+    frequencies = np.round(strategy, 3)
+    hands = [HAND_CLASSES[i] for i in np.flatnonzero(strategy >= 0.5)]
+    percent = float(strategy @ CLASS_COMBO_COUNTS) / 1326.0 * 100
+    return {
+        "hands": hands,
+        "percent": round(percent, 2),
+        "frequencies": {HAND_CLASSES[i]: float(frequencies[i]) for i in np.flatnonzero(frequencies > 0)},
+    }
+
+
+class PushFoldService:
+    """全下/弃牌求解服务（按参数缓存图表）"""
+
+    def __init__(self, cache_size: int = 512):
+        self._cache: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._cache_size = cache_size
+
+    async def solve(
+        self,
+        stack_depth: float,
+        players: int = 2,
+        ante: float = 0.0,
+        small_blind: float = 0.5,
+        big_blind: float = 1.0,
+    ) -> dict:
+        """
+        求解单个参数组合（在进程池中执行，结果缓存并保存到结果存储）
+
+        Args:
+            stack_depth: 有效筹码（bb）
+            players: 座位数
+            ante: 每人前注（bb）
+            small_blind: 小盲（bb）
+            big_blind: 大盲（bb）
+
+        Returns:
+            求解结果
+        """
+        key = (round(stack_depth, 3), players, round(ante, 4), round(small_blind, 4), round(big_blind, 4))
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        params = dict(zip(("stack_depth", "players", "ante", "small_blind", "big_blind"), key))
+        params["solver_version"] = SOLVER_VERSION
+        store_key = result_key("push_fold", params)
+        result, _ = await asyncio.to_thread(result_store.get, store_key)
+        if result is None:
+            result = await run_in_pool(solve_push_fold, *key)
+            await asyncio.to_thread(result_store.put, store_key, "push_fold", params, result)
+        self._cache[key] = result
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    async def sweep(
+        self,
+        players: int = 2,
+        ante: float = 0.0,
+        min_stack: float = 1.0,
+        max_stack: float = MAX_STACK_DEPTH,
+        step: float = 1.0,
+    ) -> List[dict]:
+        """
+        并行求解一组筹码深度
+
+        Returns:
+            每个筹码深度的求解结果
+        """
+        stacks = np.arange(min_stack, max_stack + step / 2, step)
+        return await asyncio.gather(*[
+            self.solve(float(stack), players=players, ante=ante) for stack in stacks
+        ])
+
+
+# 全局全下/弃牌求解服务实例
+push_fold_service = PushFoldService()
+
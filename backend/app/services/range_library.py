@@ -0,0 +1,464 @@
+"""
+服务端范围库
+范围保存在 SQLite 中，每个进程在内存中维护一份检索索引：
+
+- 组合位图：每个范围是 1326 位的组合位图（21 个 uint64），
+  按组合加权的 Jaccard 相似度 = popcount(a & b) / popcount(a | b)
+- 胜率画像：每个类别对抗该范围的翻前胜率（169 维），
+  两个范围画像的加权均方根差越小，对各类手牌的“打法”越接近
+
+其他 worker 写入后通过 SQLite 的 data_version 发现变化，增量加载新增的范围
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+import numpy as np
+
+from ..config.settings import settings
+from .cards import CLASS_COMBO_COUNTS, CLASS_INDEX, COMBO_CLASS, TOTAL_COMBOS, canonical_hands
+from .preflop_equity import class_equity_vs_ranges
+
+logger = logging.getLogger(__name__)
+
+# 1326 位补齐到 21 个 uint64
+BITSET_WORDS = 21
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ranges (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    hands TEXT NOT NULL,
+    position TEXT,
+    scenario TEXT,
+    tags TEXT NOT NULL,
+    bits BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ranges_position ON ranges (position, scenario);
+"""
+
+# numpy 2.0 之前没有 bitwise_count，按字节查表
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """
+    (N, W) uint64 位图每行的置位数
+
+    Returns:
+        (N,) int64
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+    return _POPCOUNT_TABLE[words.view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+
+def class_matrix(hand_lists: Iterable[Iterable[str]]) -> np.ndarray:
+    """(N, 169) 每个范围选中的类别"""
+    hand_lists = list(hand_lists)
+    matrix = np.zeros((len(hand_lists), 169), dtype=bool)
+    for row, hands in enumerate(hand_lists):
+        matrix[row, [CLASS_INDEX[h] for h in hands]] = True
+    return matrix
+
+
+# 每个类别的第一个组合，用于从组合位图还原类别
+_CLASS_FIRST_COMBO = np.array([np.flatnonzero(COMBO_CLASS == c)[0] for c in range(169)])
+
+
+def bitset_classes(bits: np.ndarray) -> np.ndarray:
+    """(N, 21) uint64 组合位图 -> (N, 169) 类别矩阵"""
+    combos = np.unpackbits(bits.view(np.uint8), axis=1)[:, :TOTAL_COMBOS]
+    return combos[:, _CLASS_FIRST_COMBO].astype(bool)
+
+
+def combo_bitsets(classes: np.ndarray) -> np.ndarray:
+    """(N, 169) 类别矩阵 -> (N, 21) uint64 组合位图"""
+    packed = np.packbits(classes[:, COMBO_CLASS], axis=1)
+    padded = np.zeros((classes.shape[0], BITSET_WORDS * 8), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+    return padded.view(np.uint64)
+
+
+def equity_profiles(classes: np.ndarray) -> np.ndarray:
+    """
+    每个类别对抗各个范围的翻前胜率
+
+    Args:
+        classes: (N, 169) 类别矩阵
+
+    Returns:
+        (N, 169) float32；与范围完全冲突的类别按 0.5 处理
+    """
+    return np.nan_to_num(class_equity_vs_ranges(classes), nan=0.5)
+
+
+# 胜率画像差异按英雄类别的组合数加权
+PROFILE_WEIGHTS = (CLASS_COMBO_COUNTS / TOTAL_COMBOS).astype(np.float32)
+
+
+@dataclass
+class LibraryRange:
+    """范围库中的一个范围"""
+    range_id: str
+    name: str
+    hands: List[str]
+    position: Optional[str]
+    scenario: Optional[str]
+    tags: List[str]
+    created_at: float
+
+    @property
+    def total_combinations(self) -> int:
+        return int(sum(CLASS_COMBO_COUNTS[CLASS_INDEX[h]] for h in self.hands))
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.range_id,
+            "name": self.name,
+            "hands": self.hands,
+            "position": self.position,
+            "scenario": self.scenario,
+            "tags": self.tags,
+            "total_combinations": self.total_combinations,
+            "created_at": datetime.fromtimestamp(self.created_at),
+        }
+
+
+@dataclass
+class _Index:
+    """
+    内存中的检索索引（按 seq 顺序排列，只保存检索需要的列，
+    名称和手牌等在返回结果时再从数据库读取）
+    """
+    seq: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    bits: np.ndarray = field(default_factory=lambda: np.zeros((0, BITSET_WORDS), dtype=np.uint64))
+    sizes: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    positions: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=object))
+    scenarios: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=object))
+    tags: List[Tuple[str, ...]] = field(default_factory=list)
+    profiles: Optional[np.ndarray] = None
+    profile_norms: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.seq)
+
+    def subset(self, keep: np.ndarray) -> "_Index":
+        """只保留 keep 为 True 的行"""
+        return _Index(
+            seq=self.seq[keep],
+            bits=self.bits[keep],
+            sizes=self.sizes[keep],
+            positions=self.positions[keep],
+            scenarios=self.scenarios[keep],
+            tags=[t for t, k in zip(self.tags, keep) if k],
+            profiles=None if self.profiles is None else self.profiles[keep],
+            profile_norms=None if self.profile_norms is None else self.profile_norms[keep],
+        )
+
+    def append(self, other: "_Index") -> "_Index":
+        """追加新行（胜率画像已计算时同时计算新行的画像）"""
+        profiles = profile_norms = None
+        if self.profiles is not None and len(other):
+            other.profiles = equity_profiles(bitset_classes(other.bits))
+            other.profile_norms = (other.profiles ** 2) @ PROFILE_WEIGHTS
+        if self.profiles is not None:
+            profiles = np.concatenate([self.profiles, other.profiles]) if len(other) else self.profiles
+            profile_norms = np.concatenate([self.profile_norms, other.profile_norms]) if len(other) else self.profile_norms
+        return _Index(
+            seq=np.concatenate([self.seq, other.seq]),
+            bits=np.concatenate([self.bits, other.bits]),
+            sizes=np.concatenate([self.sizes, other.sizes]),
+            positions=np.concatenate([self.positions, other.positions]),
+            scenarios=np.concatenate([self.scenarios, other.scenarios]),
+            tags=self.tags + other.tags,
+            profiles=profiles,
+            profile_norms=profile_norms,
+        )
+
+
+def _row_to_range(row: tuple) -> LibraryRange:
+    """(id, name, hands, position, scenario, tags, created_at) -> LibraryRange"""
+    return LibraryRange(
+        range_id=row[0], name=row[1], hands=row[2].split(","), position=row[3], scenario=row[4],
+        tags=json.loads(row[5]), created_at=row[6],
+    )
+
+
+def _normalize_label(value: Optional[str]) -> Optional[str]:
+    value = (value or "").strip()
+    return value or None
+
+
+def _normalize_tags(tags: Optional[Iterable[str]]) -> List[str]:
+    return sorted({t.strip() for t in tags or [] if t and t.strip()})
+
+
+class RangeLibraryService:
+    """范围库服务"""
+
+    def __init__(self):
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._index = _Index()
+        self._data_version: Optional[int] = None
+        self._dirty = True
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            path = Path(settings.range_library_file)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    # ------------------------------------------
+    # 写入
+    # ------------------------------------------
+
+    def add_many(self, entries: List[dict]) -> List[str]:
+        """
+        批量添加范围（单个事务）
+
+        Args:
+            entries: 每项包含 name, hands, position, scenario, tags
+
+        Returns:
+            新范围的 ID 列表
+
+        Raises:
+            ValueError: 某个范围没有有效的手牌
+        """
+        hand_lists = []
+        for index, entry in enumerate(entries):
+            hands = canonical_hands(entry["hands"])
+            if not hands:
+                raise ValueError(f"第 {index + 1} 个范围（{entry['name']}）没有有效的手牌")
+            hand_lists.append(hands)
+
+        bits = combo_bitsets(class_matrix(hand_lists))
+        now = time.time()
+        ids = [str(uuid.uuid4()) for _ in entries]
+        rows = [
+            (
+                range_id, entry["name"], ",".join(hands),
+                _normalize_label(entry.get("position")), _normalize_label(entry.get("scenario")),
+                json.dumps(_normalize_tags(entry.get("tags")), ensure_ascii=False),
+                bits[row].tobytes(), now,
+            )
+            for row, (range_id, entry, hands) in enumerate(zip(ids, entries, hand_lists))
+        ]
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany(
+                    "INSERT INTO ranges (id, name, hands, position, scenario, tags, bits, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+            self._dirty = True
+        return ids
+
+    def delete(self, range_id: str) -> bool:
+        """删除范围，不存在时返回 False"""
+        with self._lock:
+            deleted = self._db().execute("DELETE FROM ranges WHERE id = ?", (range_id,)).rowcount > 0
+            self._dirty = True
+        return deleted
+
+    # ------------------------------------------
+    # 索引
+    # ------------------------------------------
+
+    def _refresh(self) -> _Index:
+        """
+        必要时同步索引（调用方持有锁）：
+        去掉已删除的行，增量加载新增的行（seq 单调递增）
+        """
+        db = self._db()
+        data_version = db.execute("PRAGMA data_version").fetchone()[0]
+        if not self._dirty and data_version == self._data_version:
+            return self._index
+        self._data_version = data_version
+        self._dirty = False
+
+        index = self._index
+        last_seq = int(index.seq[-1]) if len(index) else 0
+        existing = db.execute("SELECT COUNT(*) FROM ranges WHERE seq <= ?", (last_seq,)).fetchone()[0]
+        if existing != len(index):
+            live = np.array([r[0] for r in db.execute("SELECT seq FROM ranges WHERE seq <= ?", (last_seq,))], dtype=np.int64)
+            index = index.subset(np.isin(index.seq, live))
+
+        rows = db.execute(
+            "SELECT seq, position, scenario, tags, bits FROM ranges WHERE seq > ? ORDER BY seq", (last_seq,)
+        ).fetchall()
+        bits = np.frombuffer(b"".join(r[4] for r in rows), dtype=np.uint64).reshape(-1, BITSET_WORDS)
+        self._index = index.append(_Index(
+            seq=np.array([r[0] for r in rows], dtype=np.int64),
+            bits=bits,
+            sizes=popcount(bits),
+            positions=np.array([r[1] for r in rows], dtype=object),
+            scenarios=np.array([r[2] for r in rows], dtype=object),
+            tags=[tuple(json.loads(r[3])) if r[3] != "[]" else () for r in rows],
+        ))
+        return self._index
+
+    def _mask(
+        self,
+        index: _Index,
+        position: Optional[str],
+        scenario: Optional[str],
+        tags: Optional[List[str]],
+    ) -> np.ndarray:
+        mask = np.ones(len(index), dtype=bool)
+        if position:
+            mask &= index.positions == position
+        if scenario:
+            mask &= index.scenarios == scenario
+        required = set(_normalize_tags(tags))
+        if required:
+            mask &= np.fromiter((required.issubset(t) for t in index.tags), dtype=bool, count=len(index))
+        return mask
+
+    def _fetch(self, seqs: Iterable[int]) -> Dict[int, LibraryRange]:
+        """按 seq 从数据库读取完整的范围（已被删除的不在结果中）"""
+        seqs = [int(s) for s in seqs]
+        if not seqs:
+            return {}
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT seq, id, name, hands, position, scenario, tags, created_at FROM ranges "
+                f"WHERE seq IN ({','.join('?' * len(seqs))})",
+                seqs,
+            ).fetchall()
+        return {r[0]: _row_to_range(r[1:]) for r in rows}
+
+    # ------------------------------------------
+    # 查询
+    # ------------------------------------------
+
+    def get(self, range_id: str) -> Optional[LibraryRange]:
+        """按 ID 获取范围"""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT id, name, hands, position, scenario, tags, created_at FROM ranges WHERE id = ?",
+                (range_id,),
+            ).fetchone()
+        return _row_to_range(row) if row is not None else None
+
+    def list_ranges(
+        self,
+        position: Optional[str] = None,
+        scenario: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Tuple[int, List[LibraryRange]]:
+        """
+        按位置、场景和标签筛选范围（按添加时间从新到旧）
+
+        Returns:
+            (符合条件的总数, 当前页的范围)
+        """
+        with self._lock:
+            index = self._refresh()
+        matches = index.seq[self._mask(index, position, scenario, tags)][::-1]
+        page = matches[offset:offset + limit]
+        fetched = self._fetch(page)
+        return len(matches), [fetched[s] for s in page if s in fetched]
+
+    def search(
+        self,
+        hands: List[str],
+        metric: str = "jaccard",
+        position: Optional[str] = None,
+        scenario: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        limit: int = 10,
+        exclude_id: Optional[str] = None,
+    ) -> List[Tuple[LibraryRange, float]]:
+        """
+        查找与给定范围最相似的范围
+
+        Args:
+            hands: 查询范围
+            metric: jaccard（按组合加权的 Jaccard）或 equity（胜率画像相似度）
+            position: 只在该位置的范围中查找
+            scenario: 只在该场景的范围中查找
+            tags: 只在包含全部这些标签的范围中查找
+            limit: 返回数量
+            exclude_id: 排除的范围 ID（按库中范围查找时排除自身）
+
+        Returns:
+            [(范围, 相似度 0-1)]，按相似度从高到低
+
+        Raises:
+            ValueError: 查询范围没有有效的手牌
+        """
+        canonical = canonical_hands(hands)
+        if not canonical:
+            raise ValueError("范围中没有有效的手牌")
+        query_classes = class_matrix([canonical])
+
+        with self._lock:
+            index = self._refresh()
+            if metric == "equity" and index.profiles is None and len(index):
+                # 胜率画像在第一次按胜率检索时再计算
+                index.profiles = equity_profiles(bitset_classes(index.bits))
+                index.profile_norms = (index.profiles ** 2) @ PROFILE_WEIGHTS
+
+        candidates = np.flatnonzero(self._mask(index, position, scenario, tags))
+        if len(candidates) == 0:
+            return []
+
+        if metric == "equity":
+            query = equity_profiles(query_classes)[0]
+            # 加权平方差 = |a|² - 2a·q + |q|²，避免生成 (N, 169) 的差值矩阵
+            squared = (
+                index.profile_norms[candidates]
+                - 2.0 * (index.profiles[candidates] @ (query * PROFILE_WEIGHTS))
+                + (query ** 2) @ PROFILE_WEIGHTS
+            )
+            # 胜率画像的差异最大为 1，换算为 0-1 的相似度
+            similarity = 1.0 - np.sqrt(np.maximum(squared, 0.0))
+        else:
+            query = combo_bitsets(query_classes)
+            intersection = popcount(index.bits[candidates] & query)
+            union = index.sizes[candidates] + popcount(query)[0] - intersection
+            similarity = intersection / union
+
+        # 多取一个，排除查询范围自身后仍有 limit 个
+        k = min(limit + 1, len(candidates))
+        top = np.argpartition(-similarity, k - 1)[:k]
+        top = top[np.argsort(-similarity[top], kind="stable")]
+        fetched = self._fetch(index.seq[candidates[top]])
+        results = [
+            (fetched[s], round(float(similarity[i]), 4))
+            for s, i in zip(index.seq[candidates[top]], top)
+            if s in fetched and fetched[s].range_id != exclude_id
+        ]
+        return results[:limit]
+
+    def count(self) -> int:
+        """范围库中的范围数"""
+        with self._lock:
+            return len(self._refresh())
+
+
+# 全局范围库服务实例
+range_library_service = RangeLibraryService()
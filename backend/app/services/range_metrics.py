@@ -0,0 +1,150 @@
+"""
+范围的确定性指标
+不依赖 AI：紧松程度、对子/同色/不同色构成、高牌占比、阻断牌、翻前胜率摘要和胜率分布形状，
+全部在 169 个类别的向量上计算，用于范围分析的第一阶段和分析提示
+"""
+from typing import Iterable, List, Optional
+import numpy as np
+
+from .cards import CLASS_COMBO_COUNTS, HAND_CLASSES, RANKS, TOTAL_COMBOS, canonical_hands, class_weights
+from .equity_distribution import distribution_stats
+from .preflop_equity import equity_vs_random, hand_ranking, preflop_table_ready
+
+# 阻断牌统计的点数
+BLOCKER_RANKS = "AKQJT"
+
+# 紧松程度的划分（范围占全部组合的百分比上限）
+TIGHTNESS_LEVELS = ((10.0, "很紧"), (20.0, "紧"), (35.0, "中等"), (100.0, "松"))
+
+
+def _class_ranks() -> np.ndarray:
+    """(169, 2) 每个类别的两张牌点数（A=12）"""
+    return np.array([[RANKS.index(h[0]), RANKS.index(h[1])] for h in HAND_CLASSES])
+
+
+CLASS_RANKS = _class_ranks()
+IS_PAIR = CLASS_RANKS[:, 0] == CLASS_RANKS[:, 1]
+IS_SUITED = np.array([h.endswith("s") for h in HAND_CLASSES])
+IS_BROADWAY = CLASS_RANKS.min(axis=1) >= RANKS.index("T")
+
+# (5, 169) 每个类别中至少含一张该点数的组合数（对子的每个组合都含两张）
+BLOCKER_COMBOS = np.array([
+    np.where((CLASS_RANKS == RANKS.index(rank)).any(axis=1), CLASS_COMBO_COUNTS, 0)
+    for rank in BLOCKER_RANKS
+])
+
+
+def _tightness(percent: float) -> str:
+    for limit, label in TIGHTNESS_LEVELS:
+        if percent <= limit:
+            return label
+    return TIGHTNESS_LEVELS[-1][1]
+
+
+def _top_range_overlap(selected: np.ndarray, combos: int) -> float:
+    """范围中落在同样大小的最强范围（按对抗随机手牌胜率）内的组合比例，1 表示线性范围"""
+    ranking = hand_ranking()
+    cumulative = np.cumsum(CLASS_COMBO_COUNTS[ranking])
+    # 最后一个类别只部分计入，使最强范围的组合数恰好等于 combos
+    inside = np.clip(combos - (cumulative - CLASS_COMBO_COUNTS[ranking]), 0, CLASS_COMBO_COUNTS[ranking])
+    return float((inside * selected[ranking]).sum() / combos)
+
+
+def range_metrics(hands: Iterable[str], equity: Optional[bool] = None) -> dict:
+    """
+    计算范围的确定性指标
+
+    Args:
+        hands: 手牌列表
+        equity: 是否计算胜率相关指标；None 表示翻前胜率表已经可用时才计算（不会等待计算胜率表）
+
+    Returns:
+        与 RangeMetrics 对应的字典
+
+    Raises:
+        ValueError: 范围中没有有效的手牌
+    """
+    canonical = canonical_hands(hands)
+    if not canonical:
+        raise ValueError("范围中没有有效的手牌")
+    selected = class_weights(canonical)
+    counts = selected * CLASS_COMBO_COUNTS
+    combos = int(counts.sum())
+
+    def share(mask: np.ndarray) -> float:
+        return round(float(counts[mask].sum() / combos), 4)
+
+    percent = combos / TOTAL_COMBOS * 100
+    metrics = {
+        "total_combinations": combos,
+        "tightness_percentile": round(percent, 2),
+        "tightness": _tightness(percent),
+        "pair_share": share(IS_PAIR),
+        "suited_share": share(IS_SUITED),
+        "offsuit_share": share(~IS_PAIR & ~IS_SUITED),
+        "broadway_share": share(IS_BROADWAY),
+        "blockers": {
+            rank: round(float((BLOCKER_COMBOS[i] * selected).sum() / combos), 4)
+            for i, rank in enumerate(BLOCKER_RANKS)
+        },
+        "top_range_overlap": None,
+        "equity": None,
+        "distribution": None,
+    }
+
+    if equity is None:
+        equity = preflop_table_ready()
+    if equity:
+        class_equity = equity_vs_random()
+        members: List[int] = np.flatnonzero(selected).tolist()
+        strongest = max(members, key=lambda i: class_equity[i])
+        weakest = min(members, key=lambda i: class_equity[i])
+        metrics["top_range_overlap"] = round(_top_range_overlap(selected, combos), 4)
+        metrics["equity"] = {
+            "vs_random": round(float((counts * class_equity).sum() / combos), 4),
+            "strongest": HAND_CLASSES[strongest],
+            "strongest_equity": round(float(class_equity[strongest]), 4),
+            "weakest": HAND_CLASSES[weakest],
+            "weakest_equity": round(float(class_equity[weakest]), 4),
+            "below_half_share": share(class_equity < 0.5),
+        }
+        metrics["distribution"] = distribution_stats(class_equity, counts)
+    return metrics
+
+
+def metrics_prompt(metrics: dict) -> str:
+    """
+    将指标格式化为分析提示中的文本（供 AI 在计算结果的基础上解读）
+
+    Args:
+        metrics: range_metrics 的结果
+
+    Returns:
+        多行文本
+    """
+    blockers = "，".join(f"{rank} {value * 100:.1f}%" for rank, value in metrics["blockers"].items())
+    lines = [
+        f"紧松程度: {metrics['tightness']}（约前 {metrics['tightness_percentile']:.1f}% 的起手牌）",
+        f"构成: 对子 {metrics['pair_share'] * 100:.1f}%，同色 {metrics['suited_share'] * 100:.1f}%，"
+        f"不同色 {metrics['offsuit_share'] * 100:.1f}%",
+        f"高牌（T 以上）组合占比: {metrics['broadway_share'] * 100:.1f}%",
+        f"阻断牌（含该点数的组合占比）: {blockers}",
+    ]
+    if metrics["top_range_overlap"] is not None:
+        lines.append(f"与同样大小的最强范围重合: {metrics['top_range_overlap'] * 100:.1f}%")
+    equity = metrics["equity"]
+    if equity:
+        lines.append(
+            f"对抗随机手牌胜率: 平均 {equity['vs_random'] * 100:.1f}%，"
+            f"最强 {equity['strongest']} {equity['strongest_equity'] * 100:.1f}%，"
+            f"最弱 {equity['weakest']} {equity['weakest_equity'] * 100:.1f}%，"
+            f"低于 50% 的组合占 {equity['below_half_share'] * 100:.1f}%"
+        )
+    distribution = metrics["distribution"]
+    if distribution:
+        lines.append(
+            f"胜率分布（对抗随机手牌）: {distribution['shape']}，标准差 {distribution['std'] * 100:.1f}%，"
+            f"四分位 {distribution['p25'] * 100:.1f}% / {distribution['median'] * 100:.1f}% / {distribution['p75'] * 100:.1f}%，"
+            f"胜率 70% 以上 {distribution['strong_share'] * 100:.1f}%，30% 以下 {distribution['weak_share'] * 100:.1f}%"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,254 @@
+"""
+持久化结果存储
+按 (操作, 规范化参数) 的哈希保存计算结果，多个 worker 进程和重启之间共享：
+
+- 索引保存在 SQLite（WAL 模式，多进程可以同时读写）
+- JSON 结果直接存在 SQLite 中；NumPy 数组保存为 .npy 文件，读取时内存映射，不复制数据
+- 总大小超过上限时按最近访问时间淘汰
+"""
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+from ..config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+
+# 访问时间的更新间隔（秒），避免每次命中都写数据库
+TOUCH_INTERVAL_SECONDS = 60.0
+
+# 淘汰时清理到上限的这个比例，避免每次写入都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    operation TEXT NOT NULL,
+    params TEXT NOT NULL,
+    value TEXT,
+    arrays TEXT,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at);
+CREATE INDEX IF NOT EXISTS results_operation ON results (operation, accessed_at);
+"""
+
+
+def result_key(operation: str, params: Dict[str, Any]) -> str:
+    """
+    计算结果的内容地址
+
+    Args:
+        operation: 操作名称
+        params: 参数（范围等应先规范化，字典键顺序无关）
+
+    Returns:
+        十六进制 SHA-256
+    """
+    payload = json.dumps(
+        {"version": STORE_VERSION, "operation": operation, "params": params},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultStore:
+    """持久化结果存储（进程内线程安全，进程间通过 SQLite 加锁）"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> Path:
+        return Path(self._directory or settings.cache_dir)
+
+    def _db(self) -> sqlite3.Connection:
+        # fork 出的子进程不能复用父进程的连接
+        if self._connection is None or self._pid != os.getpid():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                self.directory / "results.db", timeout=30, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def _array_path(self, key: str, name: str) -> Path:
+        return self.directory / "results" / key[:2] / f"{key}.{name}.npy"
+
+    def _lookup(self, key: str) -> Optional[tuple]:
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT value, arrays, accessed_at, expires_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[3] is not None and row[3] <= now:
+                self._delete(db, key, row[1])
+                return None
+            if now - row[2] > TOUCH_INTERVAL_SECONDS:
+                db.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+        return row
+
+    def get(self, key: str) -> Tuple[Optional[Any], Optional[Dict[str, np.ndarray]]]:
+        """
+        读取结果
+
+        Args:
+            key: result_key 计算的键
+
+        Returns:
+            (value, arrays)：未命中时均为 None；数组为只读的内存映射
+        """
+        try:
+            row = self._lookup(key)
+            if row is None:
+                return None, None
+            value = json.loads(row[0]) if row[0] is not None else None
+            arrays = None
+            if row[1] is not None:
+                arrays = {
+                    name: np.load(self._array_path(key, name), mmap_mode="r")
+                    for name in json.loads(row[1])
+                }
+            return value, arrays
+        except (OSError, ValueError, sqlite3.Error) as e:
+            # 数组文件可能刚被其他进程淘汰，按未命中处理
+            logger.warning(f"⚠️  读取结果存储失败: {e}")
+            return None, None
+
+    def put(
+        self,
+        key: str,
+        operation: str,
+        params: Dict[str, Any],
+        value: Any = None,
+        arrays: Optional[Dict[str, np.ndarray]] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        """
+        保存结果（写入失败只记录日志，不影响调用方）
+
+        Args:
+            key: result_key 计算的键
+            operation: 操作名称
+            params: 参数（用于预热时重建内存缓存）
+            value: 可 JSON 序列化的结果
+            arrays: NumPy 数组
+            ttl_seconds: 过期时间，None 表示不过期（只受大小上限淘汰）
+        """
+        try:
+            encoded = json.dumps(value, ensure_ascii=False) if value is not None else None
+            size = len(encoded.encode("utf-8")) if encoded is not None else 0
+            for name, array in (arrays or {}).items():
+                path = self._array_path(key, name)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # 先写临时文件再替换，读取方不会映射到写了一半的文件
+                temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+                with open(temporary, "wb") as f:
+                    np.save(f, np.ascontiguousarray(array))
+                os.replace(temporary, path)
+                size += path.stat().st_size
+
+            now = time.time()
+            with self._lock:
+                db = self._db()
+                db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key, operation, json.dumps(params, ensure_ascii=False), encoded,
+                        json.dumps(list(arrays)) if arrays else None, size, now, now,
+                        now + ttl_seconds if ttl_seconds is not None else None,
+                    ),
+                )
+                self._evict(db)
+        except (OSError, TypeError, ValueError, sqlite3.Error) as e:
+            logger.warning(f"⚠️  保存结果失败 ({operation}): {e}")
+
+    def _delete(self, db: sqlite3.Connection, key: str, arrays: Optional[str]):
+        db.execute("DELETE FROM results WHERE key = ?", (key,))
+        # 其他进程已经映射的文件在删除后仍然可读
+        for name in json.loads(arrays) if arrays else []:
+            self._array_path(key, name).unlink(missing_ok=True)
+
+    def _evict(self, db: sqlite3.Connection):
+        """删除过期结果；总大小超过上限时按最近访问时间淘汰"""
+        for key, arrays in db.execute(
+            "SELECT key, arrays FROM results WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        ).fetchall():
+            self._delete(db, key, arrays)
+
+        limit = settings.result_store_max_mb * 1024 * 1024
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= limit:
+            return
+        target = limit * EVICT_TARGET_RATIO
+        evicted = 0
+        for key, arrays, size in db.execute(
+            "SELECT key, arrays, size FROM results ORDER BY accessed_at"
+        ).fetchall():
+            if total <= target:
+                break
+            self._delete(db, key, arrays)
+            total -= size
+            evicted += 1
+        logger.info(f"🧹 结果存储已淘汰 {evicted} 条")
+
+    def recent(self, operation: str, limit: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        最近访问过的结果（用于启动时预热）
+
+        Args:
+            operation: 操作名称
+            limit: 最大条数
+
+        Yields:
+            (key, params)
+        """
+        if limit <= 0:
+            return
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT key, params FROM results WHERE operation = ? AND (expires_at IS NULL OR expires_at > ?) "
+                "ORDER BY accessed_at DESC LIMIT ?",
+                (operation, time.time(), limit),
+            ).fetchall()
+        for key, params in rows:
+            yield key, json.loads(params)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """每种操作的结果条数和占用字节数"""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT operation, COUNT(*), SUM(size) FROM results GROUP BY operation"
+            ).fetchall()
+        return {operation: {"entries": count, "bytes": size} for operation, count, size in rows}
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+
+# 全局结果存储实例
+result_store = ResultStore()
@@ -0,0 +1,397 @@
+"""
+河牌子博弈 CFR+ 求解
+在固定的 5 张公共牌上，两个范围按给定的下注尺度树进行对抗：
+
+- 所有计算都是 1326 维的组合向量；组合强度和摊牌排序在每个牌面上只计算一次
+- 摊牌和弃牌收益通过前缀和处理卡牌移除（两个玩家不能持有相同的牌）
+- CFR+：遗憾值截断为非负、交替更新、按迭代次数线性加权平均策略
+- 定期计算最优反应，可利用度低于目标时停止
+
+收益以河牌开始时的筹码计：摊牌时得到最终底池的份额减去自己在河牌投入的筹码，
+两个玩家的收益之和恒等于河牌开始时的底池
+"""
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+import logging
+import time
+import numpy as np
+
+from .cards import COMBOS, COMBO_HAS_CARD, COMBO_NAMES, TOTAL_COMBOS, parse_board, range_weights
+from .equity import ShowdownIndex, board_strengths
+
+logger = logging.getLogger(__name__)
+
+OOP, IP = 0, 1
+PLAYER_NAMES = ["oop", "ip"]
+
+# 下注额与全下额相差不到这个比例时合并为全下
+ALLIN_MERGE_RATIO = 0.05
+
+# 博弈树的决策节点上限（防止下注尺度过多时树爆炸）
+MAX_DECISION_NODES = 400
+
+# 每隔多少次迭代计算一次可利用度
+EXPLOITABILITY_CHECK_INTERVAL = 10
+
+
+@dataclass
+class _Node:
+    """博弈树节点（player 为 None 表示终局）"""
+    path: str
+    player: Optional[int]
+    invested: Tuple[float, float]
+    actions: List[str] = field(default_factory=list)
+    children: List["_Node"] = field(default_factory=list)
+    folder: Optional[int] = None
+    regrets: Optional[np.ndarray] = None
+    strategy_sum: Optional[np.ndarray] = None
+
+
+@dataclass
+class TreeConfig:
+    """下注尺度树"""
+    pot: float
+    stack: float
+    oop_bet_sizes: List[float]
+    ip_bet_sizes: List[float]
+    raise_sizes: List[float]
+    max_raises: int = 1
+    allin: bool = True
+
+
+def _format_size(fraction: float) -> str:
+    return f"{fraction * 100:g}%"
+
+
+def build_tree(config: TreeConfig) -> _Node:
+    """
+    构建河牌博弈树（OOP 先行动）
+
+    下注尺度为底池比例；加注尺度为跟注后底池的比例（加注到 = 对手投入 + 比例 × 跟注后底池）
+
+    Raises:
+        ValueError: 树的决策节点过多
+    """
+    count = 0
+
+    def label(kind: str, fraction: Optional[float]) -> str:
+        return "allin" if fraction is None else f"{kind} {_format_size(fraction)}"
+
+    def sized(player: int, invested: List[float], targets: List[Tuple[str, Optional[float], float]]):
+        """把目标投入额截断到全下并去重，返回 (动作名, 投入额)"""
+        seen = []
+        for kind, fraction, target in targets:
+            if target >= config.stack * (1 - ALLIN_MERGE_RATIO):
+                target, fraction = config.stack, None
+            if target <= invested[player] or any(abs(target - t) < 1e-9 for _, t in seen):
+                continue
+            seen.append((label(kind, fraction), target))
+        return seen
+
+    def build(path: str, player: int, invested: Tuple[float, float], raises: int) -> _Node:
+        nonlocal count
+        count += 1
+        if count > MAX_DECISION_NODES:
+            raise ValueError(f"博弈树过大（超过 {MAX_DECISION_NODES} 个决策节点），请减少下注尺度或加注次数")
+
+        node = _Node(path=path, player=player, invested=invested)
+        opponent = 1 - player
+        pot = config.pot + sum(invested)
+        facing = invested[opponent] - invested[player]
+
+        def child(action: str, new_invested: Tuple[float, float], next_node):
+            node.actions.append(action)
+            node.children.append(next_node(f"{path} {action}".strip(), new_invested))
+
+        def terminal(folder: Optional[int] = None):
+            return lambda child_path, child_invested: _Node(
+                path=child_path, player=None, invested=child_invested, folder=folder
+            )
+
+        def decision(next_player: int, next_raises: int):
+            return lambda child_path, child_invested: build(child_path, next_player, child_invested, next_raises)
+
+        def with_investment(amount: float) -> Tuple[float, float]:
+            values = list(invested)
+            values[player] = amount
+            return tuple(values)
+
+        if facing <= 0:
+            # 没有需要跟注的下注：过牌或下注
+            child("check", invested, terminal() if player == IP else decision(IP, raises))
+            sizes = config.oop_bet_sizes if player == OOP else config.ip_bet_sizes
+            targets = [("bet", f, invested[player] + f * pot) for f in sizes]
+            if config.allin:
+                targets.append(("bet", None, config.stack))
+            for action, target in sized(player, list(invested), targets):
+                child(action, with_investment(target), decision(opponent, raises))
+        else:
+            child("fold", invested, terminal(folder=player))
+            child("call", with_investment(invested[opponent]), terminal())
+            if raises < config.max_raises and invested[opponent] < config.stack:
+                pot_after_call = pot + facing
+                targets = [("raise", f, invested[opponent] + f * pot_after_call) for f in config.raise_sizes]
+                if config.allin:
+                    targets.append(("raise", None, config.stack))
+                for action, target in sized(player, list(invested), targets):
+                    child(action, with_investment(target), decision(opponent, raises + 1))
+        return node
+
+    return build("", OOP, (0.0, 0.0), 0)
+
+
+def _decision_nodes(node: _Node) -> List[_Node]:
+    if node.player is None:
+        return []
+    nodes = [node]
+    for child in node.children:
+        nodes.extend(_decision_nodes(child))
+    return nodes
+
+
+def _regret_matching(regrets: np.ndarray) -> np.ndarray:
+    """(A, 1326) 正遗憾值归一化为策略；全为 0 时均匀分布"""
+    positive = np.maximum(regrets, 0.0)
+    total = positive.sum(axis=0)
+    uniform = np.full_like(regrets, 1.0 / regrets.shape[0])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, positive / total, uniform)
+
+
+class RiverSolver:
+    """河牌子博弈求解器"""
+
+    def __init__(self, board: List[int], oop_weights: np.ndarray, ip_weights: np.ndarray, config: TreeConfig):
+        """
+        Args:
+            board: 5 张公共牌索引
+            oop_weights: (1326,) OOP 范围的组合权重（已去除与公共牌冲突的组合）
+            ip_weights: (1326,) IP 范围的组合权重
+            config: 下注尺度树
+        """
+        self.config = config
+        self.ranges = (oop_weights, ip_weights)
+        # 组合强度和摊牌排序每个牌面只计算一次
+        self.showdown = ShowdownIndex(board_strengths(np.array([board]))[0])
+        self.live = self.showdown.live
+        self.root = build_tree(config)
+        self.nodes = _decision_nodes(self.root)
+        for node in self.nodes:
+            node.regrets = np.zeros((len(node.actions), TOTAL_COMBOS))
+            node.strategy_sum = np.zeros((len(node.actions), TOTAL_COMBOS))
+        # 每个组合可匹配的对手权重（扣除共享牌的对手组合）
+        self.matchable = tuple(self._blocked_total(self.ranges[1 - p]) for p in (OOP, IP))
+
+    def _blocked_total(self, weights: np.ndarray) -> np.ndarray:
+        """每个组合可匹配的对手权重（与 h 不共享牌的对手组合权重之和）"""
+        card_sums = weights @ COMBO_HAS_CARD
+        total = weights.sum() - card_sums[COMBOS[:, 0]] - card_sums[COMBOS[:, 1]] + weights
+        return np.where(self.live, total, 0.0)
+
+    def _terminal(self, node: _Node, player: int, opponent_reach: np.ndarray) -> np.ndarray:
+        """终局时 player 每个组合的收益（按对手到达概率加权求和）"""
+        invested = node.invested
+        if node.folder is not None:
+            if node.folder == player:
+                value = -invested[player]
+            else:
+                value = self.config.pot + invested[node.folder]
+            return value * self._blocked_total(opponent_reach)
+        share, total = self.showdown.terms(opponent_reach)
+        return (self.config.pot + sum(invested)) * share - invested[player] * total
+
+    def _cfr(self, node: _Node, player: int, reach: np.ndarray, opponent_reach: np.ndarray, weight: float) -> np.ndarray:
+        """CFR+ 遍历：更新 player 的遗憾值，返回 player 每个组合的反事实收益"""
+        if node.player is None:
+            return self._terminal(node, player, opponent_reach)
+
+        strategy = _regret_matching(node.regrets)
+        if node.player == player:
+            values = np.stack([
+                self._cfr(child, player, reach * strategy[a], opponent_reach, weight)
+                for a, child in enumerate(node.children)
+            ])
+            node_value = (strategy * values).sum(axis=0)
+            node.regrets = np.maximum(node.regrets + values - node_value, 0.0)
+            node.strategy_sum += weight * reach * strategy
+            return node_value
+
+        return sum(
+            self._cfr(child, player, reach, opponent_reach * strategy[a], weight)
+            for a, child in enumerate(node.children)
+        )
+
+    def average_strategy(self, node: _Node) -> np.ndarray:
+        """(A, 1326) 平均策略"""
+        total = node.strategy_sum.sum(axis=0)
+        uniform = np.full_like(node.strategy_sum, 1.0 / len(node.actions))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(total > 0, node.strategy_sum / total, uniform)
+
+    def _evaluate(self, node: _Node, player: int, opponent_reach: np.ndarray, best_response: bool) -> np.ndarray:
+        """
+        按平均策略计算 player 每个组合的收益
+
+        best_response 为 True 时 player 在自己的节点上选择收益最大的动作（最优反应）
+        """
+        if node.player is None:
+            return self._terminal(node, player, opponent_reach)
+        strategy = self.average_strategy(node)
+        if node.player == player:
+            values = np.stack([
+                self._evaluate(child, player, opponent_reach, best_response) for child in node.children
+            ])
+            return values.max(axis=0) if best_response else (strategy * values).sum(axis=0)
+        return sum(
+            self._evaluate(child, player, opponent_reach * strategy[a], best_response)
+            for a, child in enumerate(node.children)
+        )
+
+    def _total_value(self, player: int, values: np.ndarray) -> float:
+        """组合收益按自己的范围加权，归一化为每手牌的期望收益"""
+        pairs = self.ranges[player] @ self.matchable[player]
+        return float(self.ranges[player] @ values / pairs) if pairs > 0 else 0.0
+
+    def exploitability(self) -> float:
+        """可利用度（占底池的百分比）：两个玩家最优反应收益之和超出底池部分的一半"""
+        best = [
+            self._total_value(p, self._evaluate(self.root, p, self.ranges[1 - p], best_response=True))
+            for p in (OOP, IP)
+        ]
+        return (sum(best) - self.config.pot) / 2 / self.config.pot * 100
+
+    def solve(self, max_iterations: int, target_exploitability: float) -> Tuple[int, float]:
+        """
+        迭代求解，直到可利用度低于目标或达到最大迭代次数
+
+        Args:
+            max_iterations: 最大迭代次数
+            target_exploitability: 目标可利用度（占底池的百分比）
+
+        Returns:
+            (迭代次数, 可利用度)
+        """
+        exploitability = float("inf")
+        iteration = 0
+        while iteration < max_iterations:
+            iteration += 1
+            for player in (OOP, IP):
+                self._cfr(self.root, player, self.ranges[player], self.ranges[1 - player], float(iteration))
+            if iteration % EXPLOITABILITY_CHECK_INTERVAL == 0 or iteration == max_iterations:
+                exploitability = self.exploitability()
+                if exploitability <= target_exploitability:
+                    break
+        return iteration, exploitability
+
+    def report(self, include_combos: bool = True) -> dict:
+        """
+        求解结果：每个决策节点的整体动作频率和每个组合的策略，以及根节点上每个组合的期望收益
+
+        Args:
+            include_combos: 是否包含每个组合的策略
+        """
+        nodes = []
+
+        def visit(node: _Node, reach: Tuple[np.ndarray, np.ndarray]):
+            if node.player is None:
+                return
+            strategy = self.average_strategy(node)
+            own = reach[node.player]
+            in_range = np.flatnonzero((self.ranges[node.player] > 0) & self.live)
+            weight = own.sum()
+            entry = {
+                "path": node.path or "root",
+                "player": PLAYER_NAMES[node.player],
+                "pot": round(self.config.pot + sum(node.invested), 4),
+                "to_call": round(abs(node.invested[0] - node.invested[1]), 4),
+                "actions": node.actions,
+                "frequencies": [round(float(own @ s / weight), 4) if weight > 0 else 0.0 for s in strategy],
+            }
+            if include_combos:
+                entry["strategy"] = {
+                    COMBO_NAMES[c]: [round(float(v), 4) for v in strategy[:, c]] for c in in_range
+                }
+            nodes.append(entry)
+            for a, child in enumerate(node.children):
+                child_reach = list(reach)
+                child_reach[node.player] = own * strategy[a]
+                visit(child, tuple(child_reach))
+
+        visit(self.root, self.ranges)
+
+        ev = {}
+        for player in (OOP, IP):
+            values = self._evaluate(self.root, player, self.ranges[1 - player], best_response=False)
+            in_range = np.flatnonzero((self.ranges[player] > 0) & (self.matchable[player] > 0))
+            conditional = values[in_range] / self.matchable[player][in_range]
+            ev[PLAYER_NAMES[player]] = {
+                "total": round(self._total_value(player, values), 4),
+                "combos": {COMBO_NAMES[c]: round(float(v), 4) for c, v in zip(in_range, conditional)},
+            }
+        return {"nodes": nodes, "ev": ev}
+
+
+def solve_river(
+    oop_hands: List[str],
+    ip_hands: List[str],
+    board: str,
+    pot: float,
+    stack: float,
+    oop_bet_sizes: List[float],
+    ip_bet_sizes: List[float],
+    raise_sizes: List[float],
+    max_raises: int = 1,
+    allin: bool = True,
+    max_iterations: int = 1000,
+    target_exploitability: float = 0.5,
+    include_combos: bool = True,
+) -> dict:
+    """
+    求解河牌子博弈（在计算进程中执行）
+
+    Args:
+        oop_hands: 先行动玩家的范围
+        ip_hands: 后行动玩家的范围
+        board: 5 张公共牌，如 "AsKd7h2c3s"
+        pot: 河牌开始时的底池
+        stack: 河牌开始时的有效筹码
+        oop_bet_sizes: OOP 下注尺度（底池比例）
+        ip_bet_sizes: IP 下注尺度（底池比例）
+        raise_sizes: 加注尺度（跟注后底池的比例）
+        max_raises: 每条下注线上最多的加注次数
+        allin: 是否加入全下选项
+        max_iterations: 最大迭代次数
+        target_exploitability: 目标可利用度（占底池的百分比）
+        include_combos: 是否返回每个组合的策略
+
+    Returns:
+        求解结果
+
+    Raises:
+        ValueError: 公共牌不是 5 张、范围为空或博弈树过大
+    """
+    board_cards = parse_board(board)
+    if len(board_cards) != 5:
+        raise ValueError("河牌求解需要 5 张公共牌")
+    oop_weights = range_weights(oop_hands, dead_cards=board_cards)
+    ip_weights = range_weights(ip_hands, dead_cards=board_cards)
+    if not oop_weights.any() or not ip_weights.any():
+        raise ValueError("范围中没有与公共牌不冲突的组合")
+
+    config = TreeConfig(
+        pot=pot, stack=stack, oop_bet_sizes=oop_bet_sizes, ip_bet_sizes=ip_bet_sizes,
+        raise_sizes=raise_sizes, max_raises=max_raises, allin=allin,
+    )
+    started = time.perf_counter()
+    solver = RiverSolver(board_cards, oop_weights, ip_weights, config)
+    iterations, exploitability = solver.solve(max_iterations, target_exploitability)
+    elapsed = time.perf_counter() - started
+
+    result = solver.report(include_combos)
+    result.update({
+        "iterations": iterations,
+        "exploitability": round(exploitability, 4),
+        "decision_nodes": len(solver.nodes),
+        "elapsed_ms": round(elapsed * 1000, 1),
+    })
+    return result
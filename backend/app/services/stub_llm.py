@@ -0,0 +1,43 @@
+"""
+模拟 LLM
+不访问网络，按配置的首字延迟和逐字延迟返回固定回复，用于压测和本地联调
+"""
+from typing import AsyncIterator, List
+from langchain_core.messages import AIMessage, AIMessageChunk
+import asyncio
+import math
+
+# 回复的第一行与范围推荐要求的格式一致，便于解析手牌
+STUB_REPLY_HEAD = "【手牌】AA, KK, QQ, JJ, AKs, AQs, AKo\n"
+STUB_REPLY_BODY = "这是用于压测的模拟回复，内容与请求无关。"
+
+# 除第一块外每块的字符数
+STUB_CHUNK_CHARS = 4
+
+
+class StubChatModel:
+    """模拟聊天模型（实现 LLMService 用到的 ainvoke / astream）"""
+
+    def __init__(self, first_token_ms: int, token_ms: int, tokens: int):
+        self.first_token = first_token_ms / 1000
+        self.token_delay = token_ms / 1000
+        # 至少返回【手牌】行这一块
+        self.tokens = max(tokens, 1)
+
+    def _chunks(self) -> List[str]:
+        # 第一块是完整的【手牌】行，其余按每 4 个字符一块；
+        # 正文按需要的字符数重复（向上取整），tokens 再大每块也是满的
+        length = STUB_CHUNK_CHARS * (self.tokens - 1)
+        body = STUB_REPLY_BODY * math.ceil(length / len(STUB_REPLY_BODY))
+        return [STUB_REPLY_HEAD] + [body[i:i + STUB_CHUNK_CHARS] for i in range(0, length, STUB_CHUNK_CHARS)]
+
+    async def astream(self, messages: list) -> AsyncIterator[AIMessageChunk]:
+        await asyncio.sleep(self.first_token)
+        for index, chunk in enumerate(self._chunks()):
+            if index:
+                await asyncio.sleep(self.token_delay)
+            yield AIMessageChunk(content=chunk)
+
+    async def ainvoke(self, messages: list) -> AIMessage:
+        await asyncio.sleep(self.first_token + self.token_delay * (self.tokens - 1))
+        return AIMessage(content="".join(self._chunks()))
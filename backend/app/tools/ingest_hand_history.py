@@ -0,0 +1,45 @@
+"""
+手牌历史导入工具
+
+用法（在 backend 目录下运行）:
+    python -m app.tools.ingest_hand_history hands/*.txt --min-hands 30
+
+生成的文件可被 /range/observed/{player} 接口以及范围推荐直接使用
+"""
+from pathlib import Path
+import argparse
+import json
+import logging
+import time
+
+from ..config.settings import settings
+from ..services.hand_history import CHUNK_SIZE, build_ranges, ingest_files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="导入 PokerStars / GG 手牌历史，生成按玩家和位置的观察范围")
+    parser.add_argument("paths", nargs="+", help="手牌历史文本文件")
+    parser.add_argument("--output", default=settings.observed_ranges_file, help="输出 JSON 文件")
+    parser.add_argument("--min-hands", type=int, default=20, help="某个位置至少需要的手数")
+    parser.add_argument("--workers", type=int, default=settings.compute_workers or None, help="进程数")
+    parser.add_argument("--chunk-mb", type=int, default=CHUNK_SIZE // (1024 * 1024), help="每块大小（MB）")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    started = time.perf_counter()
+    stats = ingest_files(args.paths, workers=args.workers, chunk_size=args.chunk_mb * 1024 * 1024)
+    players = build_ranges(stats, min_hands=args.min_hands)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    temporary = output.with_suffix(".tmp")
+    with open(temporary, "w", encoding="utf-8") as handle:
+        json.dump({"sources": args.paths, "players": players}, handle, ensure_ascii=False)
+    temporary.replace(output)
+
+    elapsed = time.perf_counter() - started
+    logging.info(f"✅ {len(players)} 位玩家的观察范围已保存到 {output}（耗时 {elapsed:.1f}s）")
+
+
+if __name__ == "__main__":
+    main()
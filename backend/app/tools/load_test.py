@@ -0,0 +1,383 @@
+"""
+异步压测工具
+按场景配比并发请求聊天和范围接口，统计吞吐量、延迟分位数、首字延迟（TTFT）和事件循环延迟
+
+用法（在 backend 目录下运行）:
+    # 进程内压测（模拟 LLM，不访问网络）
+    python -m app.tools.load_test --stub --concurrency 200 --duration 30
+
+    # 压测本机已启动的服务（服务端需设置 AI_STUB_LLM=true 才不会调用真实模型）
+    python -m app.tools.load_test --url http://127.0.0.1:8000 --mix chat_stream=1
+
+进程内压测时应用和压测客户端在同一个事件循环中，事件循环延迟反映的就是应用本身；
+压测本机服务时只反映客户端的事件循环
+"""
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import httpx
+import numpy as np
+
+BTN_OPEN = [
+    "AA", "KK", "QQ", "JJ", "TT", "99", "88", "77", "66", "55", "44", "33", "22",
+    "AKs", "AQs", "AJs", "ATs", "A9s", "A8s", "A7s", "A6s", "A5s", "A4s", "A3s", "A2s",
+    "KQs", "KJs", "KTs", "K9s", "QJs", "QTs", "Q9s", "JTs", "J9s", "T9s", "98s", "87s", "76s", "65s",
+    "AKo", "AQo", "AJo", "ATo", "A9o", "KQo", "KJo", "KTo", "QJo", "QTo", "JTo",
+]
+BB_DEFEND = ["AA", "KK", "QQ", "JJ", "TT", "99", "AKs", "AQs", "AJs", "KQs", "AKo", "AQo"]
+
+DEFAULT_MIX = "chat_stream=4,analyze=1,recommend=2,equity=2"
+
+# 请求出错后等待的时间（秒），避免服务端持续出错时空转刷出大量错误
+ERROR_BACKOFF = 0.1
+
+
+class StreamingASGITransport(httpx.AsyncBaseTransport):
+    """
+    进程内 ASGI 传输（逐块返回响应体）
+
+    httpx 自带的 ASGITransport 会等整个响应结束后才返回，无法测量流式接口的首字延迟
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = b"".join([chunk async for chunk in request.stream])
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": request.method,
+            "headers": [(k.lower(), v) for (k, v) in request.headers.raw],
+            "scheme": request.url.scheme,
+            "path": request.url.path,
+            "raw_path": request.url.raw_path.split(b"?")[0],
+            "query_string": request.url.query,
+            "server": (request.url.host, request.url.port),
+            "client": ("127.0.0.1", 0),
+            "root_path": "",
+        }
+        loop = asyncio.get_running_loop()
+        started = loop.create_future()
+        chunks: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        request_sent = False
+
+        async def receive() -> dict:
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict):
+            if message["type"] == "http.response.start":
+                started.set_result(message)
+            elif message["type"] == "http.response.body":
+                chunks.put_nowait(message.get("body", b""))
+                if not message.get("more_body", False):
+                    chunks.put_nowait(None)
+
+        async def run():
+            try:
+                await self.app(scope, receive, send)
+            except Exception as e:
+                if not started.done():
+                    started.set_exception(e)
+            finally:
+                chunks.put_nowait(None)
+
+        task = asyncio.create_task(run())
+        message = await started
+        return httpx.Response(
+            message["status"],
+            headers=message.get("headers", []),
+            stream=_QueueStream(chunks, task, disconnected),
+        )
+
+
+class _QueueStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: asyncio.Queue, task: asyncio.Task, disconnected: asyncio.Event):
+        self.chunks = chunks
+        self.task = task
+        self.disconnected = disconnected
+
+    async def __aiter__(self):
+        while True:
+            chunk = await self.chunks.get()
+            if chunk is None:
+                return
+            if chunk:
+                yield chunk
+
+    async def aclose(self):
+        self.disconnected.set()
+        if not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+
+async def _first_event(response: httpx.Response, started: float, event_type: str) -> Optional[float]:
+    """读完 SSE 响应，返回第一个指定类型事件的到达时间（秒）"""
+    first = None
+    async for line in response.aiter_lines():
+        if first is None and line.startswith("data: "):
+            event = json.loads(line[6:])
+            if event.get("type") == "error":
+                raise RuntimeError(event.get("error"))
+            if event.get("type") == event_type:
+                first = time.perf_counter() - started
+    return first
+
+
+async def chat_stream(client: httpx.AsyncClient) -> Optional[float]:
+    """流式聊天，返回首字延迟"""
+    started = time.perf_counter()
+    payload = {
+        "message": "BTN 位置用 AJo 开池合理吗？",
+        "range_context": {"name": "BTN 开池", "hands": BTN_OPEN},
+    }
+    async with client.stream("POST", "/chat/stream", json=payload) as response:
+        response.raise_for_status()
+        return await _first_event(response, started, "content")
+
+
+async def analyze(client: httpx.AsyncClient) -> Optional[float]:
+    """范围分析（非流式，每次随机取 BTN 开池范围的子集，避免命中结果存储中的分析）"""
+    hands = random.sample(BTN_OPEN, random.randint(len(BTN_OPEN) // 2, len(BTN_OPEN)))
+    payload = {"range_name": "BTN 开池", "hands": hands, "position": "BTN", "scenario": "open"}
+    response = await client.post("/range/analyze", json=payload)
+    response.raise_for_status()
+    return None
+
+
+async def recommend(client: httpx.AsyncClient) -> Optional[float]:
+    """流式范围推荐，返回收到手牌事件的时间"""
+    started = time.perf_counter()
+    payload = {"position": "BTN", "scenario": "open", "stack_depth": "100bb"}
+    async with client.stream("POST", "/range/recommend/stream", json=payload) as response:
+        response.raise_for_status()
+        return await _first_event(response, started, "hands")
+
+
+async def equity(client: httpx.AsyncClient) -> Optional[float]:
+    """范围计算（多人底池胜率，在计算进程池中执行）"""
+    payload = {"ranges": [BTN_OPEN, BB_DEFEND], "target_std_error": 0.01}
+    response = await client.post("/range/multiway-equity", json=payload)
+    response.raise_for_status()
+    return None
+
+
+SCENARIOS: Dict[str, Callable[[httpx.AsyncClient], Awaitable[Optional[float]]]] = {
+    "chat_stream": chat_stream,
+    "analyze": analyze,
+    "recommend": recommend,
+    "equity": equity,
+}
+
+
+@dataclass
+class ScenarioStats:
+    """单个场景的统计"""
+    latencies: List[float] = field(default_factory=list)
+    ttft: List[float] = field(default_factory=list)
+    errors: int = 0
+    last_error: Optional[str] = None
+
+
+def parse_mix(text: str) -> List[Tuple[str, float]]:
+    """解析 "chat_stream=4,equity=1" 形式的场景配比"""
+    mix = []
+    for item in text.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"未知场景: {name}（可选: {', '.join(SCENARIOS)}）")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+async def _monitor_loop_lag(lags: List[float], stop: asyncio.Event, interval: float = 0.01):
+    """定时睡眠并记录实际唤醒的延迟"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def _user(
+    client: httpx.AsyncClient,
+    mix: List[Tuple[str, float]],
+    stats: Dict[str, ScenarioStats],
+    deadline: float,
+    rng: random.Random,
+):
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        entry = stats[name]
+        started = time.perf_counter()
+        try:
+            ttft = await SCENARIOS[name](client)
+        except Exception as e:
+            entry.errors += 1
+            entry.last_error = f"{type(e).__name__}: {e}"
+            await asyncio.sleep(ERROR_BACKOFF)
+            continue
+        entry.latencies.append(time.perf_counter() - started)
+        if ttft is not None:
+            entry.ttft.append(ttft)
+
+
+async def run_load_test(
+    client: httpx.AsyncClient,
+    mix: List[Tuple[str, float]],
+    concurrency: int,
+    duration: float,
+    seed: int = 0,
+) -> dict:
+    """
+    运行压测
+
+    Args:
+        client: 指向被测应用的 HTTP 客户端
+        mix: 场景配比
+        concurrency: 并发用户数
+        duration: 持续时间（秒）
+        seed: 场景选择的随机种子
+
+    Returns:
+        统计报告
+    """
+    stats = {name: ScenarioStats() for name, _ in mix}
+    lags: List[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_loop_lag(lags, stop))
+
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*[
+        _user(client, mix, stats, deadline, random.Random(seed + index))
+        for index in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor
+
+    return build_report(stats, lags, elapsed, concurrency)
+
+
+def _percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    p50, p90, p99 = np.percentile(values, [50, 90, 99]) * 1000
+    return {"p50": round(p50, 1), "p90": round(p90, 1), "p99": round(p99, 1), "max": round(max(values) * 1000, 1)}
+
+
+def build_report(stats: Dict[str, ScenarioStats], lags: List[float], elapsed: float, concurrency: int) -> dict:
+    """汇总统计（时间单位：毫秒）"""
+    completed = sum(len(entry.latencies) for entry in stats.values())
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": completed,
+        "throughput_rps": round(completed / elapsed, 2),
+        "scenarios": {
+            name: {
+                "requests": len(entry.latencies),
+                "errors": entry.errors,
+                "throughput_rps": round(len(entry.latencies) / elapsed, 2),
+                "latency_ms": _percentiles(entry.latencies),
+                "ttft_ms": _percentiles(entry.ttft),
+                "last_error": entry.last_error,
+            }
+            for name, entry in stats.items()
+        },
+        "event_loop_lag_ms": _percentiles(lags),
+    }
+
+
+def print_report(report: dict):
+    """以表格形式打印报告"""
+    def fmt(values: Optional[Dict[str, float]]) -> str:
+        return f"{values['p50']:>8.1f} {values['p99']:>8.1f}" if values else f"{'-':>8} {'-':>8}"
+
+    print(f"\n并发 {report['concurrency']}，持续 {report['duration_s']}s，"
+          f"完成 {report['requests']} 个请求，吞吐量 {report['throughput_rps']} req/s\n")
+    print(f"{'场景':<12} {'请求':>7} {'错误':>6} {'req/s':>8} {'延迟p50':>8} {'延迟p99':>8} {'首字p50':>8} {'首字p99':>8}")
+    for name, entry in report["scenarios"].items():
+        print(f"{name:<12} {entry['requests']:>7} {entry['errors']:>6} {entry['throughput_rps']:>8} "
+              f"{fmt(entry['latency_ms'])} {fmt(entry['ttft_ms'])}")
+        if entry["last_error"]:
+            print(f"    最近的错误: {entry['last_error']}")
+    lag = report["event_loop_lag_ms"]
+    if lag:
+        print(f"\n事件循环延迟 (ms): p50 {lag['p50']}  p99 {lag['p99']}  max {lag['max']}")
+
+
+async def _main(args):
+    mix = parse_mix(args.mix)
+    if args.url:
+        client = httpx.AsyncClient(
+            base_url=args.url,
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency),
+        )
+    else:
+        # 进程内：先设置环境变量再导入应用，保证 Settings 读到模拟 LLM 配置
+        if args.stub:
+            os.environ["AI_STUB_LLM"] = "true"
+        from ..main import app
+        # 应用的逐请求日志会显著拖慢事件循环，压测时默认只保留警告
+        logging.getLogger().setLevel(args.log_level)
+        client = httpx.AsyncClient(transport=StreamingASGITransport(app), base_url="http://testserver", timeout=args.timeout)
+
+    try:
+        # 预热：触发计算进程池启动、翻前胜率表加载等一次性开销
+        for name, _ in mix:
+            try:
+                await SCENARIOS[name](client)
+            except Exception as e:
+                print(f"⚠️  预热 {name} 失败: {e}")
+        report = await run_load_test(client, mix, args.concurrency, args.duration, args.seed)
+    finally:
+        await client.aclose()
+        if not args.url:
+            from ..services import compute_pool
+            compute_pool.shutdown()
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="聊天和范围接口的异步压测")
+    parser.add_argument("--url", help="被测服务地址（不指定时在进程内压测）")
+    parser.add_argument("--stub", action="store_true", help="进程内压测时使用模拟 LLM")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"场景配比（默认 {DEFAULT_MIX}）")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发用户数")
+    parser.add_argument("--duration", type=float, default=20.0, help="持续时间（秒）")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单个请求超时（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="场景选择的随机种子")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出报告")
+    parser.add_argument("--log-level", default="WARNING", help="进程内压测时应用的日志级别")
+    args = parser.parse_args(argv)
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+WebSocket 聊天的流量控制和按对话取消
+
+运行：cd backend && python -m pytest tests
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config.settings import settings
+from app.main import app
+from app.routes.chat import conversations
+from app.services.llm_service import llm_service
+from app.services.poker_agent import poker_agent
+
+
+class FakeAgent:
+    """按消息内容产出固定的文本块；"slow" 产出一块后一直等待，直到被取消"""
+
+    def __init__(self, chunks: int):
+        self.chunks = chunks
+        self.consumed = 0
+
+    async def chat_stream(self, message: str, conversation_history=None, range_context=None):
+        if message == "slow":
+            yield "x"
+            await asyncio.sleep(60)
+        for _ in range(self.chunks):
+            self.consumed += 1
+            yield "x"
+            await asyncio.sleep(0)
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    fake = FakeAgent(chunks=10)
+    monkeypatch.setattr(llm_service, "llm", object())
+    monkeypatch.setattr(poker_agent, "chat_stream", fake.chat_stream)
+    yield fake
+    conversations.clear()
+
+
+def start(ws, message: str, ref: str) -> str:
+    ws.send_json({"type": "chat", "ref": ref, "message": message})
+    frame = ws.receive_json()
+    assert frame["type"] == "conversation_id" and frame["ref"] == ref
+    return frame["conversation_id"]
+
+
+def receive_until_done(ws) -> list:
+    frames = []
+    while not frames or frames[-1]["type"] != "done":
+        frames.append(ws.receive_json())
+    return frames
+
+
+def test_zero_credit_merges_buffered_chunks_into_one_frame(agent, monkeypatch):
+    monkeypatch.setattr(settings, "ws_initial_credit", 2)
+
+    with TestClient(app).websocket_connect("/chat/ws") as ws:
+        conversation_id = start(ws, "hi", "a")
+        first = [ws.receive_json() for _ in range(2)]
+        assert [(f["seq"], f["content"]) for f in first] == [(0, "x"), (1, "x")]
+
+        # 额度用完后剩下的 8 块在服务端缓冲，追加 1 个额度后合并成一帧发出
+        ws.send_json({"type": "credit", "conversation_id": conversation_id, "chunks": 1})
+        frames = receive_until_done(ws)
+
+    assert [(f["type"], f.get("seq"), f.get("content")) for f in frames[:-1]] == [("content", 2, "x" * 8)]
+    assert conversations[conversation_id][-1] == {"role": "assistant", "content": "x" * 10}
+
+
+def test_full_pending_buffer_stops_reading_the_model(agent, monkeypatch):
+    monkeypatch.setattr(settings, "ws_initial_credit", 1)
+    monkeypatch.setattr(settings, "ws_max_pending_chars", 5)
+    agent.chunks = 100
+
+    with TestClient(app).websocket_connect("/chat/ws") as ws:
+        conversation_id = start(ws, "hi", "a")
+        assert ws.receive_json()["content"] == "x"
+
+        # 第 1 块已发出，缓冲 5 块后暂停读取
+        time.sleep(0.3)
+        assert agent.consumed == 6
+
+        ws.send_json({"type": "credit", "conversation_id": conversation_id, "chunks": 1000})
+        frames = receive_until_done(ws)
+
+    contents = [f for f in frames if f["type"] == "content"]
+    assert contents[0]["content"] == "x" * 5
+    assert [f["seq"] for f in contents] == list(range(1, len(contents) + 1))
+    assert 1 + sum(len(f["content"]) for f in contents) == 100
+    assert agent.consumed == 100
+
+
+def test_cancel_only_stops_that_conversation(agent):
+    with TestClient(app).websocket_connect("/chat/ws") as ws:
+        ws.send_json({"type": "chat", "ref": "a", "message": "slow"})
+        ws.send_json({"type": "chat", "ref": "b", "message": "slow"})
+        # 两个对话的帧交错到达：各自的 conversation_id 和第一块内容
+        frames = [ws.receive_json() for _ in range(4)]
+        ids = {f["ref"]: f["conversation_id"] for f in frames if f["type"] == "conversation_id"}
+        first, second = ids["a"], ids["b"]
+        assert {f["conversation_id"] for f in frames if f["type"] == "content"} == {first, second}
+
+        ws.send_json({"type": "cancel", "conversation_id": first})
+        assert ws.receive_json() == {"type": "cancelled", "conversation_id": first}
+
+        # 第一个对话已经结束，第二个仍在进行
+        ws.send_json({"type": "cancel", "conversation_id": first})
+        assert ws.receive_json()["error"] == "对话没有正在进行的回复"
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
+        ws.send_json({"type": "cancel", "conversation_id": second})
+        assert ws.receive_json() == {"type": "cancelled", "conversation_id": second}
+
+    # 被取消的回合不写入对话历史
+    assert first not in conversations and second not in conversations
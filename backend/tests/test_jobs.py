@@ -0,0 +1,64 @@
+"""
+异步作业的进程退出和按用户信号量
+
+运行：cd backend && python -m pytest tests
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.jobs import FAILED, RUNNING, JobService, job_service
+
+QUICK_SWEEP = {"players": 2, "ante": 0.0, "min_stack": 5.0, "max_stack": 6.0, "step": 1.0}
+SLOW_SWEEP = {"players": 9, "ante": 0.0, "min_stack": 5.0, "max_stack": 25.0, "step": 1.0}
+
+
+async def wait_for(condition, timeout: float = 60.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.02)
+
+
+def test_killed_process_reports_exit_code():
+    async def scenario():
+        service = JobService()
+        job = service.submit("alice", "push_fold_sweep", SLOW_SWEEP)
+        await wait_for(lambda: job.status == RUNNING)
+        job.process.kill()
+        await job.task
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == FAILED
+    assert job.error == "作业进程异常退出（退出码 -9）"
+
+
+def test_idle_user_semaphore_is_removed():
+    async def scenario():
+        service = JobService()
+        jobs = [service.submit(user, "push_fold_sweep", QUICK_SWEEP) for user in ("alice", "alice", "alice", "bob")]
+        await asyncio.sleep(0)
+        assert set(service._semaphores) == {"alice", "bob"}
+        await asyncio.gather(*[job.task for job in jobs])
+        return service, jobs
+
+    service, jobs = asyncio.run(scenario())
+    assert all(job.result is not None for job in jobs)
+    assert service._semaphores == {}
+
+
+@pytest.mark.parametrize("params, message", [
+    ({"min_stack": 10, "max_stack": 5}, "最大筹码深度不能小于最小筹码深度"),
+    ({"min_stack": 1, "max_stack": 100, "step": 0.5}, "一次最多扫描 100 个筹码深度"),
+])
+def test_invalid_push_fold_sweep_job_is_rejected(params, message):
+    client = TestClient(app)
+
+    response = client.post("/range/jobs", json={"kind": "push_fold_sweep", "params": params})
+
+    assert response.status_code == 422
+    assert message in response.json()["detail"][0]["msg"]
+    assert job_service.jobs == {}
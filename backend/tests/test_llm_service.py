@@ -0,0 +1,288 @@
+"""
+多提供商对冲的首字延迟统计和提供商顺序，以及对两个本地 OpenAI 兼容服务的对冲、取消和切换
+
+运行：cd backend && python -m pytest tests
+"""
+from typing import List, Optional
+import asyncio
+import json
+import re
+import threading
+import time
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from app.config.settings import settings
+from app.services.llm_service import LLMProvider, LLMService, MIN_LATENCY_SAMPLES
+
+
+class FixedLatencyModel:
+    """首字延迟固定的模拟模型"""
+
+    def __init__(self, first_token_ms: int):
+        self.first_token = first_token_ms / 1000
+
+    async def astream(self, messages: list):
+        await asyncio.sleep(self.first_token)
+        yield AIMessageChunk(content="ok")
+
+
+def make_service(*providers: LLMProvider) -> LLMService:
+    service = LLMService()
+    service.providers = list(providers)
+    service.llm = service.providers[0].llm
+    return service
+
+
+async def run_races(service: LLMService, count: int) -> list:
+    """依次执行 count 次请求，返回每次请求前的首选提供商"""
+    primaries = []
+    for _ in range(count):
+        primaries.append(service._ordered_providers()[0].name)
+        assert "".join([chunk async for chunk in service._race([])]) == "ok"
+    return primaries
+
+
+def test_losing_hedge_does_not_become_primary(monkeypatch):
+    # 快的提供商首字也超过初始对冲等待时间，每次都会对冲慢的提供商，慢的提供商每次都落败
+    monkeypatch.setattr(settings, "ai_hedge_initial_delay_ms", 20)
+    fast = LLMProvider("fast", FixedLatencyModel(40))
+    slow = LLMProvider("slow", FixedLatencyModel(300))
+    service = make_service(fast, slow)
+
+    primaries = asyncio.run(run_races(service, MIN_LATENCY_SAMPLES + 10))
+
+    assert set(primaries) == {"fast"}
+    assert len(fast.latencies) == MIN_LATENCY_SAMPLES + 10
+    assert len(slow.latencies) == 0
+
+
+def test_faster_hedge_takes_over_and_stays_primary(monkeypatch):
+    # 首选的提供商较慢：对冲的快提供商每次胜出，有足够样本后成为首选并保持不变
+    monkeypatch.setattr(settings, "ai_hedge_initial_delay_ms", 20)
+    slow = LLMProvider("slow", FixedLatencyModel(300))
+    fast = LLMProvider("fast", FixedLatencyModel(40))
+    service = make_service(slow, fast)
+
+    primaries = asyncio.run(run_races(service, MIN_LATENCY_SAMPLES + 10))
+
+    assert primaries[:MIN_LATENCY_SAMPLES] == ["slow"] * MIN_LATENCY_SAMPLES
+    assert primaries[MIN_LATENCY_SAMPLES:] == ["fast"] * 10
+    assert len(slow.latencies) == 0
+    assert min(fast.latencies) >= 0.04
+
+
+class StubOpenAIServer:
+    """
+    本地 OpenAI 兼容的流式聊天服务（在后台线程的事件循环中运行）
+
+    不区分路径，Azure 和 OpenAI 客户端都可以指向它；支持长连接和分块传输，
+    等待首字期间客户端断开连接记为一次取消
+    """
+
+    def __init__(self, reply: str):
+        self.reply = reply
+        self.first_token_ms = 0
+        self.status = 200
+        self.paths: List[str] = []
+        self.arrivals: List[float] = []
+        self.connections = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.port: Optional[int] = None
+        self._handlers = set()
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "StubOpenAIServer":
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _shutdown(self):
+        self._server.close()
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    async def _pause(self, reader: asyncio.StreamReader, seconds: float) -> bool:
+        """等待一段时间，期间客户端断开连接时返回 False"""
+        try:
+            return bool(await asyncio.wait_for(reader.read(1), seconds))
+        except asyncio.TimeoutError:
+            return True
+
+    @staticmethod
+    def _event(writer: asyncio.StreamWriter, payload):
+        data = f"data: {payload if isinstance(payload, str) else json.dumps(payload)}\n\n".encode()
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    @staticmethod
+    def _chunk(content: str, finish_reason: Optional[str] = None) -> dict:
+        return {
+            "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+            "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": finish_reason}],
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._handlers.add(asyncio.current_task())
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = re.search(rb"content-length:\s*(\d+)", head, re.IGNORECASE)
+                await reader.readexactly(int(length.group(1)) if length else 0)
+                self.paths.append(head.split(b" ")[1].decode())
+                self.arrivals.append(time.monotonic())
+
+                if self.status != 200:
+                    body = json.dumps({"error": {"message": "stub failure", "type": "server_error"}}).encode()
+                    writer.write(
+                        b"HTTP/1.1 %d Error\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s"
+                        % (self.status, len(body), body)
+                    )
+                    await writer.drain()
+                    continue
+
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n")
+                await writer.drain()
+                if not await self._pause(reader, self.first_token_ms / 1000):
+                    self.cancelled += 1
+                    return
+                for content in self.reply.split(" "):
+                    self._event(writer, self._chunk(content + " "))
+                    await writer.drain()
+                self._event(writer, self._chunk("", "stop"))
+                self._event(writer, "[DONE]")
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+                self.completed += 1
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+
+@pytest.fixture
+def stub_providers(monkeypatch):
+    """启动两个本地服务，Azure OpenAI 和 OpenAI 分别指向它们，开启多提供商模式"""
+    azure = StubOpenAIServer("Azure 的 回复").start()
+    openai = StubOpenAIServer("OpenAI 的 回复").start()
+    monkeypatch.setattr(settings, "ai_stub_llm", False)
+    monkeypatch.setattr(settings, "ai_multi_provider", True)
+    monkeypatch.setattr(settings, "azure_openai_endpoint", azure.url)
+    monkeypatch.setattr(settings, "azure_openai_api_key", "test-key")
+    monkeypatch.setattr(settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(settings, "openai_base_url", f"{openai.url}/v1")
+    yield azure, openai
+    azure.stop()
+    openai.stop()
+
+
+async def eventually(condition, timeout: float = 2.0):
+    """等待后台线程中的服务状态满足条件"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_stub_servers_share_one_connection_pool(stub_providers):
+    azure, openai = stub_providers
+
+    async def scenario():
+        service = LLMService()
+        try:
+            assert [p.name for p in service.providers] == ["Azure OpenAI", "OpenAI"]
+            assert all(p.llm.http_async_client is service.http_client for p in service.providers)
+            for _ in range(3):
+                assert await service.complete("你好") == "Azure 的 回复 "
+        finally:
+            await service.aclose()
+
+    asyncio.run(scenario())
+    assert azure.paths[0].startswith("/openai/deployments/")
+    # 完整读完的响应把连接放回连接池，后续请求复用同一个连接
+    assert azure.completed == 3 and azure.connections == 1
+    assert openai.arrivals == []
+
+
+def test_hedge_fires_after_p95_and_cancels_slower_connection(stub_providers, monkeypatch):
+    azure, openai = stub_providers
+    monkeypatch.setattr(settings, "ai_hedge_quantile", 0.95)
+    openai.first_token_ms = 30
+
+    async def scenario():
+        service = LLMService()
+        try:
+            primary = service.providers[0]
+            # 首选提供商的首字延迟 p95 为 100ms
+            for _ in range(MIN_LATENCY_SAMPLES):
+                primary.record_latency(0.1)
+            assert primary.hedge_delay() == pytest.approx(0.1)
+
+            # 首字早于 p95：不对冲
+            azure.first_token_ms = 20
+            assert await service.complete("你好") == "Azure 的 回复 "
+            assert openai.arrivals == []
+
+            # 首字晚于 p95：p95 后对冲，另一个提供商先返回首字，首选提供商的连接被断开
+            azure.first_token_ms = 1000
+            started = time.monotonic()
+            assert await service.complete("你好") == "OpenAI 的 回复 "
+            assert time.monotonic() - started < 0.5
+            await eventually(lambda: azure.cancelled == 1)
+            return primary, service.providers[1]
+        finally:
+            await service.aclose()
+
+    primary, secondary = asyncio.run(scenario())
+    hedge_after = openai.arrivals[0] - azure.arrivals[1]
+    assert 0.09 <= hedge_after < 0.3
+    assert azure.completed == 1 and azure.cancelled == 1
+    assert openai.completed == 1
+    # 落败的请求不记录首字延迟
+    assert len(primary.latencies) == MIN_LATENCY_SAMPLES + 1
+    assert len(secondary.latencies) == 1
+
+
+def test_server_error_fails_over_to_secondary(stub_providers):
+    azure, openai = stub_providers
+    azure.status = 500
+
+    async def scenario():
+        service = LLMService()
+        try:
+            assert await service.complete("你好") == "OpenAI 的 回复 "
+            # 出错的提供商进入冷却，之后不再作为首选
+            assert not service.providers[0].healthy
+            assert service._ordered_providers()[0].name == "OpenAI"
+            assert await service.complete("你好") == "OpenAI 的 回复 "
+        finally:
+            await service.aclose()
+
+    asyncio.run(scenario())
+    assert len(azure.arrivals) == 1
+    # 出错后立即切换，不等待对冲时间（初始对冲等待 2 秒）
+    assert openai.arrivals[0] - azure.arrivals[0] < 0.5
+    assert openai.completed == 2
@@ -0,0 +1,39 @@
+"""
+剖析接口的访问控制
+
+运行：cd backend && python -m pytest tests
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config.settings import settings
+from app.main import app
+
+ENDPOINTS = [("get", "/admin/profiling/profiles"), ("post", "/admin/profiling/sample?seconds=0.05")]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "profiling_enabled", True)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("method, path", ENDPOINTS)
+def test_disabled_profiling_is_not_found(client, monkeypatch, method, path):
+    monkeypatch.setattr(settings, "profiling_enabled", False)
+    assert client.request(method, path).status_code == 404
+
+
+@pytest.mark.parametrize("method, path", ENDPOINTS)
+def test_enabled_profiling_without_token_rejects_everyone(client, monkeypatch, method, path):
+    monkeypatch.setattr(settings, "profiling_admin_token", "")
+    assert client.request(method, path).status_code == 403
+    assert client.request(method, path, headers={"X-Admin-Token": ""}).status_code == 403
+
+
+@pytest.mark.parametrize("method, path", ENDPOINTS)
+def test_admin_token_is_required(client, monkeypatch, method, path):
+    monkeypatch.setattr(settings, "profiling_admin_token", "secret")
+    assert client.request(method, path).status_code == 403
+    assert client.request(method, path, headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.request(method, path, headers={"X-Admin-Token": "secret"}).status_code == 200
@@ -0,0 +1,63 @@
+"""
+全下/弃牌均衡求解的收敛
+
+运行：cd backend && python -m pytest tests
+"""
+import asyncio
+
+import pytest
+
+from app.models.schemas import RangeRecommendationRequest
+from app.routes.range import get_push_fold_reference
+from app.services import compute_pool
+from app.services.push_fold import seat_index, solve_push_fold
+
+
+@pytest.mark.parametrize("players", [2, 6])
+@pytest.mark.parametrize("stack_depth", [2.0, 5.0, 10.0, 12.0, 15.0, 20.0, 25.0])
+def test_converges_within_iteration_cap(players, stack_depth):
+    result = solve_push_fold(stack_depth, players=players)
+
+    assert result["converged"]
+    assert result["exploitability"] <= 1e-3
+    assert result["iterations"] < 2000
+
+
+def test_heads_up_chart():
+    result = solve_push_fold(10.0)
+    sb = result["seats"][0]
+
+    assert sb["position"] == "SB"
+    assert 55 < sb["push"]["percent"] < 60
+    assert 35 < sb["calls"]["BB"]["percent"] < 40
+    assert {"AA", "KK", "AKs"} <= set(sb["push"]["hands"])
+    assert "72o" not in sb["calls"]["BB"]["hands"]
+
+
+@pytest.mark.parametrize("position, players, seat", [
+    ("UTG", 6, 0),
+    ("utg", 9, 0),
+    ("UTG+1", 6, 1),
+    ("MP", 6, 1),
+    ("LJ", 6, 0),
+    ("HJ", 6, 1),
+    ("UTG+2", 7, 2),
+    ("BU", 6, 3),
+    ("SB", 2, 0),
+    ("UTG", 2, None),
+    ("UTG+2", 6, None),
+    ("LJ", 5, None),
+])
+def test_seat_index_maps_aliases_relative_to_table_size(position, players, seat):
+    assert seat_index(position, players) == seat
+
+
+def test_recommendation_reference_for_utg_at_six_max():
+    request = RangeRecommendationRequest(position="UTG", scenario="open", stack_depth="10bb", table_size=6)
+    try:
+        reference = asyncio.run(get_push_fold_reference(request))
+    finally:
+        compute_pool.shutdown()
+
+    assert "6 人桌，10bb" in reference
+    assert "AA" in reference
@@ -0,0 +1,44 @@
+"""
+范围推荐接口在 AI 提供商出错时的响应
+
+运行：cd backend && python -m pytest tests
+"""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.llm_service import llm_service
+
+REQUEST = {"position": "BTN", "scenario": "open"}
+
+
+@pytest.fixture
+def failing_llm(monkeypatch):
+    """AI 服务可用，但每次请求提供商都出错"""
+    async def complete(*args, **kwargs):
+        raise RuntimeError("provider down")
+
+    async def complete_stream(*args, **kwargs):
+        raise RuntimeError("provider down")
+        yield
+
+    monkeypatch.setattr(llm_service, "llm", object())
+    monkeypatch.setattr(llm_service, "complete", complete)
+    monkeypatch.setattr(llm_service, "complete_stream", complete_stream)
+
+
+def test_recommend_returns_502_when_provider_fails(failing_llm):
+    response = TestClient(app).post("/range/recommend", json=REQUEST)
+
+    assert response.status_code == 502
+    assert response.json()["detail"] == "AI 服务请求失败: provider down"
+
+
+def test_recommend_stream_ends_with_error_event_when_provider_fails(failing_llm):
+    response = TestClient(app).post("/range/recommend/stream", json=REQUEST)
+
+    events = [json.loads(line[6:]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert [event["type"] for event in events] == ["error"]
+    assert events[0]["error"] == "provider down"
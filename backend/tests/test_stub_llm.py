@@ -0,0 +1,45 @@
+"""
+模拟 LLM 的回复块数和逐字延迟
+
+运行：cd backend && python -m pytest tests
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.stub_llm import StubChatModel
+
+
+@pytest.mark.parametrize("tokens", [1, 2, 6, 50, 500, 5000])
+def test_stub_yields_configured_number_of_non_empty_chunks(tokens):
+    model = StubChatModel(first_token_ms=0, token_ms=0, tokens=tokens)
+
+    async def collect():
+        return [chunk.content async for chunk in model.astream([])]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) == tokens
+    assert all(chunks)
+    assert all(len(chunk) == 4 for chunk in chunks[1:])
+    assert chunks[0].startswith("【手牌】")
+
+
+def test_stub_honors_per_token_delay():
+    model = StubChatModel(first_token_ms=0, token_ms=5, tokens=50)
+
+    async def collect():
+        return [chunk.content async for chunk in model.astream([])]
+
+    started = time.monotonic()
+    chunks = asyncio.run(collect())
+    assert len(chunks) == 50
+    assert time.monotonic() - started >= 49 * 0.005
+
+
+@pytest.mark.parametrize("tokens", [0, -3])
+def test_stub_returns_at_least_the_hand_line(tokens):
+    model = StubChatModel(first_token_ms=0, token_ms=0, tokens=tokens)
+
+    reply = asyncio.run(model.ainvoke([])).content
+    assert reply.startswith("【手牌】") and reply.endswith("\n")
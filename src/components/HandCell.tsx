@@ -5,6 +5,7 @@ interface HandCellProps {
   hand: Hand;
   isSelected: boolean;
   isHovered: boolean;
+  equity?: number;
   onMouseDown: () => void;
   onMouseEnter: () => void;
   onMouseUp: () => void;
@@ -17,6 +18,7 @@ export const HandCell: React.FC<HandCellProps> = ({
   hand,
   isSelected,
   isHovered,
+  equity,
   onMouseDown,
   onMouseEnter,
   onMouseUp,
@@ -31,6 +33,12 @@ export const HandCell: React.FC<HandCellProps> = ({
     return 'bg-green-50';
   };
 
+  // 有胜率热力图时按胜率着色（0% 红 -> 100% 绿），与公共牌冲突的类别为 NaN，保持默认颜色
+  const hasEquity = equity !== undefined && !Number.isNaN(equity);
+  const heatStyle = hasEquity && !isSelected
+    ? { backgroundColor: `hsl(${Math.round(equity * 120)}, 70%, 80%)` }
+    : undefined;
+
   // 根据状态设置样式
   const getCellStyle = () => {
     const baseClasses = 'relative flex items-center justify-center text-xs sm:text-sm font-semibold border border-gray-300 cursor-pointer transition-colors select-none touch-manipulation';
@@ -41,15 +49,16 @@ export const HandCell: React.FC<HandCellProps> = ({
     }
     
     if (isHovered) {
-      return `${baseClasses} ${sizeClasses} ${getBaseColor()} opacity-70 border-blue-400`;
+      return `${baseClasses} ${sizeClasses} ${hasEquity ? '' : getBaseColor()} opacity-70 border-blue-400`;
     }
     
-    return `${baseClasses} ${sizeClasses} ${getBaseColor()} text-gray-800 hover:opacity-80`;
+    return `${baseClasses} ${sizeClasses} ${hasEquity ? '' : getBaseColor()} text-gray-800 hover:opacity-80`;
   };
 
   return (
     <div
       className={getCellStyle()}
+      style={heatStyle}
       onMouseDown={onMouseDown}
       onMouseEnter={onMouseEnter}
       onMouseUp={onMouseUp}
@@ -57,6 +66,7 @@ export const HandCell: React.FC<HandCellProps> = ({
       onTouchMove={onTouchMove}
       onTouchEnd={onTouchEnd}
       data-hand={hand.name}
+      title={hasEquity ? `${hand.name}: ${(equity * 100).toFixed(1)}%` : undefined}
     >
       <span className="pointer-events-none">{hand.name}</span>
     </div>
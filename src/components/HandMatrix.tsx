@@ -7,12 +7,15 @@ interface HandMatrixProps {
   hands: Hand[];
   selectedHands: Set<string>;
   onSelectionChange: (selectedHands: Set<string>) => void;
+  // 169 个类别的胜率（行优先，与矩阵顺序一致），用于热力图着色
+  equities?: Float32Array | null;
 }
 
 export const HandMatrix: React.FC<HandMatrixProps> = ({
   hands,
   selectedHands,
-  onSelectionChange
+  onSelectionChange,
+  equities
 }) => {
   const [isDragging, setIsDragging] = useState(false);
   const [dragMode, setDragMode] = useState<'select' | 'deselect'>('select');
@@ -148,12 +151,13 @@ export const HandMatrix: React.FC<HandMatrixProps> = ({
             </div>
             
             {/* 手牌单元格 */}
-            {row.map((hand) => (
+            {row.map((hand, j) => (
               <HandCell
                 key={hand.name}
                 hand={hand}
                 isSelected={selectedHands.has(hand.name)}
                 isHovered={hoveredHand === hand.name}
+                equity={equities ? equities[i * 13 + j] : undefined}
                 onMouseDown={() => handleMouseDown(hand.name)}
                 onMouseEnter={() => handleMouseEnter(hand.name)}
                 onMouseUp={handleMouseUp}
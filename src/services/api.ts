@@ -28,18 +28,73 @@ export interface RangeAnalysisRequest {
   scenario?: string;
 }
 
+export interface EquityDistributionStats {
+  mean: number;
+  std: number;
+  p10: number;
+  p25: number;
+  median: number;
+  p75: number;
+  p90: number;
+  strong_share: number;
+  weak_share: number;
+  shape: string;
+}
+
+export interface EquityDistributionRequest {
+  hero_hands: string[];
+  villain_hands: string[];
+  board?: string;
+  bins?: number;
+  samples?: number;
+}
+
+export interface EquityDistributionResponse {
+  equity: number;
+  combos: string[];
+  equities: number[];
+  histogram: number[];
+  bin_edges: number[];
+  stats: EquityDistributionStats | null;
+  elapsed_ms: number;
+}
+
+export interface RangeMetrics {
+  total_combinations: number;
+  tightness_percentile: number;
+  tightness: string;
+  pair_share: number;
+  suited_share: number;
+  offsuit_share: number;
+  broadway_share: number;
+  blockers: Record<string, number>;
+  top_range_overlap: number | null;
+  equity: {
+    vs_random: number;
+    strongest: string;
+    strongest_equity: number;
+    weakest: string;
+    weakest_equity: number;
+    below_half_share: number;
+  } | null;
+  distribution: EquityDistributionStats | null;
+}
+
 export interface RangeAnalysisResponse {
   analysis: string;
   suggestions: string[];
   probability: number;
   total_combinations: number;
+  metrics?: RangeMetrics;
 }
 
 export interface RangeRecommendationRequest {
   position: string;
   scenario: string;
   opponent_style?: string;
+  opponent_name?: string;
   stack_depth?: string;
+  table_size?: number;
 }
 
 export interface RangeRecommendationResponse {
@@ -48,6 +103,46 @@ export interface RangeRecommendationResponse {
   probability: number;
 }
 
+export interface LibraryRangeCreate {
+  name: string;
+  hands: string[];
+  position?: string;
+  scenario?: string;
+  tags?: string[];
+}
+
+export interface LibraryRange {
+  id: string;
+  name: string;
+  hands: string[];
+  position: string | null;
+  scenario: string | null;
+  tags: string[];
+  total_combinations: number;
+  created_at: string;
+}
+
+export interface LibraryListResponse {
+  total: number;
+  ranges: LibraryRange[];
+}
+
+export interface LibrarySearchRequest {
+  hands?: string[];
+  range_id?: string;
+  metric?: 'jaccard' | 'equity';
+  position?: string;
+  scenario?: string;
+  tags?: string[];
+  limit?: number;
+}
+
+export interface LibrarySearchResponse {
+  metric: string;
+  matches: { range: LibraryRange; similarity: number }[];
+  elapsed_ms: number;
+}
+
 export interface HealthResponse {
   status: string;
   ai_enabled: boolean;
@@ -115,6 +210,113 @@ class APIService {
       throw new Error('流式聊天请求失败');
     }
 
+    yield* this.readEvents(response);
+  }
+
+  /**
+   * 分析手牌范围
+   */
+  async analyzeRange(request: RangeAnalysisRequest): Promise<RangeAnalysisResponse> {
+    const response = await fetch(`${this.baseURL}/range/analyze`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(request),
+    });
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.detail || '范围分析失败');
+    }
+
+    return response.json();
+  }
+
+  /**
+   * 分析手牌范围（两阶段流式）
+   * 先立即收到 metrics 事件（不依赖 AI），之后是 AI 分析的 content 事件和 suggestions 事件；
+   * AI 不可用或繁忙时收到 narrative_unavailable 事件
+   */
+  async *analyzeRangeStream(request: RangeAnalysisRequest): AsyncGenerator<{
+    type: 'metrics' | 'content' | 'suggestions' | 'narrative_unavailable' | 'done' | 'error';
+    total_combinations?: number;
+    probability?: number;
+    metrics?: RangeMetrics;
+    content?: string;
+    suggestions?: string[];
+    reason?: string;
+    timestamp?: string;
+    error?: string;
+  }> {
+    const response = await fetch(`${this.baseURL}/range/analyze/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(request),
+    });
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.detail || '流式范围分析请求失败');
+    }
+
+    yield* this.readEvents(response);
+  }
+
+  /**
+   * 推荐手牌范围
+   */
+  async recommendRange(request: RangeRecommendationRequest): Promise<RangeRecommendationResponse> {
+    const response = await fetch(`${this.baseURL}/range/recommend`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(request),
+    });
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.detail || '范围推荐失败');
+    }
+
+    return response.json();
+  }
+
+  /**
+   * 推荐手牌范围（流式）
+   * 【手牌】行完成后立即收到 hands 事件，之后是推荐理由的 content 事件
+   */
+  async *recommendRangeStream(request: RangeRecommendationRequest): AsyncGenerator<{
+    type: 'hands' | 'content' | 'done' | 'error';
+    hands?: string[];
+    total_combinations?: number;
+    probability?: number;
+    content?: string;
+    timestamp?: string;
+    error?: string;
+  }> {
+    const response = await fetch(`${this.baseURL}/range/recommend/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(request),
+    });
+
+    if (!response.ok) {
+      throw new Error('流式范围推荐请求失败');
+    }
+
+    yield* this.readEvents(response);
+  }
+
+  /**
+   * 逐条读取 SSE 事件
+   */
+  private async *readEvents(response: Response): AsyncGenerator<any> {
     const reader = response.body?.getReader();
     if (!reader) {
       throw new Error('无法读取响应流');
@@ -153,10 +355,76 @@ class APIService {
   }
 
   /**
-   * 分析手牌范围
+   * 保存范围到服务端范围库
    */
-  async analyzeRange(request: RangeAnalysisRequest): Promise<RangeAnalysisResponse> {
-    const response = await fetch(`${this.baseURL}/range/analyze`, {
+  async saveLibraryRange(range: LibraryRangeCreate): Promise<LibraryRange> {
+    const response = await fetch(`${this.baseURL}/range/library`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(range),
+    });
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.detail || '保存范围失败');
+    }
+
+    return response.json();
+  }
+
+  /**
+   * 批量导入范围到服务端范围库（可直接传入本地导出的范围）
+   */
+  async importLibraryRanges(ranges: LibraryRangeCreate[]): Promise<{ imported: number; ids: string[] }> {
+    const response = await fetch(`${this.baseURL}/range/library/import`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ ranges }),
+    });
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.detail || '导入范围失败');
+    }
+
+    return response.json();
+  }
+
+  /**
+   * 按位置、场景和标签筛选范围库
+   */
+  async listLibraryRanges(filters: {
+    position?: string;
+    scenario?: string;
+    tags?: string[];
+    limit?: number;
+    offset?: number;
+  } = {}): Promise<LibraryListResponse> {
+    const params = new URLSearchParams();
+    if (filters.position) params.set('position', filters.position);
+    if (filters.scenario) params.set('scenario', filters.scenario);
+    filters.tags?.forEach((tag) => params.append('tag', tag));
+    if (filters.limit !== undefined) params.set('limit', String(filters.limit));
+    if (filters.offset !== undefined) params.set('offset', String(filters.offset));
+
+    const response = await fetch(`${this.baseURL}/range/library?${params}`);
+
+    if (!response.ok) {
+      throw new Error('获取范围库失败');
+    }
+
+    return response.json();
+  }
+
+  /**
+   * 在范围库中检索相似范围
+   */
+  async searchLibraryRanges(request: LibrarySearchRequest): Promise<LibrarySearchResponse> {
+    const response = await fetch(`${this.baseURL}/range/library/search`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -166,17 +434,52 @@ class APIService {
 
     if (!response.ok) {
       const error = await response.json();
-      throw new Error(error.detail || '范围分析失败');
+      throw new Error(error.detail || '检索范围失败');
     }
 
     return response.json();
   }
 
   /**
-   * 推荐手牌范围
+   * 从范围库删除范围
    */
-  async recommendRange(request: RangeRecommendationRequest): Promise<RangeRecommendationResponse> {
-    const response = await fetch(`${this.baseURL}/range/recommend`, {
+  async deleteLibraryRange(rangeId: string): Promise<void> {
+    const response = await fetch(`${this.baseURL}/range/library/${rangeId}`, {
+      method: 'DELETE',
+    });
+
+    if (!response.ok) {
+      throw new Error('删除范围失败');
+    }
+  }
+
+  /**
+   * 获取 169 个手牌类别对抗对手范围的胜率（行优先，与 HandMatrix 顺序一致）
+   */
+  async equityHeatmap(villainHands: string[], board?: string): Promise<Float32Array> {
+    const response = await fetch(`${this.baseURL}/range/equity-heatmap`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Accept': 'application/octet-stream',
+      },
+      body: JSON.stringify({ villain_hands: villainHands, board: board || null }),
+    });
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.detail || '计算胜率热力图失败');
+    }
+
+    // 服务端返回 169 个小端 float32
+    return new Float32Array(await response.arrayBuffer());
+  }
+
+  /**
+   * 获取英雄范围每个组合对抗对手范围的胜率分布（组合明细、直方图和形状统计）
+   */
+  async equityDistribution(request: EquityDistributionRequest): Promise<EquityDistributionResponse> {
+    const response = await fetch(`${this.baseURL}/range/equity-distribution`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -186,7 +489,7 @@ class APIService {
 
     if (!response.ok) {
       const error = await response.json();
-      throw new Error(error.detail || '范围推荐失败');
+      throw new Error(error.detail || '计算胜率分布失败');
     }
 
     return response.json();